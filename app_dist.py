@@ -1,94 +1,206 @@
-import os, json
-from flask import Flask, render_template, request, redirect, url_for, send_from_directory, jsonify
+import os, json, time
+from flask import Flask, render_template, request, redirect, url_for, send_from_directory, send_file, jsonify, make_response, stream_template, abort
+from cv_assets import Assets
+from cv_core import SelectionPlan, compile_selection, count_items
+from cv_export import EXPORT_FORMATS, Exporter, MissingDependency
+from cv_import import FORMATS as IMPORT_FORMATS, guess_format, import_stream
+from cv_jobs import JobQueue
+from cv_metrics import Metrics, instrument
+from cv_outputs import safe_name
+from cv_profiles import Profile, ProfileMiddleware, ProfileRegistry
+from cv_render import FRAGMENTS, RenderEngine, extension, template_name
+from cv_store import FIELDS, SECTIONS, thaw
+from werkzeug.local import LocalProxy
 
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.environ.get("CVTOOL_DATA_DIR", os.path.join(APP_DIR, "data"))
 OUT_DIR  = os.path.join(DATA_DIR, "output")
 TEMPLATES_DIR = os.path.join(APP_DIR, "render_templates")
 
-# AÑADIR ESTAS LÍNEAS DE DEPURACIÓN
-print(f"APP_DIR: {APP_DIR}")
-print(f"DATA_DIR: {DATA_DIR}")
-print(f"Creando carpetas...")
+os.makedirs(DATA_DIR, exist_ok=True); os.makedirs(OUT_DIR, exist_ok=True)
 
-os.makedirs(DATA_DIR, exist_ok=True)
-os.makedirs(OUT_DIR, exist_ok=True)
-
-print(f"Carpetas creadas. ¿Existe DATA_DIR? {os.path.exists(DATA_DIR)}")
-# fin de la depuración
-
-# os.makedirs(DATA_DIR, exist_ok=True); os.makedirs(OUT_DIR, exist_ok=True)
+RENDER_ENGINE = RenderEngine(TEMPLATES_DIR, bytecode_cache_dir=os.environ.get("CVTOOL_BYTECODE_CACHE"))
 
 app = Flask(__name__, template_folder=os.path.join(APP_DIR, "templates"), static_folder=os.path.join(APP_DIR, "static"))
+ASSETS = Assets(app.static_folder)  # CSS y JS minificados, con hash y precomprimidos (ver cv_assets)
+app.jinja_env.globals["asset_url"] = ASSETS.url
+
+BATCH_WORKERS = int(os.environ.get("CVTOOL_BATCH_WORKERS", "4"))
+STREAM_THRESHOLD = int(os.environ.get("CVTOOL_STREAM_THRESHOLD", "500"))
+
+METRICS = Metrics(enabled=os.environ.get("CVTOOL_METRICS") == "1")
+EXPORTER = Exporter(os.path.join(OUT_DIR, ".objects", "exports"), font=os.environ.get("CVTOOL_PDF_FONT"),
+                    workers=int(os.environ.get("CVTOOL_EXPORT_WORKERS", "2")))
+if METRICS.enabled:
+    RENDER_ENGINE.timer = EXPORTER.timer = METRICS.timer
+
+def open_profile(profile_id, data_dir):
+    """Documentos y cachés de un perfil (id None: el de DATA_DIR)"""
+    return Profile(profile_id, data_dir, storage=os.environ.get("CVTOOL_STORAGE", "json"),
+                   dedup=os.environ.get("CVTOOL_DEDUP", "exact"),
+                   render_cache_size=int(os.environ.get("CVTOOL_RENDER_CACHE_SIZE", "64")),
+                   fragment_cache_size=int(os.environ.get("CVTOOL_FRAGMENT_CACHE_SIZE", "512")),
+                   output_max_bytes=int(os.environ.get("CVTOOL_OUTPUT_MAX_MB", "200")) * 2 ** 20,
+                   timer=METRICS.timer if METRICS.enabled else None)
+
+# El perfil de DATA_DIR y, con CVTOOL_MULTI_PROFILE=1, los de DATA_DIR/profiles/<id> servidos bajo /p/<id>/
+PROFILES = ProfileRegistry(os.path.join(DATA_DIR, "profiles"), open_profile, open_profile(None, DATA_DIR),
+                           maxsize=int(os.environ.get("CVTOOL_OPEN_PROFILES", "32")))
+MULTI_PROFILE = os.environ.get("CVTOOL_MULTI_PROFILE") == "1"
+if MULTI_PROFILE:
+    app.wsgi_app = ProfileMiddleware(app.wsgi_app, PROFILES)
+
+# Documentos y cachés del perfil de la petición en curso (ver cv_profiles)
+CV_STORE = LocalProxy(lambda: PROFILES.current().cv)
+TEMPLATES_STORE = LocalProxy(lambda: PROFILES.current().templates)
+RENDER_CACHE = LocalProxy(lambda: PROFILES.current().render_cache)
+FRAGMENT_CACHE = LocalProxy(lambda: PROFILES.current().fragment_cache)
+
+if METRICS.enabled:
+    METRICS.collect("cvtool_render_cache_hits_total", "counter", "Aciertos de la caché de documentos", lambda: RENDER_CACHE.hits)
+    METRICS.collect("cvtool_render_cache_misses_total", "counter", "Fallos de la caché de documentos", lambda: RENDER_CACHE.misses)
+    METRICS.collect("cvtool_fragment_cache_hits_total", "counter", "Aciertos de la caché de fragmentos", lambda: FRAGMENT_CACHE.hits)
+    METRICS.collect("cvtool_fragment_cache_misses_total", "counter", "Fallos de la caché de fragmentos", lambda: FRAGMENT_CACHE.misses)
+    METRICS.collect("cvtool_template_compiles_total", "counter", "Plantillas compiladas", lambda: RENDER_ENGINE.misses)
+    METRICS.collect("cvtool_cv_revision", "gauge", "Revisión del CV en memoria", lambda: CV_STORE.revision)
+    METRICS.collect("cvtool_open_profiles", "gauge", "Perfiles abiertos en memoria", PROFILES.open_count)
+instrument(app, METRICS, profile=os.environ.get("CVTOOL_PROFILE", ""), profile_dir=os.path.join(DATA_DIR, "cprofile"))
 
 def load_cv():
-    path = os.path.join(DATA_DIR, "cv.json")
-    if not os.path.exists(path):
-        return {"contact":{"links":[]}, "summary":"", "skills":[], "experience":[], "projects":[], "education":[], "courses":[], "otros":[]}
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """Vista de solo lectura del CV (solo se relee cv.json si ha cambiado)"""
+    return CV_STORE.view()
 
-def save_cv(cv): 
-    with open(os.path.join(DATA_DIR, "cv.json"), "w", encoding="utf-8") as f: 
-        json.dump(cv, f, ensure_ascii=False, indent=2)
+def save_cv(cv):
+    CV_STORE.replace(cv)
 
 def load_templates():
     """Carga las plantillas de CV guardadas"""
-    path = os.path.join(DATA_DIR, "templates.json")
-    if not os.path.exists(path):
-        return {}
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return PROFILES.current().templates_view()
 
 def save_templates(templates):
     """Guarda las plantillas de CV"""
-    with open(os.path.join(DATA_DIR, "templates.json"), "w", encoding="utf-8") as f:
-        json.dump(templates, f, ensure_ascii=False, indent=2)
-
-def _dedup_otros(cv_dict):
-    otros = cv_dict.get("otros", []); seen=set(); cleaned=[]
-    for o in otros:
-        sig = ((o.get("title") or "").strip(), (o.get("institution") or o.get("company") or "").strip(), (o.get("periodo") or o.get("start") or "").strip())
-        if sig not in seen: seen.add(sig); cleaned.append(o)
-    cv_dict["otros"] = cleaned; return cv_dict
-
-def filter_cv_by_selection(cv, selection):
-    """Filtra el CV basándose en la selección y orden especificados"""
-    filtered_cv = {
-        "contact": cv.get("contact", {}),
-        "summary": cv.get("summary", "") if selection.get("include_summary", True) else ""
-    }
-    
-    # Secciones que se pueden filtrar y reordenar
-    sections = ["skills", "experience", "projects", "education", "courses", "otros"]
-    
-    for section in sections:
-        if section in selection and "selected" in selection[section]:
-            # Obtener elementos seleccionados en el orden especificado
-            original_items = cv.get(section, [])
-            selected_indices = selection[section]["selected"]
-            order = selection[section].get("order", list(range(len(selected_indices))))
-            
-            # Crear lista ordenada de elementos seleccionados
-            selected_items = []
-            for pos in order:
-                if pos < len(selected_indices):
-                    idx = selected_indices[pos]
-                    if idx < len(original_items):
-                        selected_items.append(original_items[idx])
-            
-            filtered_cv[section] = selected_items
-        else:
-            # Si no hay selección, incluir todos los elementos
-            filtered_cv[section] = cv.get(section, [])
-    
-    return filtered_cv
+    TEMPLATES_STORE.replace(templates)
 
-from jinja2 import Environment, FileSystemLoader
+@METRICS.timed("render")
 def render_to_text(cv, fmt="md"):
-    env = Environment(loader=FileSystemLoader(TEMPLATES_DIR), autoescape=False, trim_blocks=False, lstrip_blocks=False)
-    tpl = env.get_template("cv.md.j2") if fmt=="md" else env.get_template("cv.txt.j2")
-    return tpl.render(**cv)
+    return RENDER_ENGINE.render(cv, fmt=fmt)
+
+def render_cv(selection=None, fmt="md"):
+    """Renderiza el CV (filtrado si se indica selección) pasando por la caché; devuelve (etag, contenido)"""
+    cv, revision, _ = CV_STORE.versioned_view(deduped=True)
+    plan = None if selection is None else compile_selection(selection)
+    def render():
+        with METRICS.timer("filter"):
+            filtered = cv if plan is None else plan.apply(cv)
+        return render_to_text(filtered, fmt=fmt)
+    return RENDER_CACHE.get_or_render(revision, plan, fmt, render)
+
+def render_chunks(selection=None, fmt="md"):
+    """(etag, trozos) del CV renderizado: de la caché si ya está, si no directamente de la plantilla (etag None)"""
+    cv, revision, _ = CV_STORE.versioned_view(deduped=True)
+    plan = None if selection is None else compile_selection(selection)
+    cached = RENDER_CACHE.peek(revision, plan, fmt)
+    if cached is not None:
+        return cached[0], iter((cached[1],))
+    with METRICS.timer("filter"):
+        filtered = cv if plan is None else plan.apply(cv)
+    return None, METRICS.timed_iter("render", RENDER_ENGINE.stream(filtered, fmt=fmt))
+
+def stream_cv(selection=None, fmt="md"):
+    return render_chunks(selection, fmt)[1]
+
+def render_fragments(selection, fmt="md"):
+    """Renderiza el CV por bloques (FRAGMENTS) reutilizando los que no han cambiado; devuelve [(nombre, hash, contenido)]"""
+    cv, _, revisions = CV_STORE.versioned_view(["contact", "summary"] + SECTIONS, deduped=True)
+    plan = compile_selection(selection)
+    with METRICS.timer("filter"):
+        filtered = plan.apply(cv)
+    tpl = RENDER_ENGINE.get_template(template_name(fmt))
+    fragments = []
+    for name in FRAGMENTS:
+        if name == "header":
+            token = revisions["contact"]
+        elif name == "summary":
+            token = (revisions["summary"], plan.include_summary)
+        else:
+            token = (revisions[name], plan.sections.get(name))
+        digest, content = FRAGMENT_CACHE.get_or_build(
+            (tpl, name, token), METRICS.timed("render")(lambda: RENDER_ENGINE.render_fragment(filtered, fmt, name, tpl)))
+        fragments.append((name, digest, content))
+    return fragments
+
+def out_dir():
+    """Carpeta de salida del perfil en curso"""
+    return PROFILES.current().out_dir
+
+def output_store():
+    """Documentos generados del perfil en curso, guardados por contenido (ver cv_outputs)"""
+    return PROFILES.current().outputs
+
+def exports_dir():
+    """Conversiones a HTML/PDF del perfil en curso (ver cv_export)"""
+    return os.path.join(output_store().objects_dir, "exports")
+
+def write_cv(selection, fmt, outname):
+    """Genera el CV en la carpeta de salida del perfil; si no ha cambiado no se escribe nada. Devuelve el nombre del fichero"""
+    filename = safe_name(f"{outname}{extension(fmt)}")
+    if fmt in EXPORT_FORMATS:
+        # Se parte del Markdown de la caché; solo se convierte si ese contenido no se había exportado
+        _, markdown = render_cv(selection, "md")
+        path, created = EXPORTER.export(markdown, fmt, exports_dir())
+        output_store().put_file(filename, path, new=created)
+    elif _is_large(load_cv()):
+        # Los CVs grandes se escriben por trozos sin pasar por la caché
+        etag, chunks = render_chunks(selection, fmt)
+        output_store().put_text(filename, chunks, digest=etag)
+    else:
+        etag, content = render_cv(selection, fmt)
+        output_store().put_text(filename, (content,), digest=etag)
+    return filename
+
+def _generate_job(payload, progress):
+    with PROFILES.use(payload.get("profile")):
+        return {"filename": write_cv(payload.get("selection", {}), payload.get("fmt", "md"),
+                                     payload.get("outname", "CV_personalizado"))}
+
+def _batch_job(payload, progress):
+    with PROFILES.use(payload.get("profile")):
+        return _run_batch_job(payload, progress)
+
+def _run_batch_job(payload, progress):
+    from cv_batch import run_batch, zip_outputs
+    results = run_batch(CV_STORE.deduped_view(), load_templates(), payload.get("templates", "all"),
+                        payload.get("formats") or ["md"], RENDER_ENGINE, workers=BATCH_WORKERS, progress=progress,
+                        exporter=EXPORTER, export_dir=exports_dir())
+    if payload.get("zip"):
+        filename = f"{payload.get('outname') or 'CVs'}.zip"
+        output_store().put_bytes(filename, zip_outputs(results).getvalue())
+        return {"filename": filename, "results": results}
+    return {"results": output_store().put_results(results)}
+
+JOB_QUEUE = JobQueue(os.path.join(DATA_DIR, "jobs.json"), {"generate": _generate_job, "batch": _batch_job},
+                     workers=int(os.environ.get("CVTOOL_JOB_WORKERS", "2")))
+
+def _is_large(cv):
+    return count_items(cv) > STREAM_THRESHOLD
+
+def _page_args(default=20, limit=100):
+    """(página, elementos por página) de la petición, acotados para que cada respuesta tenga un tamaño máximo"""
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", default, type=int), 1), limit)
+    return page, per_page
+
+def _pages(total, per_page):
+    return (total + per_page - 1) // per_page
+
+def _conditional(etag, build):
+    """Responde 304 si el cliente ya tiene esa versión; si no, construye la respuesta con su ETag"""
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = make_response(build())
+    response.set_etag(etag)
+    return response
 
 # Rutas existentes (mantenidas igual)
 @app.route("/")
@@ -103,88 +215,138 @@ def about():
 def contact():
     cv = load_cv()
     if request.method=="POST":
-        c = cv.get("contact", {})
+        c = thaw(cv.get("contact", {}))
         for k in ["name","title","location","email","phone"]:
             c[k] = request.form.get(k,"")
         links = request.form.get("links","").strip()
         c["links"] = [x.strip() for x in links.split(",")] if links else []
-        cv["contact"]=c; save_cv(cv); return redirect(url_for("contact"))
+        CV_STORE.set("contact", c); return redirect(url_for("contact"))
     return render_template("contact.html", cv=cv, title="Contacto")
 
 @app.route("/summary", methods=["GET","POST"])
 def summary():
     cv = load_cv()
     if request.method=="POST":
-        cv["summary"] = request.form.get("summary",""); save_cv(cv); return redirect(url_for("summary"))
+        CV_STORE.set("summary", request.form.get("summary","")); return redirect(url_for("summary"))
     return render_template("summary.html", cv=cv, title="Resumen")
 
-FIELDS = {
- "skills":["name","level","tags"],
- "experience":["title","company","location","start","end","description","tech"],
- "projects":["title","company","location","start","end","description","tech"],
- "education":["degree","institution","start","end","notes"],
- "courses":["name","issuer","date","hours","credential","tags"],
- "otros":["title","institution","start","end","periodo","description","tags"]
-}
+@app.route("/buscar")
+def search():
+    """Búsqueda paginada en las secciones: ?q=&section=&since=&until=&page=&per_page=&scope=cv"""
+    args = request.args
+    page, per_page = _page_args()
+    try:
+        total, hits = CV_STORE.search(args.get("q", ""), section=args.get("section") or None,
+                                      since=args.get("since") or None, until=args.get("until") or None,
+                                      deduped=args.get("scope") == "cv", offset=(page - 1) * per_page, limit=per_page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "pages": _pages(total, per_page),
+        "results": [{"section": s, "idx": i, "item": thaw(item)} for s, i, item in hits]
+    })
 
 def _get_list(cv, section):
-    if section not in cv: cv[section]=[]
-    return cv[section]
+    return cv.get(section, ())
+
+def _item_from_form(section):
+    item = {}
+    for k in FIELDS.get(section, []):
+        v = request.form.get(k,"").strip()
+        if k in ("tags","tech"):
+            item[k] = [x.strip() for x in v.split(",") if x.strip()]
+        else:
+            item[k] = v
+    return item
 
 @app.route("/<section>")
 def list_items(section):
-    cv = load_cv(); items=list(enumerate(_get_list(cv, section)))
-    return render_template("list.html", section=section, items=items, title=section.capitalize())
+    query = {k: request.args.get(k, "").strip() for k in ("q", "since", "until")}
+    page, per_page = _page_args(default=50, limit=200); start = (page - 1) * per_page; error = None
+    if any(query.values()):
+        try:
+            total, hits = CV_STORE.search(query["q"], section=section, since=query["since"] or None,
+                                          until=query["until"] or None, offset=start, limit=per_page)
+        except ValueError as e:
+            error, total, hits = str(e), 0, []
+        items = [(i, item) for _, i, item in hits]
+    else:
+        lst = _get_list(load_cv(), section); total = len(lst)
+        items = list(enumerate(lst[start:start + per_page], start))
+    return render_template("list.html", section=section, items=items, query=query, page=page, per_page=per_page,
+                           pages=_pages(total, per_page), total=total, error=error, title=section.capitalize())
+
+@app.route("/<section>/elementos")
+def section_items(section):
+    """Una página de elementos de la sección en JSON (scope=cv: posiciones del CV sin duplicados)"""
+    if section not in SECTIONS:
+        return jsonify({"error": "Sección no encontrada"}), 404
+    cv = CV_STORE.deduped_view() if request.args.get("scope") == "cv" else load_cv()
+    lst = _get_list(cv, section)
+    page, per_page = _page_args(default=50, limit=200); start = (page - 1) * per_page
+    return jsonify({
+        "section": section,
+        "total": len(lst),
+        "page": page,
+        "per_page": per_page,
+        "pages": _pages(len(lst), per_page),
+        "items": [{"idx": i, "item": thaw(item)} for i, item in enumerate(lst[start:start + per_page], start)]
+    })
 
 @app.route("/<section>/add", methods=["GET","POST"])
 def add_item(section):
-    cv = load_cv(); item={}
     if request.method=="POST":
-        for k in FIELDS.get(section, []):
-            v = request.form.get(k,"").strip()
-            if k in ("tags","tech"):
-                item[k] = [x.strip() for x in v.split(",") if x.strip()]
-            else:
-                item[k] = v
-        cv[section].append(item); save_cv(cv); return redirect(url_for("list_items", section=section))
-    return render_template("edit_item.html", section=section, item=item, action="Añadir", title="Añadir")
+        CV_STORE.append_item(section, _item_from_form(section)); return redirect(url_for("list_items", section=section))
+    return render_template("edit_item.html", section=section, item={}, action="Añadir", title="Añadir")
 
 @app.route("/<section>/edit/<int:idx>", methods=["GET","POST"])
 def edit_item(section, idx):
     cv = load_cv(); lst=_get_list(cv, section)
     if idx<0 or idx>=len(lst): return redirect(url_for("list_items", section=section))
     if request.method=="POST":
-        item = lst[idx]
-        for k in FIELDS.get(section, []):
-            v = request.form.get(k,"").strip()
-            if k in ("tags","tech"):
-                item[k] = [x.strip() for x in v.split(",") if x.strip()]
-            else:
-                item[k] = v
-        save_cv(cv); return redirect(url_for("list_items", section=section))
+        CV_STORE.update_item(section, idx, _item_from_form(section)); return redirect(url_for("list_items", section=section))
     return render_template("edit_item.html", section=section, item=lst[idx], action="Editar", title="Editar")
 
 @app.route("/<section>/delete/<int:idx>")
 def delete_item(section, idx):
-    cv = load_cv(); lst=_get_list(cv, section)
-    if 0<=idx<len(lst): lst.pop(idx); save_cv(cv)
+    CV_STORE.delete_item(section, idx)
     return redirect(url_for("list_items", section=section))
 
 # NUEVAS RUTAS PARA SELECCIÓN Y PERSONALIZACIÓN
 
+@app.route("/importar", methods=["POST"])
+def import_items():
+    upload = request.files.get("file")  # o el cuerpo de la petición, sin leerlo entero
+    section = request.values.get("section") or None
+    fmt = request.values.get("format") or (guess_format(upload.filename, upload.mimetype) if upload else guess_format(mimetype=request.mimetype))
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({"success": False, "message": "Formato no reconocido: usa format=jsonl o format=csv"}), 400
+    try:
+        result = import_stream(CV_STORE, upload.stream if upload else request.stream, fmt, section)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    return jsonify(dict(result, success=True))
+
 @app.route("/personalizar")
 def customize():
     """Página principal para personalizar el CV"""
-    cv = load_cv()
+    # Sin duplicados, para que los índices de la selección sean los que se renderizan
+    cv = CV_STORE.deduped_view()
     templates = load_templates()
-    return render_template("customize.html", cv=cv, templates=templates, title="Personalizar CV")
+    counts = {section: len(cv.get(section) or ()) for section in SECTIONS}
+    large = _is_large(cv)
+    return render_template("customize.html", summary=cv.get("summary", ""), counts=counts, templates=templates,
+                           stream_preview=large, expand=not large, title="Personalizar CV")
 
 @app.route("/personalizar/plantilla/<template_name>")
 def load_template(template_name):
     """Carga una plantilla guardada"""
     templates = load_templates()
     if template_name in templates:
-        return jsonify(templates[template_name])
+        return jsonify(thaw(templates[template_name]))
     return jsonify({"error": "Plantilla no encontrada"}), 404
 
 @app.route("/personalizar/guardar", methods=["POST"])
@@ -197,32 +359,31 @@ def save_template():
     if not template_name:
         return jsonify({"error": "Nombre de plantilla requerido"}), 400
     
-    templates = load_templates()
-    templates[template_name] = {
+    TEMPLATES_STORE.set(template_name, {
         "name": template_name,
         "description": data.get("description", ""),
         "selection": selection,
+        # Selección ya validada, para no reinterpretarla en cada generación
+        "plan": SelectionPlan.compile(selection, cv=CV_STORE.deduped_view()).to_json(),
         "created": data.get("created", "")
-    }
-    save_templates(templates)
+    })
     
     return jsonify({"success": True, "message": "Plantilla guardada correctamente"})
 
 @app.route("/personalizar/eliminar/<template_name>", methods=["POST"])
 def delete_template(template_name):
     """Elimina una plantilla guardada"""
-    templates = load_templates()
-    if template_name in templates:
-        del templates[template_name]
-        save_templates(templates)
+    if TEMPLATES_STORE.delete(template_name):
         return jsonify({"success": True, "message": "Plantilla eliminada"})
     return jsonify({"error": "Plantilla no encontrada"}), 404
 
 @app.route("/preview")
 def preview():
-    cv = _dedup_otros(load_cv()); fmt = request.args.get("fmt","md")
-    content = render_to_text(cv, fmt=fmt)
-    return render_template("preview.html", content=content, title="Vista previa")
+    fmt = request.args.get("fmt","md")
+    if _is_large(load_cv()):
+        return app.response_class(stream_template("preview.html", content=stream_cv(None, fmt), title="Vista previa"))
+    etag, content = render_cv(fmt=fmt)
+    return _conditional(etag, lambda: render_template("preview.html", content=[content], title="Vista previa"))
 
 @app.route("/preview/personalizada", methods=["POST"])
 def preview_custom():
@@ -231,33 +392,51 @@ def preview_custom():
     selection = data.get("selection", {})
     fmt = data.get("fmt", "md")
     
-    cv = _dedup_otros(load_cv())
-    filtered_cv = filter_cv_by_selection(cv, selection)
-    content = render_to_text(filtered_cv, fmt=fmt)
-    
-    return jsonify({"content": content})
+    etag, content = render_cv(selection, fmt)
+    return _conditional(etag, lambda: jsonify({"content": content}))
+
+@app.route("/preview/fragmentos", methods=["POST"])
+def preview_fragments():
+    """Vista previa por bloques: solo se envían los fragmentos que el cliente no tiene ya"""
+    data = request.get_json()
+    known = data.get("known", {})
+    fragments = render_fragments(data.get("selection", {}), data.get("fmt", "md"))
+    return jsonify({
+        "order": [name for name, _, _ in fragments],
+        "hashes": {name: digest for name, digest, _ in fragments},
+        "fragments": {name: content for name, digest, content in fragments if known.get(name) != digest}
+    })
+
+@app.route("/preview/stream")
+def preview_stream():
+    """Vista previa en texto plano enviada por trozos (para CVs muy grandes)"""
+    return app.response_class(stream_cv(None, request.args.get("fmt","md")), mimetype="text/plain")
+
+@app.route("/preview/personalizada/stream", methods=["POST"])
+def preview_custom_stream():
+    data = request.get_json()
+    return app.response_class(stream_cv(data.get("selection", {}), data.get("fmt", "md")), mimetype="text/plain")
 
 @app.route("/generar", methods=["GET","POST"])
 def generate():
-    cv = _dedup_otros(load_cv()); fmt="md"; outname="CV"; outputs=[]
+    fmt="md"; outname="CV"; outputs=[]
     if request.method=="POST":
         fmt = request.form.get("fmt","md")
-        outname = request.form.get("outname","CV")
+        outname = request.form.get("outname","").strip() or "CV"
         
         # Comprobar si hay selección personalizada
         selection_data = request.form.get("selection_data")
-        if selection_data:
-            try:
-                selection = json.loads(selection_data)
-                cv = filter_cv_by_selection(cv, selection)
-            except:
-                pass  # Si hay error, usar CV completo
-        
-        content = render_to_text(cv, fmt=fmt)
-        ext = ".md" if fmt=="md" else ".txt"
-        outpath = os.path.join(OUT_DIR, f"{outname}{ext}")
-        with open(outpath,"w",encoding="utf-8") as f: f.write(content)
-        outputs.append(os.path.basename(outpath))
+        try:
+            selection = json.loads(selection_data) if selection_data else None
+        except ValueError:
+            return jsonify({"success": False, "message": "La selección no es un JSON válido"}), 400
+        try:
+            filename = write_cv(selection, fmt, outname)
+        except MissingDependency as e:
+            return jsonify({"success": False, "message": str(e)}), 501
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        outputs.append(os.path.basename(filename))
     return render_template("generate.html", fmt=fmt, outname=outname, outputs=outputs, title="Generar")
 
 @app.route("/generar/personalizado", methods=["POST"])
@@ -267,25 +446,124 @@ def generate_custom():
     selection = data.get("selection", {})
     fmt = data.get("fmt", "md")
     outname = data.get("outname", "CV_personalizado")
+    if data.get("async"):
+        return _enqueue("generate", {"selection": selection, "fmt": fmt, "outname": outname})
     
-    cv = _dedup_otros(load_cv())
-    filtered_cv = filter_cv_by_selection(cv, selection)
-    content = render_to_text(filtered_cv, fmt=fmt)
-    
-    ext = ".md" if fmt == "md" else ".txt"
-    outpath = os.path.join(OUT_DIR, f"{outname}{ext}")
-    with open(outpath, "w", encoding="utf-8") as f:
-        f.write(content)
+    try:
+        filename = write_cv(selection, fmt, outname)
+    except MissingDependency as e:
+        return jsonify({"success": False, "message": str(e)}), 501
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     
     return jsonify({
         "success": True,
-        "filename": f"{outname}{ext}",
+        "filename": filename,
         "message": "CV generado correctamente"
     })
 
+@app.route("/generar/lote", methods=["POST"])
+def generate_batch():
+    """Genera varias plantillas guardadas en varios formatos de una sola vez"""
+    data = request.get_json() or {}
+    formats = data.get("formats") or ["md"]
+    if data.get("async"):
+        return _enqueue("batch", {"templates": data.get("templates", "all"), "formats": formats,
+                                  "zip": bool(data.get("zip")), "outname": data.get("outname")})
+    from cv_batch import run_batch, zip_outputs
+    start = time.perf_counter()
+    results = run_batch(CV_STORE.deduped_view(), load_templates(), data.get("templates", "all"), formats, RENDER_ENGINE,
+                        workers=BATCH_WORKERS, exporter=EXPORTER, export_dir=exports_dir())
+    if data.get("zip"):
+        return send_file(zip_outputs(results), mimetype="application/zip", as_attachment=True, download_name="CVs.zip")
+    output_store().put_results(results)
+    return jsonify({
+        "success": not any("error" in r for r in results),
+        "results": results,
+        "ms": round((time.perf_counter() - start) * 1000, 2)
+    })
+
+def _job_json(job):
+    """Estado del trabajo con los enlaces de descarga de lo que ya ha generado"""
+    result = job["result"] or {}
+    files = [result["filename"]] if "filename" in result else [
+        r["filename"] for r in result.get("results", ()) if "error" not in r]
+    return {
+        "id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "error": job["error"],
+        "created": job["created"],
+        "started": job["started"],
+        "finished": job["finished"],
+        "result": job["result"],
+        "url": url_for("job_status", job_id=job["id"]),
+        "downloads": [url_for("download", path=f) for f in files],
+    }
+
+def _enqueue(kind, payload):
+    job, created = JOB_QUEUE.submit(kind, dict(payload, profile=PROFILES.current().id))
+    return jsonify(dict(_job_json(job), coalesced=not created)), 202
+
+def _own_job(job):
+    """Cada perfil solo ve sus propios trabajos"""
+    return job["payload"].get("profile") == PROFILES.current().id
+
+@app.route("/trabajos")
+def list_jobs():
+    limit = min(max(request.args.get("limit", 50, type=int), 1), 200)
+    return jsonify([_job_json(job) for job in JOB_QUEUE.list(limit, where=_own_job)])
+
+@app.route("/trabajos/<job_id>")
+def job_status(job_id):
+    """Estado de un trabajo; con ?wait=N espera hasta N segundos (máx. 30) a que termine"""
+    wait = min(max(request.args.get("wait", 0, type=float), 0), 30)
+    job = JOB_QUEUE.wait(job_id, wait) if wait else JOB_QUEUE.get(job_id)
+    if job is None or not _own_job(job):
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    return jsonify(_job_json(job))
+
+@app.route("/perfiles", methods=["GET", "POST"])
+def profiles():
+    """Lista (paginada) o crea perfiles; solo en modo multiperfil"""
+    if not MULTI_PROFILE:
+        abort(404)
+    if request.method == "POST":
+        profile_id = (request.get_json() or {}).get("id", "")
+        try:
+            created = PROFILES.create(profile_id)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"id": profile_id, "created": created, "url": f"{request.script_root}/p/{profile_id}/"}), 201 if created else 200
+    page, per_page = _page_args(default=50, limit=500)
+    names = PROFILES.list()
+    return jsonify({
+        "total": len(names),
+        "page": page,
+        "per_page": per_page,
+        "pages": _pages(len(names), per_page),
+        "results": names[(page - 1) * per_page:page * per_page],
+    })
+
+@app.route("/metrics")
+def metrics():
+    """Métricas en formato Prometheus (solo con CVTOOL_METRICS=1)"""
+    if not METRICS.enabled:
+        abort(404)
+    return app.response_class(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
 @app.route("/download/<path:path>")
 def download(path):
-    return send_from_directory(OUT_DIR, path, as_attachment=True)
+    if any(part.startswith(".") for part in path.split("/")): abort(404)
+    found = output_store().lookup(path)  # ETag fuerte, 304 y rangos
+    if found is None: return send_from_directory(out_dir(), path, as_attachment=True)
+    return send_file(found[0], as_attachment=True, download_name=os.path.basename(path), etag=found[1], conditional=True)
+
+@app.route("/assets/<path:filename>")
+def assets(filename):
+    return ASSETS.send(filename)  # caché de un año; .br/.gz según Accept-Encoding
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    # Servidor de desarrollo; en producción, ver cv_wsgi.py
+    app.run(debug=os.environ.get("CVTOOL_DEBUG", "0") == "1")
\ No newline at end of file
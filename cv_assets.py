@@ -0,0 +1,334 @@
+"""Ficheros estáticos minificados, con el hash del contenido en el nombre y precomprimidos.
+
+``build`` minifica los CSS y JS de ``static/``, los copia a ``static/dist/``
+como ``css/style.<hash>.css`` junto con sus variantes ``.gz`` y ``.br``
+(esta última si está instalado ``brotli``) y escribe ``manifest.json`` con
+la correspondencia entre nombres. Como la URL cambia cada vez que cambia el
+contenido, Assets sirve esos ficheros con ``Cache-Control: immutable`` de un
+año y elige la variante comprimida según ``Accept-Encoding``. Las plantillas
+obtienen la URL con ``asset_url('css/style.css')``; sin manifiesto se usa la
+de ``static/`` de siempre.
+
+Uso desde línea de comandos (antes de empaquetar la aplicación)::
+
+    python cv_assets.py [--static-dir static]
+"""
+import contextlib
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+
+from cv_persist import atomic_write_bytes, atomic_write_json
+
+EXTENSIONS = (".css", ".js")
+DIST = "dist"
+MANIFEST = "manifest.json"
+# Un año: la URL de cada versión no vuelve a cambiar de contenido
+MAX_AGE = 365 * 24 * 3600
+# Por debajo de este tamaño comprimir no compensa
+MIN_COMPRESS = 256
+
+# Tras estos caracteres o palabras una "/" empieza una expresión regular y no es una división
+_REGEX_AFTER = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "void", "delete", "new", "throw",
+                   "yield", "await"}
+_WORD_TAIL = re.compile(r"[A-Za-z_$][\w$]*$")
+
+
+def _skip_quoted(text, i, quote):
+    """Posición tras la cadena (o expresión regular) que empieza en i"""
+    n, i, in_class = len(text), i + 1, False
+    while i < n:
+        c = text[i]
+        if c == "\\":
+            i += 2
+            continue
+        if quote == "/" and c == "[":
+            in_class = True
+        elif quote == "/" and c == "]":
+            in_class = False
+        elif c == quote and not in_class:
+            return i + 1
+        elif c == "\n" and quote != "`":
+            return i
+        i += 1
+    return n
+
+
+def _skip_template(text, i):
+    """Posición tras la parte literal de una plantilla `...`: tras el ` final o tras un ${"""
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "`":
+            return i + 1, False
+        if c == "$" and text.startswith("${", i):
+            return i + 2, True
+        i += 1
+    return n, False
+
+
+def minify_js(text):
+    """Quita comentarios, sangrías y líneas vacías sin tocar cadenas, plantillas `...` ni expresiones regulares.
+
+    Mantiene los saltos de línea, así que no depende de la inserción
+    automática de punto y coma.
+    """
+    out, i, n = [], 0, len(text)
+    # Llaves abiertas dentro de cada ${...} de plantilla en curso
+    templates = []
+    line_start = True
+
+    def emit(chunk):
+        nonlocal line_start
+        out.append(chunk)
+        line_start = False
+
+    def previous():
+        tail = "".join(out[-8:]).rstrip()
+        return tail[-1:], _WORD_TAIL.search(tail)
+
+    while i < n:
+        c = text[i]
+        if c == "\n":
+            while out and out[-1] in (" ", "\t"):
+                out.pop()
+            if out and out[-1] != "\n":
+                out.append("\n")
+            line_start = True
+            i += 1
+        elif c in " \t\r":
+            if not line_start and out and out[-1] not in (" ", "\n"):
+                out.append(" ")
+            i += 1
+        elif text.startswith("//", i):
+            while i < n and text[i] != "\n":
+                i += 1
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+        elif c in "'\"":
+            j = _skip_quoted(text, i, c)
+            emit(text[i:j])
+            i = j
+        elif c == "`" or (c == "}" and templates and templates[-1] == 0):
+            if c == "}":
+                templates.pop()
+            j, opened = _skip_template(text, i + 1)
+            if opened:
+                templates.append(0)
+            emit(text[i:j])
+            i = j
+        elif c == "/":
+            last, word = previous()
+            if not last or last in _REGEX_AFTER or (word and word.group() in _REGEX_KEYWORDS):
+                j = _skip_quoted(text, i, "/")
+                emit(text[i:j])
+                i = j
+            else:
+                emit(c)
+                i += 1
+        else:
+            if templates and c == "{":
+                templates[-1] += 1
+            elif templates and c == "}":
+                templates[-1] -= 1
+            emit(c)
+            i += 1
+    return "".join(out).strip() + "\n"
+
+
+def _squeeze_css(css):
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r" ?([{};,>]) ?", r"\1", css)
+    # "propiedad : valor" dentro de un bloque (no en selectores como "a :hover {")
+    css = re.sub(r"([{;][\w-]+) ?: ?(?=[^{;}]*[;}])", r"\1:", css)
+    return css.replace(";}", "}")
+
+
+def minify_css(text):
+    """Quita comentarios y espacios sobrantes sin tocar las cadenas ni los operadores de calc()"""
+    out, start, i, n = [], 0, 0, len(text)
+    while i < n:
+        c = text[i]
+        if text.startswith("/*", i):
+            out.append(_squeeze_css(text[start:i]))
+            end = text.find("*/", i + 2)
+            i = start = n if end < 0 else end + 2
+        elif c in "'\"":
+            j = _skip_quoted(text, i, c)
+            out.extend((_squeeze_css(text[start:i]), text[i:j]))
+            i = start = j
+        else:
+            i += 1
+    out.append(_squeeze_css(text[start:]))
+    return "".join(out).strip() + "\n"
+
+
+def _compress(data):
+    """{codificación: bytes} de las variantes comprimidas que merecen la pena"""
+    if len(data) < MIN_COMPRESS:
+        return {}
+    import gzip
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        variants["br"] = brotli.compress(data, quality=11)
+    return {enc: body for enc, body in variants.items() if len(body) < len(data)}
+
+
+SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+
+def sources(static_dir):
+    """Rutas relativas (con /) de los CSS y JS de static_dir, sin los ya generados"""
+    found = []
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if not (root == static_dir and d == DIST))
+        for name in sorted(files):
+            if name.endswith(EXTENSIONS):
+                found.append(os.path.relpath(os.path.join(root, name), static_dir).replace(os.sep, "/"))
+    return found
+
+
+def build(static_dir, dist_dir=None):
+    """Genera dist_dir (por defecto static_dir/dist) y devuelve el manifiesto {fuente: nombre con hash}"""
+    dist_dir = dist_dir or os.path.join(static_dir, DIST)
+    manifest = {}
+    for name in sources(static_dir):
+        with open(os.path.join(static_dir, *name.split("/")), encoding="utf-8") as f:
+            text = f.read()
+        data = (minify_css(text) if name.endswith(".css") else minify_js(text)).encode("utf-8")
+        stem, ext = os.path.splitext(name)
+        hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+        manifest[name] = hashed
+        dest = os.path.join(dist_dir, *hashed.split("/"))
+        if os.path.exists(dest):
+            continue
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        for encoding, body in _compress(data).items():
+            atomic_write_bytes(dest + SUFFIXES[encoding], body)
+        atomic_write_bytes(dest, data)
+    # Solo se conservan las versiones que aparecen en el manifiesto
+    keep = {os.path.normpath(os.path.join(dist_dir, *h.split("/"))) for h in manifest.values()}
+    for root, _, files in os.walk(dist_dir):
+        for f in files:
+            path = os.path.normpath(os.path.join(root, f))
+            base = path[:-3] if path.endswith((".gz", ".br")) else path
+            if f != MANIFEST and base not in keep:
+                # Otro proceso que arranca a la vez puede haberlo borrado ya
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+    os.makedirs(dist_dir, exist_ok=True)
+    atomic_write_json(os.path.join(dist_dir, MANIFEST), {"version": 1, "assets": manifest})
+    return manifest
+
+
+def _choose(accept, available):
+    """Mejor codificación de available que acepta el cliente (o None para enviar el fichero tal cual)"""
+    best, best_q = None, 0
+    for encoding in ("br", "gzip"):
+        if encoding in available:
+            q = accept[encoding]
+            if q > best_q:
+                best, best_q = encoding, q
+    return best
+
+
+class Assets:
+    """Manifiesto de static/dist y envío de sus ficheros con caché inmutable.
+
+    ``build_missing`` regenera dist si falta o alguna fuente es más nueva
+    que el manifiesto (útil al desarrollar; el ejecutable lo lleva ya hecho).
+    """
+
+    def __init__(self, static_dir, build_missing=True):
+        self.static_dir = static_dir
+        self.dist_dir = os.path.join(static_dir, DIST)
+        self.manifest = {}
+        self.load(build_missing)
+
+    def _stale(self):
+        try:
+            built = os.path.getmtime(os.path.join(self.dist_dir, MANIFEST))
+        except OSError:
+            return True
+        return any(os.path.getmtime(os.path.join(self.static_dir, *name.split("/"))) > built
+                   for name in sources(self.static_dir))
+
+    def load(self, build_missing=True):
+        if build_missing and self._stale():
+            try:
+                self.manifest = build(self.static_dir, self.dist_dir)
+                return
+            except OSError:
+                # static/ de solo lectura: se sirve lo que haya
+                pass
+        try:
+            with open(os.path.join(self.dist_dir, MANIFEST), encoding="utf-8") as f:
+                self.manifest = json.load(f)["assets"]
+        except (OSError, ValueError, KeyError):
+            self.manifest = {}
+
+    def url(self, name):
+        """URL de la versión con hash de static/<name> (la de static/ si no se ha generado)"""
+        from flask import url_for
+        hashed = self.manifest.get(name)
+        if hashed is None:
+            return url_for("static", filename=name)
+        return url_for("assets", filename=hashed)
+
+    def send(self, filename):
+        """Respuesta de Flask con el fichero de dist, comprimido si el cliente lo acepta"""
+        from flask import abort, request, send_file
+        from werkzeug.security import safe_join
+
+        path = safe_join(self.dist_dir, filename)
+        if path is None or filename == MANIFEST or not os.path.isfile(path):
+            abort(404)
+        available = [enc for enc, suffix in SUFFIXES.items() if os.path.exists(path + suffix)]
+        encoding = _choose(request.accept_encodings, available)
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        if mimetype.startswith("text/") or mimetype.endswith("javascript"):
+            mimetype += "; charset=utf-8"
+        response = send_file(path + SUFFIXES[encoding] if encoding else path, mimetype=mimetype, conditional=True)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.max_age = MAX_AGE
+        response.cache_control.immutable = True
+        return response
+
+
+def main(argv=None):
+    import argparse
+    import shutil
+    parser = argparse.ArgumentParser(description="Minifica, versiona y comprime los CSS y JS de static/")
+    parser.add_argument("--static-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"))
+    parser.add_argument("--clean", action="store_true", help="borra static/dist antes de generarlo")
+    args = parser.parse_args(argv)
+    if args.clean:
+        shutil.rmtree(os.path.join(args.static_dir, DIST), ignore_errors=True)
+    manifest = build(args.static_dir)
+    dist_dir = os.path.join(args.static_dir, DIST)
+    for name, hashed in manifest.items():
+        source = os.path.getsize(os.path.join(args.static_dir, *name.split("/")))
+        path = os.path.join(dist_dir, *hashed.split("/"))
+        sizes = [f"{os.path.getsize(path)} B"] + [
+            f"{enc} {os.path.getsize(path + sfx)} B" for enc, sfx in SUFFIXES.items() if os.path.exists(path + sfx)]
+        print(f"{name:<24} {source:>7} B -> {hashed}  ({', '.join(sizes)})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
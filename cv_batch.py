@@ -0,0 +1,189 @@
+"""Generación por lotes: varias plantillas guardadas y formatos en una sola pasada.
+
+Uso desde línea de comandos::
+
+    python cv_batch.py --templates all --formats md,txt [--data-dir DIR] [--zip FICHERO]
+"""
+import argparse
+import io
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from cv_core import migrate_plans, template_plan
+from cv_export import EXPORT_FORMATS, Exporter
+from cv_outputs import OutputStore
+from cv_persist import atomic_write_bytes, atomic_write_text
+from cv_render import RenderEngine, extension
+from cv_store import DocumentStore, open_cv_store, thaw
+
+# Motor, CV y exportador de cada proceso del pool (se inicializan una vez por proceso)
+_worker_engine = None
+_worker_cv = None
+_worker_exporter = None
+
+
+def output_filename(template_name, fmt):
+    safe = re.sub(r"[^\w.-]+", "_", template_name).strip("._") or "CV"
+    return f"{safe}{extension(fmt)}"
+
+
+def resolve_names(templates, names):
+    """Convierte "all" (o una lista vacía) en la lista de todas las plantillas guardadas"""
+    if not names or names == "all" or names == ["all"]:
+        return list(templates)
+    return list(names)
+
+
+def _render_one(engine, cv, templates, name, fmt, exporter=None, export_dir=None):
+    start = time.perf_counter()
+    result = {"template": name, "fmt": fmt, "filename": output_filename(name, fmt), "ms": 0.0}
+    if name not in templates:
+        result["error"] = "Plantilla no encontrada"
+        return result
+    try:
+        filtered = template_plan(templates[name]).apply(cv)
+        if fmt in EXPORT_FORMATS:
+            if exporter is None:
+                raise ValueError(f"Exportación a {fmt} no disponible")
+            result["content"] = exporter.read(engine.render(filtered, fmt="md"), fmt, export_dir)
+        else:
+            result["content"] = engine.render(filtered, fmt=fmt)
+    except Exception as e:
+        result["error"] = str(e)
+    result["ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+def _init_worker(templates_dir, cv, export=None):
+    global _worker_engine, _worker_cv, _worker_exporter
+    _worker_engine = RenderEngine(templates_dir)
+    _worker_cv = cv
+    if export is not None:
+        # Ya se está en un proceso aparte: se convierte aquí mismo
+        objects_dir, font = export
+        _worker_exporter = Exporter(objects_dir, workers=0, font=font)
+
+
+def _render_in_worker(templates, name, fmt):
+    return _render_one(_worker_engine, _worker_cv, templates, name, fmt, _worker_exporter)
+
+
+def run_batch(cv, templates, names, formats, engine, workers=4, processes=False, progress=None, exporter=None,
+              export_dir=None):
+    """Renderiza cada combinación (plantilla, formato) y devuelve los resultados en orden.
+
+    El CV debe llegar ya deduplicado (CVStore.deduped_view). Cada resultado
+    incluye el tiempo en ms y, si falla, el mensaje de error en lugar del
+    contenido. Con ``processes`` se usa un pool de procesos (el CV se envía
+    una vez a cada proceso). ``progress(hechos, total)`` se llama al recoger
+    cada resultado. Los formatos html y pdf necesitan un ``exporter`` (ver
+    cv_export) y su contenido son bytes; se convierten en ``export_dir``
+    (por defecto, la carpeta del exporter).
+    """
+    jobs = [(name, fmt) for name in resolve_names(templates, names) for fmt in formats]
+    if processes:
+        plain_cv, plain_templates = thaw(cv), thaw(templates)
+        export = (export_dir or exporter.objects_dir, exporter.font) if exporter is not None else None
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(engine.templates_dir, plain_cv, export)) as pool:
+            futures = [pool.submit(_render_in_worker, {n: plain_templates[n]} if n in plain_templates else {}, n, f)
+                       for n, f in jobs]
+            return _collect(futures, progress)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_render_one, engine, cv, templates, *job, exporter, export_dir) for job in jobs]
+        return _collect(futures, progress)
+
+
+def _collect(futures, progress):
+    results = []
+    for fut in futures:
+        results.append(fut.result())
+        if progress:
+            progress(len(results), len(futures))
+    return results
+
+
+def write_outputs(results, out_dir):
+    """Escribe en out_dir los documentos generados y les quita el contenido.
+
+    Cada fichero se sustituye de forma atómica: nunca se escribe a través de
+    un enlace duro de cv_outputs. Para guardarlos por contenido, ver
+    OutputStore.put_results.
+    """
+    for result in results:
+        content = result.pop("content", None)
+        if content is None:
+            continue
+        path = os.path.join(out_dir, result["filename"])
+        if isinstance(content, bytes):
+            atomic_write_bytes(path, content)
+        else:
+            atomic_write_text(path, (content,))
+    return results
+
+
+def zip_outputs(results):
+    """Empaqueta los documentos en un zip en memoria, con un manifest.json de tiempos y errores"""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        manifest = []
+        for result in results:
+            content = result.pop("content", None)
+            if content is not None:
+                zf.writestr(result["filename"], content)
+            manifest.append(result)
+        zf.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
+    buf.seek(0)
+    return buf
+
+
+def main(argv=None):
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Genera el CV para varias plantillas guardadas a la vez")
+    parser.add_argument("--data-dir", default=os.environ.get("CVTOOL_DATA_DIR", os.path.join(base_dir, "data")))
+    parser.add_argument("--templates", default="all", help='nombres separados por comas o "all"')
+    parser.add_argument("--formats", default="md", help="formatos separados por comas (md, txt, html, pdf)")
+    parser.add_argument("--zip", help="escribe un único zip en lugar de ficheros sueltos en output/")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--processes", action="store_true", help="usa un pool de procesos en vez de hilos")
+    args = parser.parse_args(argv)
+
+    cv = open_cv_store(args.data_dir, storage=os.environ.get("CVTOOL_STORAGE", "json"),
+                       dedup=os.environ.get("CVTOOL_DEDUP", "exact")).deduped_view()
+    templates_store = DocumentStore(os.path.join(args.data_dir, "templates.json"))
+    migrate_plans(templates_store, cv)
+    templates = templates_store.snapshot()
+    names = "all" if args.templates == "all" else [n.strip() for n in args.templates.split(",") if n.strip()]
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    engine = RenderEngine(os.path.join(base_dir, "render_templates"))
+    out_dir = os.path.join(args.data_dir, "output")
+    exporter = Exporter(os.path.join(out_dir, ".objects", "exports"), workers=0 if args.processes else args.workers,
+                        font=os.environ.get("CVTOOL_PDF_FONT"))
+
+    start = time.perf_counter()
+    try:
+        results = run_batch(cv, templates, names, formats, engine, workers=args.workers, processes=args.processes,
+                            exporter=exporter)
+    finally:
+        exporter.shutdown()
+    if args.zip:
+        with open(args.zip, "wb") as f:
+            f.write(zip_outputs(results).getvalue())
+    else:
+        os.makedirs(out_dir, exist_ok=True)
+        max_bytes = int(os.environ.get("CVTOOL_OUTPUT_MAX_MB", "200")) * 2 ** 20
+        OutputStore(out_dir, max_bytes=max_bytes).put_results(results)
+    for r in results:
+        status = f"ERROR: {r['error']}" if "error" in r else r["filename"]
+        print(f"{r['template']:<30} {r['fmt']:<4} {r['ms']:>9.2f} ms  {status}")
+    print(f"Total: {len(results)} documentos en {(time.perf_counter() - start) * 1000:.2f} ms")
+    return 1 if any("error" in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
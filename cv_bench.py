@@ -0,0 +1,301 @@
+"""Benchmarks reproducibles de la carga, filtrado, renderizado y guardado del CV.
+
+Ejemplos::
+
+    python cv_bench.py --items 100,1000,10000 --output bench.json
+    python cv_bench.py --items 1000 --compare bench.json      # compara con otro commit
+    python cv_bench.py --items 1000 --no-http --repeat 10
+    python cv_bench.py --items 1000,10000 --memory --no-http   # dicts frente a registros (cv_model)
+
+Los CVs se generan de forma determinista (``--seed``) con la forma de
+cv_store.FIELDS y ``--items`` elementos por sección; una parte de los
+"otros" son duplicados exactos para que la deduplicación tenga trabajo. Cada
+caso se ejecuta ``--repeat`` veces y se guardan el mínimo, la mediana y la
+media en ms. Las rutas HTTP se miden con el cliente de pruebas de Flask, sin
+servidor ni red. Con ``--memory`` se compara además la memoria y el acceso a
+los campos del CV guardado como dicts (como salía de json.load) y como
+registros de cv_model.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from cv_core import filter_cv_by_selection
+from cv_dedup import MODES, DedupIndex
+from cv_model import to_records
+from cv_render import RenderEngine
+from cv_store import FIELDS, SECTIONS, empty_cv, freeze, open_cv_store
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_WORDS = ("python flask jinja docker kubernetes postgres redis react vue angular api rest graphql "
+          "datos análisis diseño gestión equipo cliente proyecto plataforma rendimiento migración "
+          "automatización pruebas seguridad nube backend frontend móvil web informe formación").split()
+_PLACES = ("Madrid", "Barcelona", "Valencia", "Sevilla", "Bilbao", "Remoto")
+
+
+def _words(rng, n):
+    return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+
+def _date(rng):
+    return f"{rng.randint(2005, 2024)}-{rng.randint(1, 12):02d}"
+
+
+def _field(rng, field):
+    if field in ("tags", "tech"):
+        return rng.sample(_WORDS, 3)
+    if field in ("start", "end", "date"):
+        return _date(rng)
+    if field == "periodo":
+        return f"{_date(rng)} - {_date(rng)}"
+    if field == "location":
+        return rng.choice(_PLACES)
+    if field == "level":
+        return rng.choice(("Básico", "Intermedio", "Avanzado"))
+    if field == "hours":
+        return str(rng.randint(5, 200))
+    if field in ("description", "notes"):
+        return _words(rng, 25)
+    return _words(rng, 3).title()
+
+
+def synthetic_cv(items=100, seed=0, duplicates=0.1):
+    """CV sintético con ``items`` elementos por sección; ``duplicates`` es la fracción de "otros" repetidos"""
+    rng = random.Random(seed)
+    cv = empty_cv()
+    cv["contact"] = {"name": "Ana Pérez", "email": "ana@example.com", "phone": "+34 600 000 000",
+                     "links": ["https://example.com", "https://github.com/example"]}
+    cv["summary"] = _words(rng, 60)
+    for section in SECTIONS:
+        cv[section] = [{field: _field(rng, field) for field in FIELDS[section]} for _ in range(items)]
+    otros = cv["otros"]
+    for _ in range(int(items * duplicates)):
+        otros[rng.randrange(items)] = dict(otros[rng.randrange(items)])
+    return cv
+
+
+def half_selection(cv):
+    """Selección de la mitad de los elementos de cada sección, en orden inverso"""
+    selection = {"include_summary": True}
+    for section in SECTIONS:
+        selected = list(range(0, len(cv[section]), 2))
+        selection[section] = {"selected": selected, "order": list(reversed(range(len(selected))))}
+    return selection
+
+
+def measure(fn, repeat=5, setup=None):
+    """Ejecuta fn ``repeat`` veces (con ``setup`` antes de cada una, sin medirlo); devuelve los tiempos en ms"""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"runs": repeat, "min_ms": round(min(times), 3), "median_ms": round(statistics.median(times), 3),
+            "mean_ms": round(statistics.fmean(times), 3)}
+
+
+def bench_pipeline(cv, data_dir, repeat=5, dedup="exact"):
+    """Carga, deduplicación, filtrado, renderizado y guardado sin pasar por Flask"""
+    open_cv_store(data_dir, dedup="off").replace(cv)
+    engine = RenderEngine(os.path.join(BASE_DIR, "render_templates"))
+    store = open_cv_store(data_dir, dedup=dedup)
+    view = store.view()
+    selection = half_selection(cv)
+    index = DedupIndex(dedup)
+    cases = {
+        # Un store nuevo cada vez: lectura y parseo de cv.json más los índices
+        "load_cv": lambda: open_cv_store(data_dir, dedup=dedup).view(),
+        "dedup": lambda: index.rebuild(view),
+        "filter_cv_by_selection": lambda: filter_cv_by_selection(view, selection),
+        "render_md": lambda: engine.render(view, fmt="md"),
+        "render_txt": lambda: engine.render(view, fmt="txt"),
+        "save_cv": lambda: store.replace(cv),
+    }
+    engine.render(view, fmt="md")
+    return {name: measure(fn, repeat) for name, fn in cases.items()}
+
+
+def _traced(build):
+    """Bytes que siguen reservados tras build() mientras se conserva su resultado"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        kept = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del kept
+    return size
+
+
+def _with_view(doc):
+    return doc, freeze(doc)
+
+
+def bench_memory(cv, repeat=5):
+    """Documento en memoria y su vista congelada como dicts (el formato de json.load) frente a registros.
+
+    Con dicts la vista es una copia del documento; con registros ambos
+    comparten los mismos objetos. Devuelve (tiempos, memoria): el acceso a
+    todos los campos y el renderizado con cada representación, y los KiB y
+    bytes por elemento que ocupa cada una.
+    """
+    text = json.dumps(cv, ensure_ascii=False)
+    items = sum(len(cv[s]) for s in SECTIONS)
+    builders = {
+        "dicts": lambda: _with_view(json.loads(text)),
+        "records": lambda: _with_view(to_records(json.loads(text), FIELDS)),
+    }
+    memory = {}
+    for name, build in builders.items():
+        size = _traced(build)
+        memory[name] = {"kib": round(size / 1024, 1), "bytes_per_item": round(size / items)}
+    views = {name: build()[1] for name, build in builders.items()}
+    engine = RenderEngine(os.path.join(BASE_DIR, "render_templates"))
+    engine.render(views["dicts"], fmt="md")
+    dicts, records = views["dicts"], views["records"]
+    timings = {
+        "field_access_dicts": measure(
+            lambda: [item.get(f) for s in SECTIONS for item in dicts[s] for f in FIELDS[s]], repeat),
+        "field_access_records": measure(
+            lambda: [getattr(item, f, None) for s in SECTIONS for item in records[s] for f in FIELDS[s]], repeat),
+        "render_md_dicts": measure(lambda: engine.render(dicts, fmt="md"), repeat),
+        "render_md_records": measure(lambda: engine.render(records, fmt="md"), repeat),
+    }
+    return timings, memory
+
+
+def _load_app(data_dir):
+    os.environ["CVTOOL_DATA_DIR"] = data_dir
+    import app_dist
+    return app_dist
+
+
+def bench_http(cv, app_module, repeat=5):
+    """Rutas completas a través del cliente de pruebas de Flask"""
+    app_module.CV_STORE.replace(cv)
+    client = app_module.app.test_client()
+    selection = half_selection(cv)
+
+    def call(method, path, **kwargs):
+        response = client.open(path, method=method, **kwargs)
+        response.get_data()
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {path}: {response.status_code}")
+
+    cases = {
+        "http_preview_md": (lambda: call("GET", "/preview?fmt=md"), app_module.RENDER_CACHE.invalidate),
+        "http_preview_md_cached": (lambda: call("GET", "/preview?fmt=md"), None),
+        "http_preview_custom": (lambda: call("POST", "/preview/personalizada",
+                                             json={"selection": selection, "fmt": "md"}),
+                                app_module.RENDER_CACHE.invalidate),
+        "http_generate": (lambda: call("POST", "/generar/personalizado",
+                                       json={"selection": selection, "fmt": "txt", "outname": "CV_bench"}),
+                          app_module.RENDER_CACHE.invalidate),
+        "http_list": (lambda: call("GET", "/experience"), None),
+        "http_search": (lambda: call("GET", "/buscar?q=python&per_page=100"), None),
+    }
+    return {name: measure(fn, repeat, setup) for name, (fn, setup) in cases.items()}
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(sizes, repeat=5, seed=0, dedup="exact", http=True, memory=False):
+    """Ejecuta todos los casos para cada tamaño; devuelve el informe completo"""
+    report = {"meta": {"commit": _commit(), "python": platform.python_version(), "platform": platform.platform(),
+                       "seed": seed, "repeat": repeat, "dedup": dedup},
+              "results": []}
+    if memory:
+        report["memory"] = []
+    tmp = tempfile.mkdtemp(prefix="cvtool-bench-")
+    app_module = None
+    try:
+        app_module = _load_app(os.path.join(tmp, "app")) if http else None
+        for items in sizes:
+            cv = synthetic_cv(items, seed)
+            data_dir = os.path.join(tmp, f"items-{items}")
+            os.makedirs(data_dir)
+            timings = bench_pipeline(cv, data_dir, repeat, dedup)
+            if app_module:
+                timings.update(bench_http(cv, app_module, repeat))
+            if memory:
+                model_timings, sizes_kib = bench_memory(cv, repeat)
+                timings.update(model_timings)
+                for name, size in sizes_kib.items():
+                    report["memory"].append(dict(name=name, items=items, **size))
+                    print(f"memory_{name:<17} {items:>6} {size['kib']:>10.1f} KiB "
+                          f"({size['bytes_per_item']} B/elemento)", file=sys.stderr)
+            for name, timing in timings.items():
+                report["results"].append(dict(name=name, items=items, **timing))
+                print(f"{name:<24} {items:>6} {timing['median_ms']:>10.2f} ms", file=sys.stderr)
+    finally:
+        if app_module:
+            app_module.JOB_QUEUE.shutdown()
+        shutil.rmtree(tmp, ignore_errors=True)
+    return report
+
+
+def compare(report, baseline):
+    """Filas (caso, elementos, mediana base, mediana actual, cociente) de los casos presentes en ambos"""
+    base = {(r["name"], r["items"]): r["median_ms"] for r in baseline["results"]}
+    rows = []
+    for r in report["results"]:
+        before = base.get((r["name"], r["items"]))
+        if before is not None:
+            rows.append((r["name"], r["items"], before, r["median_ms"], round(r["median_ms"] / before, 2) if before else None))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de carga, filtrado, renderizado y guardado del CV")
+    parser.add_argument("--items", default="100,1000", help="elementos por sección, separados por comas (máx. 10000)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dedup", default="exact", choices=MODES)
+    parser.add_argument("--no-http", dest="http", action="store_false", help="no mide las rutas de Flask")
+    parser.add_argument("--memory", action="store_true", help="compara memoria y acceso a campos: dicts frente a registros")
+    parser.add_argument("--output", "-o", default="-", help='fichero JSON de resultados ("-" para stdout)')
+    parser.add_argument("--compare", help="JSON de una ejecución anterior con el que comparar")
+    args = parser.parse_args(argv)
+
+    sizes = [int(n) for n in args.items.split(",") if n.strip()]
+    if not sizes or any(not 0 < n <= 10000 for n in sizes):
+        raise SystemExit("--items debe estar entre 1 y 10000")
+    report = run(sizes, args.repeat, args.seed, args.dedup, args.http, args.memory)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["baseline"] = baseline["meta"].get("commit")
+        print(f"{'caso':<24} {'elem.':>6} {'antes ms':>10} {'ahora ms':>10} {'x':>6}", file=sys.stderr)
+        for name, items, before, after, ratio in compare(report, baseline):
+            print(f"{name:<24} {items:>6} {before:>10.2f} {after:>10.2f} {ratio:>6}", file=sys.stderr)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Renderizado de CVs desde línea de comandos, sin importar Flask ni Werkzeug.
+
+Ejemplos::
+
+    python -m cv_cli --data-dir data --template Frontend --format md --output CV.md
+    cat cv.json | python -m cv_cli --stdin --format txt > CV.txt
+
+Con ``--timing`` se escribe en stderr cuánto ha tardado cada fase, para
+vigilar el tiempo de arranque en pipelines que lo ejecutan miles de veces.
+"""
+import time
+
+_START = time.perf_counter()
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from cv_core import template_plan
+from cv_dedup import dedup_cv
+from cv_render import RenderEngine
+from cv_store import DocumentStore, open_cv_store
+
+_IMPORTED = time.perf_counter()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m cv_cli", description="Genera un CV sin arrancar el servidor web")
+    parser.add_argument("--data-dir", default=os.environ.get("CVTOOL_DATA_DIR", os.path.join(BASE_DIR, "data")))
+    parser.add_argument("--template", help="plantilla guardada en templates.json (por defecto, el CV completo)")
+    parser.add_argument("--format", default="md", choices=["md", "txt"])
+    parser.add_argument("--output", "-o", default="-", help='fichero de salida ("-" para stdout)')
+    parser.add_argument("--stdin", action="store_true", help="lee el CV en JSON desde stdin en lugar de DATA_DIR")
+    parser.add_argument("--bytecode-cache",
+                        default=os.environ.get("CVTOOL_BYTECODE_CACHE", os.path.join(tempfile.gettempdir(), "cvtool-bytecode")),
+                        help="carpeta donde reutilizar las plantillas compiladas entre ejecuciones")
+    parser.add_argument("--no-bytecode-cache", dest="bytecode_cache", action="store_const", const=None)
+    parser.add_argument("--timing", action="store_true", help="muestra en stderr el tiempo de cada fase")
+    return parser.parse_args(argv)
+
+
+def load_cv(args):
+    dedup = os.environ.get("CVTOOL_DEDUP", "exact")
+    if args.stdin:
+        return dedup_cv(json.load(sys.stdin), dedup)
+    return open_cv_store(args.data_dir, storage=os.environ.get("CVTOOL_STORAGE", "json"), dedup=dedup).deduped_view()
+
+
+def load_selection(args):
+    if not args.template:
+        return None
+    templates = DocumentStore(os.path.join(args.data_dir, "templates.json")).view()
+    if args.template not in templates:
+        raise SystemExit(f"Plantilla no encontrada: {args.template}")
+    return template_plan(templates[args.template])
+
+
+def render_to_text(cv, fmt, bytecode_cache=None):
+    engine = RenderEngine(os.path.join(BASE_DIR, "render_templates"), bytecode_cache_dir=bytecode_cache)
+    return engine.render(cv, fmt=fmt)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    timings = {"import": _IMPORTED - _START}
+
+    t = time.perf_counter()
+    cv = load_cv(args)
+    selection = load_selection(args)
+    if selection is not None:
+        cv = selection.apply(cv)
+    timings["load"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    content = render_to_text(cv, args.format, args.bytecode_cache)
+    timings["render"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    if args.output == "-":
+        sys.stdout.write(content)
+        sys.stdout.flush()
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(content)
+    timings["write"] = time.perf_counter() - t
+
+    if args.timing:
+        timings["total"] = time.perf_counter() - _START
+        print(" ".join(f"{k}={v * 1000:.2f}ms" for k, v in timings.items()), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
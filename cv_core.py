@@ -0,0 +1,132 @@
+"""Operaciones sobre el CV independientes de Flask (recuento y filtrado por selección)."""
+import json
+from collections.abc import Mapping
+
+from cv_store import SECTIONS, thaw
+
+
+def count_items(cv):
+    """Número total de elementos en las secciones del CV"""
+    return sum(len(cv.get(section) or ()) for section in SECTIONS)
+
+
+def _as_index(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+
+class SelectionPlan:
+    """Selección ya validada y normalizada, lista para aplicarse a un CV.
+
+    Para cada sección filtrada guarda la tupla final de índices del CV en el
+    orden de salida: sin posiciones ni índices repetidos, negativos o no
+    numéricos. Las secciones que la selección no menciona se copian tal cual.
+    ``key`` es su forma canónica (sirve como clave de caché) y ``to_json``
+    permite guardarla junto a la plantilla en templates.json.
+    """
+
+    VERSION = 1
+    __slots__ = ("include_summary", "sections", "key", "_max_index", "_prefix")
+
+    def __init__(self, include_summary=True, sections=None):
+        self.include_summary = bool(include_summary)
+        self.sections = {s: tuple(idx) for s, idx in (sections or {}).items() if s in SECTIONS}
+        self.key = json.dumps([self.include_summary, sorted(self.sections.items())], separators=(",", ":"))
+        self._max_index = {s: max(idx, default=-1) for s, idx in self.sections.items()}
+        # Secciones cuya selección es 0..k-1: se aplican con un simple slice
+        self._prefix = {s for s, idx in self.sections.items() if idx == tuple(range(len(idx)))}
+
+    @classmethod
+    def compile(cls, selection, cv=None):
+        """Valida y normaliza una selección; con cv también descarta índices fuera de rango"""
+        sections = {}
+        for section in SECTIONS:
+            spec = selection.get(section)
+            if not spec or "selected" not in spec:
+                continue
+            limit = len(cv.get(section) or ()) if cv is not None else float("inf")
+            selected = list(spec["selected"])
+            order = spec.get("order")
+            if order is None:
+                order = range(len(selected))
+            indices, seen_pos, seen_idx = [], set(), set()
+            for pos in order:
+                pos = _as_index(pos)
+                if not 0 <= pos < len(selected) or pos in seen_pos:
+                    continue
+                seen_pos.add(pos)
+                idx = _as_index(selected[pos])
+                if not 0 <= idx < limit or idx in seen_idx:
+                    continue
+                seen_idx.add(idx)
+                indices.append(idx)
+            sections[section] = indices
+        return cls(selection.get("include_summary", True), sections)
+
+    @classmethod
+    def from_json(cls, data):
+        if not data or data.get("v") != cls.VERSION:
+            return None
+        return cls(data.get("include_summary", True), data.get("sections"))
+
+    def to_json(self):
+        return {"v": self.VERSION, "include_summary": self.include_summary,
+                "sections": {s: list(idx) for s, idx in self.sections.items()}}
+
+    def apply(self, cv):
+        filtered_cv = {
+            "contact": cv.get("contact", {}),
+            "summary": cv.get("summary", "") if self.include_summary else ""
+        }
+        for section in SECTIONS:
+            items = cv.get(section, [])
+            indices = self.sections.get(section)
+            if indices is None:
+                filtered_cv[section] = items
+            elif section in self._prefix:
+                filtered_cv[section] = items[:len(indices)]
+            elif self._max_index[section] < len(items):
+                filtered_cv[section] = [items[i] for i in indices]
+            else:
+                # El CV ha encogido desde que se compiló la selección
+                n = len(items)
+                filtered_cv[section] = [items[i] for i in indices if i < n]
+        return filtered_cv
+
+
+def compile_selection(selection):
+    """Devuelve la selección como SelectionPlan (la compila si es un dict)"""
+    if isinstance(selection, SelectionPlan):
+        return selection
+    return SelectionPlan.compile(selection)
+
+
+def template_plan(template):
+    """Plan de una plantilla guardada: el precompilado si es válido, si no se compila su selección"""
+    return SelectionPlan.from_json(template.get("plan")) or SelectionPlan.compile(template.get("selection", {}))
+
+
+def migrate_plans(templates_store, cv):
+    """Guarda el plan de las plantillas que solo tienen la selección (guardadas antes de que existiera).
+
+    El plan se compila contra ``cv`` (el CV deduplicado actual), así que fija
+    los elementos que la plantilla seleccionaba. Devuelve cuántas se han
+    migrado.
+    """
+    migrated = 0
+    with templates_store.locked():
+        for name, template in templates_store.view().items():
+            if not isinstance(template, Mapping) or SelectionPlan.from_json(template.get("plan")) is not None:
+                continue
+            updated = thaw(template)
+            updated["plan"] = SelectionPlan.compile(updated.get("selection") or {}, cv=cv).to_json()
+            templates_store.set(name, updated)
+            migrated += 1
+    return migrated
+
+
+def filter_cv_by_selection(cv, selection):
+    """Filtra el CV basándose en la selección y orden especificados (dict o SelectionPlan)"""
+    return compile_selection(selection).apply(cv)
@@ -0,0 +1,298 @@
+"""Detección de elementos repetidos en las secciones del CV.
+
+Las firmas de cada elemento se calculan al guardar (ver cv_store.CVStore) y
+se mantienen en un índice por sección, así que las lecturas reciben el CV
+ya deduplicado sin recalcular nada. Hay tres modos:
+
+- ``exact`` (por defecto): como siempre, solo en "otros" y entre elementos
+  con el mismo título, institución y periodo (ver key_signature).
+- ``all``: en todas las secciones, entre elementos iguales en todos sus
+  campos una vez normalizados (ver signature).
+- ``fuzzy``: como ``all`` y además los casi-duplicados, con MinHash y LSH
+  por bandas sobre todos los campos.
+
+Uso desde línea de comandos, para revisar un CV importado::
+
+    python cv_dedup.py [--data-dir DIR] [--mode exact|all|fuzzy]
+"""
+import argparse
+import bisect
+import operator
+import os
+import random
+import re
+import sys
+import unicodedata
+import zlib
+from types import MappingProxyType
+
+from cv_model import FIELDS
+
+MODES = ("off", "exact", "all", "fuzzy")
+# Secciones que deduplica cada modo
+MODE_SECTIONS = {"off": (), "exact": ("otros",), "all": tuple(FIELDS), "fuzzy": tuple(FIELDS)}
+
+# 40 permutaciones en 8 bandas de 5: un par con similitud 0.8 comparte
+# alguna banda con probabilidad ~0.96 y uno con 0.5 solo ~0.2; los
+# candidatos se filtran después con la similitud estimada y la real
+NUM_PERM = 40
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+THRESHOLD = 0.8
+# Una banda compartida por tantos elementos sale de trigramas comunes a casi
+# todos ("com", "|20"...) y no distingue nada: no se consulta
+MAX_BUCKET = 64
+# Permutaciones (a*x + b) mod p con coeficientes fijos: las firmas MinHash
+# son las mismas en todos los procesos (hash() de str no lo es)
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+_PERMUTATIONS = tuple((_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(NUM_PERM))
+del _rng
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(value):
+    """Minúsculas, sin acentos ni signos de puntuación y con los espacios colapsados"""
+    text = unicodedata.normalize("NFKD", str(value)).casefold()
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(_WORD.findall(text))
+
+
+def key_signature(item):
+    """Firma de "otros" en el modo exact: título, institución (o empresa) y periodo (o inicio), sin espacios a los lados"""
+    return (str(item.get("title") or "").strip(),
+            str(item.get("institution") or item.get("company") or "").strip(),
+            str(item.get("periodo") or item.get("start") or "").strip())
+
+
+def _normalize_value(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(n for n in (normalize(v) for v in value) if n)
+    return normalize(value)
+
+
+def signature(section, item):
+    """Firma completa de un elemento: todos sus campos no vacíos, normalizados.
+
+    Dos elementos solo comparten firma si coinciden en todos los campos
+    (nivel, descripción, tecnologías...) salvo mayúsculas, acentos, signos
+    de puntuación y espacios. Un elemento sin ningún campo con contenido
+    tiene la firma vacía ``()``.
+    """
+    sig = []
+    for key in sorted(item.keys()):
+        value = _normalize_value(item.get(key))
+        if value:
+            sig.append((key, value))
+    return tuple(sig)
+
+
+def shingles(sig):
+    """Conjunto de trigramas de caracteres de una firma"""
+    text = "|".join(f"{key}={' '.join(value) if isinstance(value, tuple) else value}" for key, value in sig)
+    if len(text) <= SHINGLE_SIZE:
+        return frozenset((text,))
+    return frozenset(text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1))
+
+
+def minhash(shingle_set):
+    """Firma MinHash de NUM_PERM valores, estable entre procesos"""
+    base = [zlib.crc32(s.encode("utf-8")) for s in shingle_set]
+    return tuple(min((a * x + b) % _PRIME for x in base) for a, b in _PERMUTATIONS)
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class SectionIndex:
+    """Firmas de los elementos de una sección y qué elementos repiten a uno anterior.
+
+    Un elemento es duplicado si su firma (o, en modo fuzzy, una muy parecida)
+    ya pertenece a un elemento anterior no duplicado, así que cada decisión
+    depende solo de los elementos previos: añadir calcula una firma y editar o
+    borrar el elemento idx solo reevalúa los elementos desde idx. Los
+    elementos sin ningún campo con contenido nunca se consideran duplicados.
+    """
+
+    def __init__(self, section, mode="exact", threshold=THRESHOLD):
+        self.section = section
+        self.fuzzy = mode == "fuzzy"
+        self.sign = (lambda section, item: key_signature(item)) if mode == "exact" else signature
+        self.threshold = threshold
+        self.sigs = []
+        self.shingles = []
+        self.hashes = []
+        self.duplicate_of = {}
+        self._seen = {}
+        self._buckets = {}
+
+    def _compute(self, item):
+        sig = self.sign(self.section, item)
+        if not self.fuzzy:
+            return sig, None, None
+        sh = shingles(sig)
+        return sig, sh, minhash(sh)
+
+    def rebuild(self, items):
+        computed = [self._compute(item) for item in items]
+        self.sigs = [c[0] for c in computed]
+        self.shingles = [c[1] for c in computed]
+        self.hashes = [c[2] for c in computed]
+        self._reindex()
+
+    def append(self, item):
+        sig, sh, hashes = self._compute(item)
+        self.sigs.append(sig)
+        self.shingles.append(sh)
+        self.hashes.append(hashes)
+        self._place(len(self.sigs) - 1)
+
+    def update(self, idx, item):
+        self.sigs[idx], self.shingles[idx], self.hashes[idx] = self._compute(item)
+        self._reindex(idx)
+
+    def pop(self, idx):
+        del self.sigs[idx], self.shingles[idx], self.hashes[idx]
+        self._reindex(idx)
+
+    def _reindex(self, start=0):
+        """Olvida lo decidido para los elementos desde start y vuelve a colocarlos"""
+        if start == 0:
+            self.duplicate_of, self._seen, self._buckets = {}, {}, {}
+        else:
+            self.duplicate_of = {i: o for i, o in self.duplicate_of.items() if i < start}
+            self._seen = {sig: i for sig, i in self._seen.items() if i < start}
+            for bucket in self._buckets.values():
+                del bucket[bisect.bisect_left(bucket, start):]
+        for idx in range(start, len(self.sigs)):
+            self._place(idx)
+
+    def _bands(self, idx):
+        hashes = self.hashes[idx]
+        return [(b, hashes[b * ROWS:(b + 1) * ROWS]) for b in range(BANDS)]
+
+    def _place(self, idx):
+        if not self.sigs[idx]:
+            return
+        original = self._seen.get(self.sigs[idx])
+        if original is None and self.fuzzy:
+            original = self._near(idx)
+        if original is not None:
+            self.duplicate_of[idx] = original
+            return
+        self._seen[self.sigs[idx]] = idx
+        if self.fuzzy:
+            for band in self._bands(idx):
+                self._buckets.setdefault(band, []).append(idx)
+
+    def _near(self, idx):
+        """Primer elemento conservado con similitud >= threshold, buscando solo en sus bandas"""
+        candidates = set()
+        for band in self._bands(idx):
+            bucket = self._buckets.get(band, ())
+            if len(bucket) <= MAX_BUCKET:
+                candidates.update(bucket)
+        hashes, min_equal = self.hashes[idx], (self.threshold - 0.1) * NUM_PERM
+        for other in sorted(candidates):
+            if sum(map(operator.eq, hashes, self.hashes[other])) < min_equal:
+                continue
+            if jaccard(self.shingles[idx], self.shingles[other]) >= self.threshold:
+                return other
+        return None
+
+
+class DedupIndex:
+    """Índice de duplicados de todas las secciones, actualizado con cada operación del store"""
+
+    def __init__(self, mode="exact", threshold=THRESHOLD):
+        if mode not in MODES:
+            raise ValueError(f"Modo de deduplicado desconocido: {mode}")
+        self.mode = mode
+        self.threshold = threshold
+        self.sections = {}
+
+    def rebuild(self, doc):
+        self.sections = {}
+        if self.mode == "off":
+            return
+        for section in MODE_SECTIONS[self.mode]:
+            index = SectionIndex(section, self.mode, self.threshold)
+            index.rebuild(doc.get(section) or ())
+            self.sections[section] = index
+
+    def apply(self, doc, op):
+        """Refleja en el índice una operación ya aplicada al documento (ver cv_store.apply_op)"""
+        index = self.sections.get(op.get("section", op.get("key")))
+        if index is None:
+            return
+        items = doc.get(index.section) or ()
+        kind = op["op"]
+        if kind == "append":
+            index.append(items[-1])
+        elif kind == "extend":
+            for item in items[len(items) - len(op["items"]):]:
+                index.append(item)
+        elif kind == "update":
+            index.update(op["idx"], items[op["idx"]])
+        elif kind == "delete_item":
+            index.pop(op["idx"])
+        else:
+            index.rebuild(items)
+
+    def filter(self, view):
+        """Devuelve la vista sin los elementos duplicados (la misma vista si no hay ninguno)"""
+        changes = {}
+        for section, index in self.sections.items():
+            if index.duplicate_of:
+                items = view.get(section) or ()
+                changes[section] = tuple(item for i, item in enumerate(items) if i not in index.duplicate_of)
+        if not changes:
+            return view
+        return MappingProxyType(dict(view, **changes))
+
+    def remap(self, hits):
+        """Traduce [(sección, posición)] del CV completo a posiciones de filter(), sin los duplicados"""
+        removed = {s: sorted(index.duplicate_of) for s, index in self.sections.items() if index.duplicate_of}
+        remapped = []
+        for section, idx in hits:
+            dups = removed.get(section)
+            if dups is None:
+                remapped.append((section, idx))
+            elif idx not in self.sections[section].duplicate_of:
+                remapped.append((section, idx - bisect.bisect_left(dups, idx)))
+        return remapped
+
+    def duplicates(self):
+        """{sección: [(posición, posición del elemento al que repite)]}"""
+        return {s: sorted(index.duplicate_of.items()) for s, index in self.sections.items() if index.duplicate_of}
+
+
+def dedup_cv(cv, mode="exact"):
+    """Deduplica un CV suelto (p. ej. leído de stdin) sin pasar por un store"""
+    index = DedupIndex(mode)
+    index.rebuild(cv)
+    return index.filter(cv)
+
+
+def main(argv=None):
+    from cv_store import open_cv_store
+
+    parser = argparse.ArgumentParser(description="Lista los elementos repetidos del CV")
+    parser.add_argument("--data-dir", default=os.environ.get("CVTOOL_DATA_DIR", "data"))
+    parser.add_argument("--mode", default="fuzzy", choices=["exact", "all", "fuzzy"])
+    args = parser.parse_args(argv)
+    store = open_cv_store(args.data_dir, storage=os.environ.get("CVTOOL_STORAGE", "json"), dedup=args.mode)
+    cv = store.view()
+    found = store.duplicates()
+    for section, pairs in found.items():
+        for idx, original in pairs:
+            print(f"{section}[{idx}] repite {section}[{original}]: {signature(section, cv[section][idx])}")
+    print(f"Total: {sum(len(p) for p in found.values())} duplicados")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
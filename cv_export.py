@@ -0,0 +1,148 @@
+"""Exportación del CV a HTML y PDF a partir del Markdown ya renderizado.
+
+El Markdown (normalmente el de RenderCache) se convierte a HTML con
+``markdown`` y el HTML a PDF con ``fpdf2``, ambas bibliotecas en Python
+puro y opcionales (``pip install markdown fpdf2``). Las conversiones se
+hacen en un pool de procesos para que maquetar un PDF no ocupe los hilos
+del servidor, y su resultado se guarda según el Markdown de origen en
+``objects_dir``: volver a exportar un Markdown que no ha cambiado es buscar
+un fichero.
+"""
+import hashlib
+import html
+import os
+import threading
+
+from cv_metrics import null_timer
+from cv_persist import atomic_write_bytes
+
+EXPORT_FORMATS = ("html", "pdf")
+# Se incluye en la clave de los ficheros: subirlo invalida las exportaciones anteriores
+VERSION = 1
+
+HTML_PAGE = """<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: -apple-system, "Segoe UI", Helvetica, Arial, sans-serif; max-width: 50em; margin: 2em auto; padding: 0 1em; line-height: 1.5; color: #222; }}
+h1, h2 {{ border-bottom: 1px solid #ddd; padding-bottom: .2em; }}
+hr {{ border: 0; border-top: 1px solid #eee; }}
+</style>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+# Puntuación habitual fuera de latin-1 (las fuentes básicas del PDF no la tienen)
+_LATIN1 = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'", "–": "-", "—": "-", "…": "...", "•": "-"})
+
+
+class MissingDependency(RuntimeError):
+    pass
+
+
+def markdown_body(markdown_text):
+    """HTML del cuerpo del documento; el HTML que venga en los datos del CV se muestra como texto"""
+    try:
+        import markdown
+    except ImportError:
+        raise MissingDependency("Falta markdown para exportar a HTML/PDF: pip install markdown")
+    return markdown.markdown(html.escape(markdown_text, quote=False))
+
+
+def _title(markdown_text):
+    first = markdown_text.lstrip().split("\n", 1)[0]
+    return first.lstrip("#").strip() or "CV"
+
+
+def to_html(markdown_text):
+    return HTML_PAGE.format(title=html.escape(_title(markdown_text)), body=markdown_body(markdown_text)).encode("utf-8")
+
+
+def to_pdf(markdown_text, font=None):
+    """PDF maquetado con fpdf2; sin ``font`` (ruta a una TTF) se quitan los caracteres fuera de latin-1, como los emojis"""
+    try:
+        from fpdf import FPDF
+    except ImportError:
+        raise MissingDependency("Falta fpdf2 para exportar a PDF: pip install fpdf2")
+    body = markdown_body(markdown_text)
+    pdf = FPDF()
+    pdf.set_title(_title(markdown_text))
+    pdf.add_page()
+    if font:
+        pdf.add_font("cv", fname=font)
+        pdf.set_font("cv", size=10)
+    else:
+        body = "".join(ch for ch in body.translate(_LATIN1) if ord(ch) < 256)
+        pdf.set_font("helvetica", size=10)
+    pdf.write_html(body)
+    return bytes(pdf.output())
+
+
+def convert(markdown_text, fmt, font=None):
+    """Convierte el Markdown al formato pedido; devuelve bytes"""
+    if fmt == "html":
+        return to_html(markdown_text)
+    if fmt == "pdf":
+        return to_pdf(markdown_text, font)
+    raise ValueError(f"Formato de exportación desconocido: {fmt}")
+
+
+class Exporter:
+    """Convierte Markdown a HTML/PDF en ``workers`` procesos y guarda cada resultado por contenido.
+
+    Con ``workers=0`` convierte en el propio hilo (útil en el ejecutable
+    portable o con poca memoria). ``timer`` mide las conversiones (ver
+    cv_metrics).
+    """
+
+    def __init__(self, objects_dir, workers=2, font=None):
+        self.objects_dir = objects_dir
+        self.workers = workers
+        self.font = font
+        self.timer = null_timer
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def path(self, markdown_text, fmt, objects_dir=None):
+        """Fichero donde se guarda (o se guardará) la conversión de ese Markdown a ese formato"""
+        digest = hashlib.sha1(f"{VERSION}\0{fmt}\0{self.font or ''}\0{markdown_text}".encode("utf-8")).hexdigest()
+        return os.path.join(objects_dir or self.objects_dir, digest[:2], f"{digest}.{fmt}")
+
+    def _convert(self, markdown_text, fmt):
+        if not self.workers:
+            return convert(markdown_text, fmt, self.font)
+        with self._lock:
+            if self._pool is None:
+                # Se importan aquí: multiprocessing no hace falta hasta la primera exportación
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # spawn: los workers no heredan los hilos ni los cerrojos del servidor
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            pool = self._pool
+        return pool.submit(convert, markdown_text, fmt, self.font).result()
+
+    def export(self, markdown_text, fmt, objects_dir=None):
+        """Devuelve (ruta del fichero convertido, si es nuevo); solo convierte si ese Markdown no se había exportado ya"""
+        path = self.path(markdown_text, fmt, objects_dir)
+        if os.path.exists(path):
+            return path, False
+        with self.timer("export"):
+            data = self._convert(markdown_text, fmt)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write_bytes(path, data)
+        return path, True
+
+    def read(self, markdown_text, fmt, objects_dir=None):
+        with open(self.export(markdown_text, fmt, objects_dir)[0], "rb") as f:
+            return f.read()
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
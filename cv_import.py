@@ -0,0 +1,202 @@
+"""Importación masiva de elementos del CV desde JSON Lines o CSV.
+
+Cada registro es un elemento de una sección: un objeto JSON por línea o una
+fila de CSV con cabecera. La sección va en el campo ``section`` del registro
+o se indica para todo el fichero. Los campos se validan con
+cv_store.FIELDS y se normalizan como en los formularios (``tags`` y
+``tech`` separados por comas); los elementos repetidos, ya sea con los que
+tenía el CV o dentro del propio fichero, se descartan si coinciden en todos
+sus campos normalizados (ver cv_dedup.signature). Los registros se leen y
+validan de uno en uno sin bloquear el CV, y los aceptados se guardan en un
+fichero temporal; al final, con el CV bloqueado, se descartan los que ya
+estén en él y el resto se escribe con una sola operación
+(CVStore.extend_sections: una línea del diario o una transacción de
+SQLite): importar n elementos cuesta O(n) en disco, una subida lenta no
+bloquea a los lectores y ni otro proceso ni una caída dejan ver una
+importación a medias.
+
+Uso desde línea de comandos::
+
+    python cv_import.py cursos.csv --section courses [--data-dir DIR]
+    cat historico.jsonl | python cv_import.py - --format jsonl
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+from cv_dedup import signature
+from cv_store import FIELDS, open_cv_store
+
+FORMATS = ("jsonl", "csv")
+LIST_FIELDS = ("tags", "tech")
+# Errores que se devuelven en el resultado; a partir de ahí solo se cuentan
+MAX_ERRORS = 50
+# Bytes de registros validados que se guardan en memoria antes de pasar a disco
+SPOOL_SIZE = 1 << 20
+
+
+def guess_format(filename=None, mimetype=None):
+    """Formato según la extensión o el tipo MIME; None si no se reconoce"""
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext in (".jsonl", ".ndjson") or (mimetype or "").endswith(("ndjson", "jsonl")):
+        return "jsonl"
+    if ext == ".csv" or mimetype == "text/csv":
+        return "csv"
+    return None
+
+
+def read_records(lines, fmt):
+    """Genera (número de línea, registro) leyendo de uno en uno; un registro ilegible se genera como ValueError"""
+    if fmt == "jsonl":
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield number, ValueError(f"JSON no válido: {e}")
+                continue
+            yield number, record if isinstance(record, dict) else ValueError("Cada línea debe ser un objeto JSON")
+    elif fmt == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            if None in row:
+                yield reader.line_num, ValueError("La fila tiene más columnas que la cabecera")
+                continue
+            yield reader.line_num, row
+    else:
+        raise ValueError(f"Formato de importación desconocido: {fmt}")
+
+
+def _text(field, value):
+    if value is None:
+        return ""
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError(f"El campo {field} debe ser texto")
+    return str(value).strip()
+
+
+def parse_item(section, record):
+    """Elemento de la sección a partir de un registro, normalizado como en los formularios"""
+    fields = FIELDS[section]
+    unknown = sorted(k for k, v in record.items() if k not in fields and k != "section" and v not in (None, "", []))
+    if unknown:
+        raise ValueError(f"Campos desconocidos en {section}: {', '.join(unknown)}")
+    item = {}
+    for k in fields:
+        value = record.get(k)
+        if k in LIST_FIELDS:
+            parts = value if isinstance(value, list) else _text(k, value).split(",")
+            item[k] = [x for x in (_text(k, p) for p in parts) if x]
+        else:
+            item[k] = _text(k, value)
+    if not any(item.values()):
+        raise ValueError("Elemento vacío")
+    return item
+
+
+def parse_record(record, section=None):
+    """(sección, elemento) de un registro; la sección del registro tiene prioridad sobre la indicada"""
+    target = record.get("section") or section
+    if not isinstance(target, str) or target not in FIELDS:
+        raise ValueError(f"Sección desconocida: {target}" if target else "Falta la sección")
+    return target, parse_item(target, record)
+
+
+def _digest(sig):
+    """Resumen de una firma de cv_dedup para el conjunto de vistos"""
+    return hashlib.sha1(repr(sig).encode("utf-8")).digest()
+
+
+def import_records(store, records, section=None):
+    """Valida, deduplica y añade al CVStore los registros de read_records.
+
+    Los registros se validan y se vuelcan a un fichero temporal sin bloquear
+    el CV (una subida lenta no hace esperar a nadie); el bloqueo solo cubre la
+    comprobación contra los elementos que haya en ese momento y la escritura.
+
+    Devuelve {"accepted", "rejected", "duplicates", "sections", "errors"}:
+    los elementos añadidos por sección y los primeros MAX_ERRORS registros
+    rechazados con su línea.
+    """
+    result = {"accepted": 0, "rejected": 0, "duplicates": 0, "sections": {}, "errors": []}
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE, mode="w+", encoding="utf-8") as spool:
+        seen = set()
+        for line, record in records:
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                target, item = parse_record(record, section)
+            except ValueError as e:
+                result["rejected"] += 1
+                if len(result["errors"]) < MAX_ERRORS:
+                    result["errors"].append({"line": line, "error": str(e)})
+                continue
+            key = (target, _digest(signature(target, item)))
+            if key in seen:
+                result["duplicates"] += 1
+                continue
+            seen.add(key)
+            spool.write(json.dumps([target, item], ensure_ascii=False) + "\n")
+        if not seen:
+            return result
+        spool.seek(0)
+        with store.locked():
+            view = store.view()
+            existing = {(s, _digest(signature(s, item))) for s in FIELDS for item in view.get(s) or ()}
+            pending = {}
+            for row in spool:
+                target, item = json.loads(row)
+                if (target, _digest(signature(target, item))) in existing:
+                    result["duplicates"] += 1
+                    continue
+                pending.setdefault(target, []).append(item)
+                result["accepted"] += 1
+            if pending:
+                store.extend_sections(pending)
+    result["sections"] = {s: len(items) for s, items in pending.items()}
+    return result
+
+
+def import_stream(store, stream, fmt, section=None):
+    """Importa desde un flujo binario (p. ej. una subida) sin leerlo entero en memoria"""
+    if section is not None and section not in FIELDS:
+        raise ValueError(f"Sección desconocida: {section}")
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        return import_records(store, read_records(text, fmt), section)
+    finally:
+        text.detach()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa elementos del CV desde JSON Lines o CSV")
+    parser.add_argument("file", help='fichero a importar ("-" para stdin)')
+    parser.add_argument("--format", choices=FORMATS, help="por defecto, según la extensión del fichero")
+    parser.add_argument("--section", choices=list(FIELDS), help="sección de los registros que no la indican")
+    parser.add_argument("--data-dir", default=os.environ.get("CVTOOL_DATA_DIR", "data"))
+    args = parser.parse_args(argv)
+
+    fmt = args.format or guess_format(args.file)
+    if fmt is None:
+        parser.error("no se reconoce el formato: indica --format jsonl o --format csv")
+    store = open_cv_store(args.data_dir, storage=os.environ.get("CVTOOL_STORAGE", "json"),
+                          dedup=os.environ.get("CVTOOL_DEDUP", "exact"))
+    if args.file == "-":
+        result = import_stream(store, sys.stdin.buffer, fmt, args.section)
+    else:
+        with open(args.file, "rb") as f:
+            result = import_stream(store, f, fmt, args.section)
+    for error in result["errors"]:
+        print(f"línea {error['line']}: {error['error']}", file=sys.stderr)
+    print(f"Aceptados: {result['accepted']}  Rechazados: {result['rejected']}  Duplicados: {result['duplicates']}")
+    return 1 if result["rejected"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
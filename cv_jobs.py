@@ -0,0 +1,167 @@
+"""Cola de trabajos en segundo plano para la generación de CVs.
+
+Las peticiones de generación devuelven enseguida un identificador de
+trabajo; un pool de hilos los ejecuta y deja el resultado en OUT_DIR. La
+tabla de trabajos se guarda en DATA_DIR/jobs.json con un DocumentStore, así
+que sobrevive a reinicios y la comparten los workers de un servidor WSGI.
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from cv_store import DocumentStore, thaw
+
+PENDING = ("queued", "running")
+FINISHED = ("done", "error")
+
+
+def _pid_alive(pid):
+    if os.name == "nt":
+        # En Windows la aplicación de escritorio es un único proceso
+        return pid == os.getpid()
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """Trabajos persistentes ejecutados por un pool de ``workers`` hilos.
+
+    ``handlers`` asocia cada tipo de trabajo a una función
+    ``handler(payload, progress)`` que devuelve el resultado (serializable en
+    JSON); ``progress(hechos, total)`` es opcional. Dos peticiones idénticas
+    mientras la primera sigue en cola se agrupan en el mismo trabajo. Solo se
+    conservan los ``keep`` trabajos terminados más recientes.
+    """
+
+    def __init__(self, path, handlers, workers=2, keep=200):
+        self.store = DocumentStore(path)
+        self.handlers = handlers
+        self.keep = keep
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cv-job")
+        self._finished = threading.Condition()
+        self._resume()
+
+    @property
+    def owner(self):
+        # Se calcula cada vez: tras un fork (p. ej. gunicorn --preload) cambia el pid
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _orphaned(self, job):
+        host, _, pid = (job.get("owner") or "").rpartition(":")
+        if host != socket.gethostname():
+            return False
+        return not pid.isdigit() or not _pid_alive(int(pid))
+
+    def _resume(self):
+        """Vuelve a encolar los trabajos pendientes de procesos que ya no existen"""
+        resumed = []
+        with self.store.locked():
+            for job_id, job in self.store.view().items():
+                if job["status"] in PENDING and self._orphaned(job):
+                    self.store.set(job_id, dict(thaw(job), status="queued", owner=self.owner))
+                    resumed.append(job_id)
+        for job_id in resumed:
+            self._pool.submit(self._run, job_id)
+
+    def submit(self, kind, payload):
+        """Encola un trabajo; devuelve (trabajo, creado). Si ya hay uno idéntico en cola, devuelve ese"""
+        if kind not in self.handlers:
+            raise ValueError(f"Tipo de trabajo desconocido: {kind}")
+        key = kind + ":" + json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        with self.store.locked():
+            for job in self.store.view().values():
+                if job["key"] == key and job["status"] == "queued":
+                    return thaw(job), False
+            job = {
+                "id": uuid.uuid4().hex,
+                "kind": kind,
+                "payload": payload,
+                "key": key,
+                "status": "queued",
+                "progress": 0.0,
+                "result": None,
+                "error": None,
+                "created": time.time(),
+                "started": None,
+                "finished": None,
+                "owner": self.owner,
+            }
+            self.store.set(job["id"], job)
+            self._prune()
+        self._pool.submit(self._run, job["id"])
+        return job, True
+
+    def _prune(self):
+        finished = sorted((job["created"], job_id) for job_id, job in self.store.view().items()
+                          if job["status"] in FINISHED)
+        for _, job_id in finished[:max(len(finished) - self.keep, 0)]:
+            self.store.delete(job_id)
+
+    def _update(self, job_id, **fields):
+        with self.store.locked():
+            job = self.store.view().get(job_id)
+            if job is None:
+                return None
+            job = dict(thaw(job), **fields)
+            self.store.set(job_id, job)
+            return job
+
+    def _run(self, job_id):
+        with self.store.locked():
+            job = self.store.view().get(job_id)
+            # Otro proceso puede haberlo recuperado y empezado ya
+            if job is None or job["status"] != "queued":
+                return
+            job = self._update(job_id, status="running", started=time.time(), owner=self.owner)
+        last = [0.0]
+
+        def progress(done, total):
+            # Como mucho dos escrituras por segundo en la tabla de trabajos
+            now = time.monotonic()
+            if total and (done == total or now - last[0] >= 0.5):
+                last[0] = now
+                self._update(job_id, progress=round(done / total, 3))
+
+        try:
+            result = self.handlers[job["kind"]](job["payload"], progress)
+        except Exception as e:
+            self._update(job_id, status="error", error=str(e), finished=time.time())
+        else:
+            self._update(job_id, status="done", progress=1.0, result=result, finished=time.time())
+        with self._finished:
+            self._finished.notify_all()
+
+    def get(self, job_id):
+        job = self.store.view().get(job_id)
+        return thaw(job) if job is not None else None
+
+    def list(self, limit=50, where=None):
+        """Trabajos más recientes primero (solo los que cumplen ``where``, si se indica)"""
+        jobs = sorted(self.store.view().values(), key=lambda job: job["created"], reverse=True)
+        if where is not None:
+            jobs = [job for job in jobs if where(job)]
+        return [thaw(job) for job in jobs[:limit]]
+
+    def wait(self, job_id, timeout):
+        """Espera hasta timeout segundos a que el trabajo termine; devuelve su estado actual"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] in FINISHED or remaining <= 0:
+                return job
+            # Los trabajos de otros procesos no avisan: se vuelve a mirar cada medio segundo
+            with self._finished:
+                self._finished.wait(min(remaining, 0.5))
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,106 @@
+"""Prueba de carga: peticiones por segundo de la vista previa y de la generación.
+
+Con el servidor ya arrancado (p. ej. ``python cv_wsgi.py --threads 8``)::
+
+    python cv_loadtest.py --url http://127.0.0.1:8000 --requests 500 --concurrency 16
+    python cv_loadtest.py --scenarios preview,generate --json
+
+Cada escenario se lanza por separado con ``concurrency`` clientes que
+reutilizan su conexión. Se muestran peticiones/s, latencias p50/p95/máx y
+errores (respuestas que no son 2xx/304 o fallos de conexión).
+"""
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+SCENARIOS = {
+    "preview": ("GET", "/preview?fmt=md", None),
+    "preview_custom": ("POST", "/preview/personalizada", {"selection": {}, "fmt": "md"}),
+    "preview_fragments": ("POST", "/preview/fragmentos", {"selection": {}, "fmt": "md", "known": {}}),
+    "generate": ("POST", "/generar/personalizado", {"selection": {}, "fmt": "md", "outname": "CV_loadtest"}),
+}
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _client(url, method, path, body, count, latencies, errors):
+    parts = urlsplit(url)
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=data, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def run_scenario(url, name, requests=200, concurrency=8):
+    """Lanza ``requests`` peticiones del escenario repartidas entre ``concurrency`` hilos"""
+    method, path, body = SCENARIOS[name]
+    latencies, errors = [], []
+    per_client = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+    threads = [threading.Thread(target=_client, args=(url, method, path, body, n, latencies, errors))
+               for n in per_client if n]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "max_ms": round(max(latencies, default=0) * 1000, 2),
+        "errors": len(errors),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide peticiones/s de la vista previa y la generación")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=200, help="peticiones por escenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="separados por comas")
+    parser.add_argument("--json", action="store_true", help="imprime los resultados en JSON")
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Escenarios desconocidos: {', '.join(unknown)}")
+    results = [run_scenario(args.url, name, args.requests, args.concurrency) for name in names]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'escenario':<20} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'máx ms':>8} {'errores':>8}")
+        for r in results:
+            print(f"{r['scenario']:<20} {r['rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['max_ms']:>8} {r['errors']:>8}")
+    return 1 if any(r["errors"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""Instrumentación opcional: tiempos por fase, cabecera Server-Timing, métricas Prometheus y perfiles.
+
+Las fases (carga, deduplicación, filtrado, compilación, renderizado,
+guardado...) se miden con ``Metrics.timer``; DocumentStore y RenderEngine
+llaman a su atributo ``timer``, que por defecto es ``null_timer`` y no hace
+nada. Con las métricas activadas cada respuesta lleva una cabecera
+Server-Timing con lo que ha tardado cada fase en esa petición, y
+``Metrics.render`` devuelve histogramas y contadores en el formato de texto
+de Prometheus. En las respuestas por trozos la cabecera solo cubre lo
+ocurrido antes de enviar el primero.
+"""
+import bisect
+import contextlib
+import contextvars
+import os
+import threading
+import time
+import uuid
+
+# Límites (en segundos) de los histogramas de latencia
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Fases medidas durante la petición en curso: {fase: segundos}
+_spans = contextvars.ContextVar("cvtool_spans", default=None)
+
+
+def null_timer(stage):
+    return contextlib.nullcontext()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def server_timing(spans, total):
+    """Valor de la cabecera Server-Timing (duraciones en ms)"""
+    parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in spans.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Histogramas y contadores en memoria de un proceso.
+
+    Con ``enabled=False`` timer/timed/timed_iter no miden nada, así que la
+    aplicación puede usarlos siempre. ``collect`` registra valores que se
+    leen al exportar (p. ej. los aciertos de una caché).
+    """
+
+    def __init__(self, enabled=False, buckets=BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = []
+        self._help = {}
+        self._lock = threading.Lock()
+        self.describe("cvtool_stage_seconds", "histogram", "Duración de cada fase (carga, dedup, filtrado, renderizado...)")
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def collect(self, name, kind, text, fn):
+        """Registra una métrica cuyo valor devuelve fn() en el momento de exportar"""
+        self.describe(name, kind, text)
+        self._collectors.append((name, fn))
+
+    def record(self, stage, seconds):
+        self.observe("cvtool_stage_seconds", seconds, stage=stage)
+        spans = _spans.get()
+        if spans is not None:
+            spans[stage] = spans.get(stage, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def _timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def timer(self, stage):
+        """Context manager que mide una fase"""
+        return self._timer(stage) if self.enabled else contextlib.nullcontext()
+
+    def timed(self, stage):
+        """Decorador que mide cada llamada a la función como la fase ``stage``"""
+        def decorator(fn):
+            if not self.enabled:
+                return fn
+            def wrapper(*args, **kwargs):
+                with self._timer(stage):
+                    return fn(*args, **kwargs)
+            wrapper.__name__, wrapper.__doc__, wrapper.__wrapped__ = fn.__name__, fn.__doc__, fn
+            return wrapper
+        return decorator
+
+    def timed_iter(self, stage, chunks):
+        """Mide el tiempo que se tarda en producir los trozos de un generador"""
+        if not self.enabled:
+            return chunks
+        def generate():
+            it, elapsed = iter(chunks), 0.0
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        chunk = next(it)
+                    except StopIteration:
+                        return
+                    finally:
+                        elapsed += time.perf_counter() - start
+                    yield chunk
+            finally:
+                self.record(stage, elapsed)
+        return generate()
+
+    def start_request(self):
+        return _spans.set({})
+
+    def finish_request(self, token):
+        spans = _spans.get() or {}
+        _spans.reset(token)
+        return spans
+
+    def render(self):
+        """Todas las métricas en el formato de texto de Prometheus"""
+        with self._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+        samples = {}
+        for (name, labels), (counts, total, count) in sorted(histograms.items()):
+            lines = samples.setdefault(name, [])
+            cumulative = 0
+            for le, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_labels(labels, le=le)} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels, le='+Inf')} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        for (name, labels), value in sorted(counters.items()):
+            samples.setdefault(name, []).append(f"{name}{_labels(labels)} {value}")
+        for name, fn in self._collectors:
+            samples.setdefault(name, []).append(f"{name} {fn()}")
+        out = []
+        for name, lines in samples.items():
+            kind, text = self._help.get(name, ("untyped", ""))
+            out.append(f"# HELP {name} {text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(lines)
+        return "\n".join(out) + "\n"
+
+
+def _prune_profiles(profile_dir, keep):
+    names = sorted(n for n in os.listdir(profile_dir) if n.endswith(".prof"))
+    for name in names[:max(len(names) - keep, 0)]:
+        with contextlib.suppress(OSError):
+            os.remove(os.path.join(profile_dir, name))
+
+
+def instrument(app, metrics, profile="", profile_dir=None, keep=50):
+    """Engancha a la aplicación Flask las métricas por petición y, si se pide, los perfiles con cProfile.
+
+    ``profile`` puede ser "all" (perfila todas las peticiones) o "query"
+    (solo las que llevan ?profile=1). Los perfiles se guardan en profile_dir
+    (se conservan los ``keep`` últimos) y el nombre del fichero se devuelve
+    en la cabecera X-Profile. Se perfila una petición cada vez.
+    """
+    from flask import g, request
+
+    if metrics.enabled:
+        metrics.describe("cvtool_request_seconds", "histogram", "Duración de las peticiones por endpoint")
+        metrics.describe("cvtool_requests_total", "counter", "Peticiones atendidas por endpoint, método y estado")
+
+        @app.before_request
+        def _start_timing():
+            g.metrics_start = time.perf_counter()
+            g.metrics_token = metrics.start_request()
+
+        @app.after_request
+        def _server_timing(response):
+            start = g.pop("metrics_start", None)
+            if start is None:
+                return response
+            spans = metrics.finish_request(g.pop("metrics_token"))
+            total = time.perf_counter() - start
+            endpoint = request.endpoint or "none"
+            metrics.observe("cvtool_request_seconds", total, endpoint=endpoint)
+            metrics.inc("cvtool_requests_total", endpoint=endpoint, method=request.method,
+                        status=response.status_code)
+            response.headers["Server-Timing"] = server_timing(spans, total)
+            return response
+
+    if profile in ("all", "query"):
+        os.makedirs(profile_dir, exist_ok=True)
+        busy = threading.Lock()
+
+        @app.before_request
+        def _start_profile():
+            if profile == "query" and request.args.get("profile") != "1":
+                return
+            if not busy.acquire(blocking=False):
+                return
+            import cProfile
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Ya hay otro perfilador activo en el proceso
+                busy.release()
+                return
+            g.profiler = profiler
+
+        @app.after_request
+        def _dump_profile(response):
+            profiler = g.pop("profiler", None)
+            if profiler is None:
+                return response
+            profiler.disable()
+            try:
+                name = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint or 'none'}-{uuid.uuid4().hex[:6]}.prof"
+                profiler.dump_stats(os.path.join(profile_dir, name))
+                _prune_profiles(profile_dir, keep)
+                response.headers["X-Profile"] = name
+            finally:
+                busy.release()
+            return response
+
+        @app.teardown_request
+        def _stop_profile(exc):
+            # Si la petición ha fallado after_request no se llama: se suelta aquí
+            profiler = g.pop("profiler", None)
+            if profiler is not None:
+                profiler.disable()
+                busy.release()
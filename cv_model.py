@@ -0,0 +1,174 @@
+"""Registros compactos de los elementos de las secciones del CV.
+
+Cada sección de FIELDS tiene su clase de registro con ``__slots__``: un
+elemento ocupa unos pocos punteros en vez de un dict, y las plantillas leen
+``exp.title`` como un atributo, sin pasar por la búsqueda de claves. Los
+registros son inmutables (se sustituyen al editar), así que el documento en
+memoria y las vistas congeladas comparten los mismos objetos. Las cadenas
+de ``tags``, ``tech`` y otros campos con pocos valores distintos se
+internan: cada valor se guarda una sola vez por proceso.
+
+Los registros se comportan como un mapping de solo lectura (``get``,
+``item["x"]``, ``items()``...) y se convierten al formato JSON de siempre
+con ``to_dict``; un campo que no estaba en el dict tampoco está en el
+registro. Las claves que no son de la sección se conservan aparte.
+"""
+import sys
+from collections.abc import Mapping
+from types import MappingProxyType
+
+# Campos editables de cada sección (los de tags/tech son listas)
+FIELDS = {
+ "skills":["name","level","tags"],
+ "experience":["title","company","location","start","end","description","tech"],
+ "projects":["title","company","location","start","end","description","tech"],
+ "education":["degree","institution","start","end","notes"],
+ "courses":["name","issuer","date","hours","credential","tags"],
+ "otros":["title","institution","start","end","periodo","description","tags"]
+}
+
+LIST_FIELDS = ("tags", "tech")
+# Campos con un vocabulario pequeño que se repite entre elementos
+INTERNED_FIELDS = LIST_FIELDS + ("level", "location", "company", "institution", "issuer")
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, (dict, MappingProxyType)):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _intern(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(sys.intern(v) if isinstance(v, str) else _freeze(v) for v in value)
+    return _freeze(value)
+
+
+class Record:
+    """Base de los registros de cada sección (ver RECORD_TYPES)"""
+
+    __slots__ = ("_extra",)
+    SECTION = None
+    FIELDS = ()
+    _field_set = frozenset()
+
+    def __init__(self, data=()):
+        setattr_ = object.__setattr__
+        fields, extra = self._field_set, None
+        for key, value in (data.items() if isinstance(data, Mapping) else data):
+            if key in fields:
+                setattr_(self, key, _intern(value) if key in INTERNED_FIELDS else _freeze(value))
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = _freeze(value)
+        setattr_(self, "_extra", extra)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} es inmutable: usa replace()")
+
+    __delattr__ = __setattr__
+
+    def __reduce__(self):
+        return record, (self.SECTION, self.to_dict())
+
+    def replace(self, fields):
+        """Copia del registro con los campos de fields cambiados"""
+        data = dict(self.items())
+        data.update(fields)
+        return type(self)(data)
+
+    def to_dict(self):
+        """El elemento en el formato JSON de cv.json"""
+        return {k: _thaw(v) for k, v in self.items()}
+
+    def get(self, key, default=None):
+        if key in self._field_set:
+            return getattr(self, key, default)
+        return self._extra.get(key, default) if self._extra else default
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in self._field_set:
+            return hasattr(self, key)
+        return bool(self._extra) and key in self._extra
+
+    def keys(self):
+        keys = [f for f in self.FIELDS if hasattr(self, f)]
+        if self._extra:
+            keys.extend(self._extra)
+        return keys
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def values(self):
+        return [self[k] for k in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, Mapping)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+Mapping.register(Record)
+
+
+def _record_type(section, fields):
+    name = "".join(part.title() for part in section.split("_")) + "Record"
+    return type(name, (Record,), {"__slots__": tuple(fields), "SECTION": section, "FIELDS": tuple(fields),
+                                  "_field_set": frozenset(fields)})
+
+
+RECORD_TYPES = {section: _record_type(section, fields) for section, fields in FIELDS.items()}
+
+
+def record(section, data):
+    """Registro de la sección a partir de un dict (o el mismo registro si ya lo es)"""
+    cls = RECORD_TYPES[section]
+    if type(data) is cls:
+        return data
+    return cls(data)
+
+
+def to_records(doc, sections):
+    """Convierte en registros, en el sitio, los elementos de las secciones del documento"""
+    for section in sections:
+        items = doc.get(section)
+        if isinstance(items, list):
+            cls = RECORD_TYPES[section]
+            doc[section] = [cls(item) if isinstance(item, Mapping) and type(item) is not cls else item
+                            for item in items]
+    return doc
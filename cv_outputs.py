@@ -0,0 +1,207 @@
+"""Carpeta de salida con los documentos guardados por contenido.
+
+Cada documento generado se guarda una sola vez en ``.objects/`` con el hash
+SHA-1 de su contenido como nombre; el nombre legible (``CV.md``,
+``Frontend.pdf``...) es un enlace duro a ese objeto y ``.manifest.json``
+apunta cada nombre a su objeto. Volver a generar un documento que no ha
+cambiado no escribe nada en disco, dos peticiones con el mismo nombre
+nunca dejan un fichero a medias (se sustituye de forma atómica) y, cuando
+los objetos superan el tamaño máximo, se borran los usados hace más tiempo.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+from cv_store import DocumentStore
+
+# Al recoger basura se baja hasta esta fracción del límite, para no recoger en cada escritura
+GC_TARGET = 0.8
+
+
+def publish(source, dest):
+    """Deja en dest el fichero source (un enlace duro si se puede, si no una copia), sustituyendo el anterior"""
+    directory = os.path.dirname(os.path.abspath(dest))
+    tmp = os.path.join(directory, f".{os.path.basename(dest)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        try:
+            os.link(source, tmp)
+        except OSError:
+            shutil.copyfile(source, tmp)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def safe_name(name):
+    """Nombre de fichero sin carpetas; los que empiezan por punto están reservados"""
+    base = os.path.basename(name.replace("\\", "/"))
+    if not base or base.startswith("."):
+        raise ValueError(f"Nombre de fichero no válido: {name!r}")
+    return base
+
+
+class OutputStore:
+    """Documentos de ``out_dir`` guardados por contenido, con un máximo de ``max_bytes`` en objetos"""
+
+    def __init__(self, out_dir, max_bytes=200 * 2 ** 20):
+        self.out_dir = out_dir
+        self.objects_dir = os.path.join(out_dir, ".objects")
+        self.max_bytes = max_bytes
+        self.manifest = DocumentStore(os.path.join(out_dir, ".manifest.json"))
+        self._size = None
+        self._lock = threading.Lock()
+
+    def object_path(self, digest, ext):
+        return os.path.join(self.objects_dir, digest[:2], digest + ext)
+
+    def put_text(self, name, chunks, digest=None):
+        """Guarda el texto (uno o varios trozos) como name.
+
+        Si se conoce el SHA-1 del contenido (p. ej. el ETag de RenderCache) y
+        ese objeto ya existe, los trozos ni se recorren.
+        """
+        name = safe_name(name)
+        ext = os.path.splitext(name)[1]
+        if digest is None or not os.path.exists(self.object_path(digest, ext)):
+            digest = self._store((chunk.encode("utf-8") for chunk in chunks), ext)
+        return self._link(name, self.object_path(digest, ext), digest)
+
+    def put_bytes(self, name, data):
+        name = safe_name(name)
+        ext = os.path.splitext(name)[1]
+        digest = self._store((data,), ext)
+        return self._link(name, self.object_path(digest, ext), digest)
+
+    def put_file(self, name, path, new=False):
+        """Publica como name un fichero que ya está dentro de .objects (p. ej. una exportación, ver cv_export)"""
+        if new:
+            self._grow(os.path.getsize(path), path)
+        sha = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                sha.update(block)
+        return self._link(safe_name(name), path, sha.hexdigest())
+
+    def put_results(self, results):
+        """Guarda los documentos de cv_batch.run_batch y les quita el contenido"""
+        for result in results:
+            content = result.pop("content", None)
+            if isinstance(content, bytes):
+                self.put_bytes(result["filename"], content)
+            elif content is not None:
+                self.put_text(result["filename"], (content,))
+        return results
+
+    def _store(self, pieces, ext):
+        os.makedirs(self.objects_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.objects_dir)
+        try:
+            sha, size = hashlib.sha1(), 0
+            with os.fdopen(fd, "wb") as f:
+                for data in pieces:
+                    sha.update(data)
+                    size += len(data)
+                    f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            digest = sha.hexdigest()
+            path = self.object_path(digest, ext)
+            if os.path.exists(path):
+                os.remove(tmp)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp, path)
+                self._grow(size, path)
+            return digest
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _link(self, name, path, etag):
+        entry = {"object": os.path.relpath(path, self.objects_dir).replace(os.sep, "/"), "etag": etag,
+                 "size": os.path.getsize(path)}
+        dest = os.path.join(self.out_dir, name)
+        # Marca el objeto como recién usado para la recogida de basura
+        os.utime(path)
+        with self.manifest.locked():
+            current = self.manifest.view().get(name)
+            if current is not None and current["object"] == entry["object"] and os.path.exists(dest):
+                return name
+            publish(path, dest)
+            self.manifest.set(name, entry)
+        return name
+
+    def lookup(self, name):
+        """(ruta del objeto, etag) del documento name, o None si no está en el manifiesto"""
+        entry = self.manifest.view().get(name)
+        if entry is None:
+            return None
+        path = os.path.join(self.objects_dir, *entry["object"].split("/"))
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path, entry["etag"]
+
+    def _objects(self):
+        """[(mtime, tamaño, ruta)] de todos los objetos"""
+        found = []
+        for root, _, files in os.walk(self.objects_dir):
+            for f in files:
+                if f.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, f)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found.append((st.st_mtime, st.st_size, path))
+        return found
+
+    def _grow(self, size, path):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._objects())
+            else:
+                self._size += size
+            over = self._size > self.max_bytes
+        if over:
+            # El objeto recién guardado nunca se borra, aunque él solo supere el límite
+            self.gc(keep=path)
+
+    def gc(self, keep=None):
+        """Borra los objetos usados hace más tiempo (y los nombres que apuntan a ellos) hasta bajar del límite.
+
+        ``keep`` es un objeto que no se borra. Devuelve el número de objetos borrados.
+        """
+        with self.manifest.locked():
+            objects = sorted(self._objects())
+            total = sum(size for _, size, _ in objects)
+            removed = set()
+            if total > self.max_bytes:
+                for _, size, path in objects:
+                    if total <= self.max_bytes * GC_TARGET:
+                        break
+                    if path == keep:
+                        continue
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        continue
+                    total -= size
+                    removed.add(os.path.relpath(path, self.objects_dir).replace(os.sep, "/"))
+                for name, entry in self.manifest.view().items():
+                    if entry["object"] in removed:
+                        try:
+                            os.remove(os.path.join(self.out_dir, name))
+                        except OSError:
+                            pass
+                        self.manifest.delete(name)
+            with self._lock:
+                self._size = total
+            return len(removed)
@@ -0,0 +1,276 @@
+"""Persistencia en disco de los documentos JSON: escritura atómica, diario de cambios y cerrojos."""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock_fd(fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                # LK_LOCK ya reintenta durante unos 10 s antes de fallar
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    def _unlock_fd(fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock_fd(fd):
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def _unlock_fd(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class FileLock:
+    """Cerrojo exclusivo entre procesos sobre un fichero auxiliar (p. ej. cv.json.lock).
+
+    Es reentrante dentro del mismo hilo y también excluye a los demás hilos
+    del proceso, así que puede anidarse con el cerrojo del DocumentStore.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._depth = 0
+        self._thread_lock = threading.RLock()
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    _lock_fd(fd)
+                except BaseException:
+                    os.close(fd)
+                    raise
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                _unlock_fd(self._fd)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        self._thread_lock.release()
+
+
+def _to_json(obj):
+    # Registros de las secciones del CV (ver cv_model)
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is None:
+        raise TypeError(f"{type(obj).__name__} no se puede guardar como JSON")
+    return to_dict()
+
+
+def atomic_write_json(path, doc):
+    """Escribe doc en path sin dejar nunca un fichero a medias.
+
+    Se escribe en un temporal del mismo directorio, se hace fsync y se
+    sustituye el original con os.replace.
+    """
+    _atomic_write(path, lambda f: json.dump(doc, f, ensure_ascii=False, indent=2, default=_to_json))
+
+
+def atomic_write_text(path, chunks):
+    """Como atomic_write_json, pero escribiendo los trozos de texto según llegan"""
+    _atomic_write(path, lambda f: f.writelines(chunks))
+
+
+def atomic_write_bytes(path, data):
+    _atomic_write(path, lambda f: f.write(data), binary=True)
+
+
+def _atomic_write(path, write, binary=False):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with (os.fdopen(fd, "wb") if binary else os.fdopen(fd, "w", encoding="utf-8")) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(directory)
+
+
+def _fsync_dir(directory):
+    # En Windows no se pueden abrir directorios; allí basta con os.replace
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class Journal:
+    """Diario append-only de operaciones en formato JSON Lines.
+
+    La primera línea es una cabecera con el SHA-1 del fichero base sobre el
+    que se aplican las operaciones (ver JSONFileBackend.load).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = None
+        # Cabecera leída por read(); None en diarios anteriores a la cabecera
+        self.header = None
+
+    def read(self):
+        """Operaciones completas del diario.
+
+        Si la última línea quedó cortada por una caída durante la escritura,
+        se recorta el fichero hasta el final de la última línea completa:
+        si no, la siguiente operación se añadiría pegada a ese trozo y se
+        perdería al releer, junto con todas las posteriores.
+        """
+        ops, good, self.header = [], 0, None
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("línea incompleta")
+                        op = json.loads(line)
+                    except ValueError:
+                        break
+                    if good == 0 and isinstance(op, dict) and "journal" in op:
+                        self.header = op
+                    else:
+                        ops.append(op)
+                    good += len(line)
+                torn = f.seek(0, os.SEEK_END) > good
+        except FileNotFoundError:
+            torn = False
+        if torn:
+            with open(self.path, "r+b") as f:
+                f.truncate(good)
+                f.flush()
+                os.fsync(f.fileno())
+        self.entries = len(ops)
+        return ops
+
+    def append(self, op, base=None):
+        """Añade op; si el diario está vacío, antes escribe la cabecera con base (SHA-1 del fichero base)"""
+        line = json.dumps(op, ensure_ascii=False) + "\n"
+        with open(self.path, "a", encoding="utf-8") as f:
+            if f.tell() == 0:
+                line = json.dumps({"journal": 1, "base": base}) + "\n" + line
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        if self.entries is None:
+            # Diario que no se ha leído (documento nuevo): se cuentan sus operaciones una vez
+            self.read()
+        else:
+            self.entries += 1
+
+    def truncate(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        self.entries = 0
+        self.header = None
+
+
+class JSONFileBackend:
+    """Guarda un documento como fichero JSON más un diario de cambios.
+
+    Cada modificación se añade al diario (coste proporcional al cambio, no al
+    documento) y cada ``compact_every`` operaciones se reescribe el fichero
+    base de forma atómica y se vacía el diario. Con ``journal=False`` cada
+    cambio reescribe el fichero completo, también de forma atómica.
+
+    El diario empieza con el SHA-1 del fichero base sobre el que se escribió.
+    Si una caída deja el diario tras reescribir la base (que ya incluye sus
+    operaciones), al leer no coincide con la base nueva y se descarta en vez
+    de volver a aplicarse.
+    """
+
+    def __init__(self, path, journal=True, compact_every=200):
+        self.path = path
+        self.journal = Journal(path + ".journal") if journal else None
+        self.compact_every = compact_every
+        self._lock = FileLock(path + ".lock")
+        # SHA-1 del fichero base leído o escrito por última vez (None si no existe)
+        self._base = None
+
+    def lock(self):
+        """Cerrojo entre procesos que protege el fichero base y su diario"""
+        return self._lock
+
+    def stamp(self):
+        """Identifica la versión en disco; None si el documento no existe"""
+        base = _file_stamp(self.path)
+        log = _file_stamp(self.journal.path) if self.journal else None
+        if base is None and log is None:
+            return None
+        return (base, log)
+
+    def load(self, default, apply_op):
+        """Lee el fichero base y reaplica las operaciones pendientes del diario"""
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            doc, self._base = default(), None
+        else:
+            doc, self._base = json.loads(data), hashlib.sha1(data).hexdigest()
+        if self.journal:
+            ops = self.journal.read()
+            header = self.journal.header
+            if header is not None and header.get("base") != self._base:
+                # Diario de una base anterior: la compactación ya lo incluyó y se cayó antes de vaciarlo
+                self.journal.truncate()
+                ops = []
+            for op in ops:
+                apply_op(doc, op)
+        return doc
+
+    def commit(self, op, doc):
+        if self.journal is None:
+            atomic_write_json(self.path, doc)
+            return
+        self.journal.append(op, base=self._base)
+        if self.journal.entries is not None and self.journal.entries >= self.compact_every:
+            self.write_all(doc)
+
+    def write_all(self, doc):
+        data = json.dumps(doc, ensure_ascii=False, indent=2, default=_to_json).encode("utf-8")
+        atomic_write_bytes(self.path, data)
+        self._base = hashlib.sha1(data).hexdigest()
+        if self.journal:
+            self.journal.truncate()
@@ -0,0 +1,159 @@
+"""Modo multiperfil: varios CVs independientes servidos por la misma aplicación.
+
+Cada perfil vive en DATA_DIR/profiles/<id>/ con su cv.json, templates.json
+y carpeta de salida, y se sirve bajo /p/<id>/... ProfileMiddleware pasa ese
+prefijo de la ruta a SCRIPT_NAME (así url_for genera enlaces dentro del
+perfil) y fija el perfil de la petición. Solo los perfiles usados más
+recientemente se mantienen abiertos, con sus documentos parseados y sus
+cachés de renderizado; los demás se vuelven a abrir desde disco al pedirlos,
+de modo que la memoria no crece con el número de perfiles.
+"""
+import contextlib
+import contextvars
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from werkzeug.exceptions import NotFound
+
+from cv_core import migrate_plans
+from cv_outputs import OutputStore
+from cv_render import RenderCache
+from cv_store import DocumentStore, open_cv_store
+
+PROFILE_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+PREFIX = "/p/"
+
+
+class Profile:
+    """Documentos, cachés de renderizado y carpeta de salida de un perfil (id None: el de DATA_DIR)"""
+
+    def __init__(self, profile_id, data_dir, storage="json", dedup="exact", render_cache_size=64,
+                 fragment_cache_size=512, output_max_bytes=200 * 2 ** 20, timer=None):
+        self.id = profile_id
+        self.data_dir = data_dir
+        self.out_dir = os.path.join(data_dir, "output")
+        os.makedirs(self.out_dir, exist_ok=True)
+        # Documentos generados, guardados por contenido (ver cv_outputs)
+        self.outputs = OutputStore(self.out_dir, max_bytes=output_max_bytes)
+        # Documentos parseados en memoria: solo se releen del disco si cambian
+        self.cv = open_cv_store(data_dir, storage=storage, dedup=dedup)
+        self.templates = DocumentStore(os.path.join(data_dir, "templates.json"))
+        # Documentos ya renderizados; se vacía cada vez que cambia el CV
+        self.render_cache = RenderCache(maxsize=render_cache_size)
+        self.cv.on_change(self.render_cache.invalidate)
+        # Bloques sueltos de la vista previa; su clave incluye la revisión de su sección
+        self.fragment_cache = RenderCache(maxsize=fragment_cache_size)
+        if timer is not None:
+            self.cv.timer = timer
+        self._plans_migrated = False
+
+    def templates_view(self):
+        """Plantillas guardadas; la primera vez añade el plan a las que no lo tienen (ver cv_core.migrate_plans)"""
+        if not self._plans_migrated:
+            migrate_plans(self.templates, self.cv.deduped_view())
+            self._plans_migrated = True
+        return self.templates.view()
+
+
+class ProfileRegistry:
+    """Perfiles de ``root`` abiertos bajo demanda, con un LRU de como mucho ``maxsize``.
+
+    ``factory(id, data_dir)`` crea el Profile; ``default`` es el perfil que
+    se usa fuera de /p/<id>/ y nunca se cierra. ``current()`` devuelve el
+    perfil de la petición (o del trabajo) en curso.
+    """
+
+    def __init__(self, root, factory, default, maxsize=32):
+        self.root = root
+        self.factory = factory
+        self.default = default
+        self.maxsize = maxsize
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+        self._current = contextvars.ContextVar("cvtool_profile", default=None)
+
+    def path(self, profile_id):
+        return os.path.join(self.root, profile_id)
+
+    def exists(self, profile_id):
+        return bool(PROFILE_ID.fullmatch(profile_id)) and os.path.isdir(self.path(profile_id))
+
+    def get(self, profile_id):
+        """Perfil abierto (lo abre si hace falta); None si no existe"""
+        if profile_id is None:
+            return self.default
+        with self._lock:
+            profile = self._open.get(profile_id)
+            if profile is not None:
+                self._open.move_to_end(profile_id)
+                return profile
+        if not self.exists(profile_id):
+            return None
+        # Fuera del cerrojo: abrir un perfil parsea su CV
+        profile = self.factory(profile_id, self.path(profile_id))
+        with self._lock:
+            profile = self._open.setdefault(profile_id, profile)
+            self._open.move_to_end(profile_id)
+            while len(self._open) > self.maxsize:
+                self._open.popitem(last=False)
+        return profile
+
+    def create(self, profile_id):
+        """Crea la carpeta del perfil; devuelve False si ya existía"""
+        if not PROFILE_ID.fullmatch(profile_id):
+            raise ValueError("El identificador solo puede tener letras, números, '-' y '_' (máx. 64)")
+        if self.exists(profile_id):
+            return False
+        os.makedirs(self.path(profile_id), exist_ok=True)
+        return True
+
+    def list(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(n for n in os.listdir(self.root) if PROFILE_ID.fullmatch(n) and os.path.isdir(self.path(n)))
+
+    def open_count(self):
+        with self._lock:
+            return len(self._open)
+
+    def current(self):
+        return self._current.get() or self.default
+
+    def activate(self, profile):
+        self._current.set(profile)
+
+    @contextlib.contextmanager
+    def use(self, profile_id):
+        """Fija el perfil en curso dentro del bloque (para trabajos fuera de una petición)"""
+        profile = self.get(profile_id)
+        if profile is None:
+            raise LookupError(f"Perfil no encontrado: {profile_id}")
+        token = self._current.set(profile)
+        try:
+            yield profile
+        finally:
+            self._current.reset(token)
+
+
+class ProfileMiddleware:
+    """Sirve /p/<id>/... con el perfil <id> y el resto de rutas con el perfil por defecto"""
+
+    def __init__(self, app, registry):
+        self.app = app
+        self.registry = registry
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        profile = None
+        if path.startswith(PREFIX):
+            profile_id, _, rest = path[len(PREFIX):].partition("/")
+            profile = self.registry.get(profile_id) if PROFILE_ID.fullmatch(profile_id) else None
+            if profile is None:
+                return NotFound("Perfil no encontrado")(environ, start_response)
+            environ["SCRIPT_NAME"] = environ.get("SCRIPT_NAME", "") + PREFIX + profile_id
+            environ["PATH_INFO"] = "/" + rest
+        # Se fija en cada petición: los hilos del servidor se reutilizan
+        self.registry.activate(profile)
+        return self.app(environ, start_response)
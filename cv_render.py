@@ -0,0 +1,158 @@
+"""Motor de renderizado de CVs: compila cada plantilla una sola vez y la reutiliza."""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+from cv_metrics import null_timer
+
+
+# Bloques de render_templates/*.j2 que, concatenados en este orden, forman el documento
+FRAGMENTS = ["header", "summary", "skills", "experience", "projects", "education", "courses", "otros"]
+
+
+def template_name(fmt):
+    """Devuelve la plantilla de render_templates/ asociada a un formato"""
+    return "cv.md.j2" if fmt == "md" else "cv.txt.j2"
+
+
+def extension(fmt):
+    """Extensión del fichero generado para un formato"""
+    return {"md": ".md", "html": ".html", "pdf": ".pdf"}.get(fmt, ".txt")
+
+
+class RenderEngine:
+    """Caché de plantillas compiladas de render_templates/.
+
+    Cada plantilla se compila la primera vez que se pide y solo se vuelve a
+    compilar cuando cambia su mtime. Si se indica ``bytecode_cache_dir`` el
+    código compilado también se guarda en disco para acelerar el arranque.
+    """
+
+    def __init__(self, templates_dir, bytecode_cache_dir=None):
+        self.templates_dir = templates_dir
+        bytecode_cache = None
+        if bytecode_cache_dir:
+            os.makedirs(bytecode_cache_dir, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+        # La caché propia de Jinja se desactiva: la validación por mtime la hacemos aquí
+        self.env = Environment(loader=FileSystemLoader(templates_dir), autoescape=False,
+                               trim_blocks=False, lstrip_blocks=False, cache_size=0,
+                               auto_reload=False, bytecode_cache=bytecode_cache)
+        self._compiled = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Mide las compilaciones (ver cv_metrics)
+        self.timer = null_timer
+
+    def get_template(self, name):
+        """Devuelve la plantilla compilada, recompilándola si el fichero ha cambiado"""
+        try:
+            mtime = os.stat(os.path.join(self.templates_dir, name)).st_mtime_ns
+        except OSError:
+            mtime = None
+        with self._lock:
+            cached = self._compiled.get(name)
+            if cached is not None and cached[0] == mtime:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+        with self.timer("compile"):
+            tpl = self.env.get_template(name)
+        with self._lock:
+            self._compiled[name] = (mtime, tpl)
+        return tpl
+
+    def render(self, cv, fmt="md"):
+        return self.get_template(template_name(fmt)).render(**cv)
+
+    def render_fragment(self, cv, fmt, name, template=None):
+        """Renderiza solo un bloque (ver FRAGMENTS) de la plantilla del formato"""
+        tpl = template or self.get_template(template_name(fmt))
+        return "".join(tpl.blocks[name](tpl.new_context(dict(cv))))
+
+    def stream(self, cv, fmt="md", buffer_size=16384):
+        """Genera el documento en trozos de unos buffer_size caracteres, sin construirlo entero"""
+        buf, size = [], 0
+        for piece in self.get_template(template_name(fmt)).generate(**cv):
+            buf.append(piece)
+            size += len(piece)
+            if size >= buffer_size:
+                yield "".join(buf)
+                buf, size = [], 0
+        if buf:
+            yield "".join(buf)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "templates": sorted(self._compiled)}
+
+    def clear(self):
+        with self._lock:
+            self._compiled.clear()
+
+
+def selection_key(selection):
+    """Forma canónica de una selección para usarla como clave de caché"""
+    key = getattr(selection, "key", None)  # SelectionPlan ya normalizado
+    if key is not None:
+        return key
+    return json.dumps(selection, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+class RenderCache:
+    """Caché LRU de documentos ya renderizados.
+
+    La clave es (revisión del CV, selección normalizada, formato). Cada
+    entrada guarda también un ETag calculado sobre el contenido para poder
+    responder 304 a los clientes que ya lo tienen.
+    """
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, revision, selection, fmt, render):
+        """Devuelve (etag, contenido); llama a render() solo si no está en caché"""
+        return self.get_or_build((revision, selection_key(selection), fmt), render)
+
+    def get_or_build(self, key, render):
+        """Como get_or_render pero con una clave cualquiera (p. ej. la de un fragmento)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        content = render()
+        entry = (hashlib.sha1(content.encode("utf-8")).hexdigest(), content)
+        if self.maxsize > 0:
+            with self._lock:
+                self._entries[key] = entry
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def peek(self, revision, selection, fmt):
+        """Devuelve (etag, contenido) si ya está en caché, sin renderizar nada"""
+        key = (revision, selection_key(selection), fmt)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return entry
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
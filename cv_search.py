@@ -0,0 +1,219 @@
+"""Índice invertido de búsqueda sobre los elementos de las secciones del CV.
+
+Como el índice de duplicados (cv_dedup), lo mantiene CVStore al día con
+cada operación, así que buscar no recorre el CV: solo cruza listas de
+elementos por término y filtra por fechas los candidatos.
+"""
+import bisect
+import re
+
+from cv_dedup import normalize
+
+# Campos de fecha: se usan para filtrar, no se indexan como texto
+DATE_FIELDS = ("start", "end", "date", "periodo")
+# Fines de periodo que significan "hasta hoy" (ya normalizados)
+OPEN_ENDED = {"", "actual", "actualidad", "actualmente", "presente", "hoy", "present", "current", "now"}
+MONTHS = {name: n for n, names in enumerate((
+    ("ene", "enero", "jan", "january"), ("feb", "febrero", "february"), ("mar", "marzo", "march"),
+    ("abr", "abril", "apr", "april"), ("may", "mayo"), ("jun", "junio", "june"), ("jul", "julio", "july"),
+    ("ago", "agosto", "aug", "august"), ("sep", "sept", "septiembre", "setiembre", "september"),
+    ("oct", "octubre", "october"), ("nov", "noviembre", "november"), ("dic", "diciembre", "dec", "december")),
+    1) for name in names}
+# Sobre el texto normalizado: "2020", "2020 03", "2020 03 15", "03 2020", "marzo de 2020"
+_YEAR_MONTH = re.compile(r"(\d{4})(?: (\d{1,2}))?(?: \d{1,2})?")
+_MONTH_YEAR = re.compile(r"(\d{1,2}|[a-z]+)(?: de)? (\d{4})")
+# Separador de los dos extremos de un periodo como "2018 - 2020" o "2018 a actualidad"
+_RANGE = re.compile(r"\s+(?:-|–|—|a|al|hasta)\s+|\s*[–—]\s*|(?<=\d{4})-(?=\d{4}\b|[^\W\d])", re.I)
+
+
+def item_terms(item):
+    """Términos normalizados de todos los campos de texto (y listas como tags/tech) del elemento"""
+    terms = set()
+    for field, value in item.items():
+        if field in DATE_FIELDS or not value:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = " ".join(str(v) for v in value)
+        terms.update(normalize(value).split())
+    return frozenset(terms)
+
+
+def parse_month(value, end=False):
+    """Mes de una fecha como número (año * 12 + mes - 1); None si no es una fecha.
+
+    Con solo el año se toma enero, o diciembre si es el fin de un periodo.
+    """
+    text = normalize(value)
+    match = _YEAR_MONTH.fullmatch(text)
+    if match:
+        year, month = match.group(1), match.group(2)
+    else:
+        match = _MONTH_YEAR.fullmatch(text)
+        if not match:
+            return None
+        month, year = match.group(1), match.group(2)
+        month = month if month.isdigit() else MONTHS.get(month)
+        if month is None:
+            return None
+    month = int(month) if month else (12 if end else 1)
+    if not 1 <= month <= 12:
+        return None
+    return int(year) * 12 + month - 1
+
+
+def parse_bound(value, end=False):
+    """Mes de un filtro since/until; ValueError si no se entiende como fecha"""
+    month = parse_month(value, end)
+    if month is None:
+        raise ValueError(f"Fecha no válida: {value!r} (use AAAA o AAAA-MM)")
+    return month
+
+
+def item_period(item):
+    """(primer mes, último mes) del elemento; None si no se conoce el inicio o el periodo sigue abierto.
+
+    Sin "end" el fin es la fecha de "date" (cursos) o el final de "periodo"
+    ("2018 - 2020"); un fin vacío o "actual" deja el periodo abierto.
+    """
+    start, end = item.get("start"), item.get("end")
+    single = item.get("date") or item.get("periodo") or ""
+    if single and not (start or end):
+        parts = _RANGE.split(str(single).strip(), maxsplit=1)
+        start, end = parts[0], parts[-1]
+    elif not start:
+        start = single
+    elif not end and item.get("date"):
+        end = item["date"]
+    end = str(end or "")
+    return (parse_month(start or ""),
+            None if normalize(end) in OPEN_ENDED else parse_month(end, end=True))
+
+
+def in_period(period, since=None, until=None):
+    """El periodo se solapa con [since, until] (meses de parse_bound; None es sin límite)"""
+    start, end = period
+    if since is not None and end is not None and end < since:
+        return False
+    if until is not None and (start is None or start > until):
+        return False
+    return True
+
+
+class SearchIndex:
+    """Índice término -> elementos de todas las secciones.
+
+    Cada elemento recibe un identificador interno estable; ``ids`` guarda el
+    de cada posición, así que borrar un elemento no obliga a renumerar las
+    listas del índice. El último término de la consulta se busca como
+    prefijo ("kube" encuentra "kubernetes").
+    """
+
+    def __init__(self, sections):
+        self.sections = list(sections)
+        self.rebuild({})
+
+    def rebuild(self, doc):
+        self.ids = {s: [] for s in self.sections}
+        self.terms = {}
+        self.periods = {}
+        self.postings = {}
+        self._next_id = 0
+        self._positions = {}
+        self._vocabulary = None
+        for section in self.sections:
+            for item in doc.get(section) or ():
+                self._add(section, item)
+
+    def _add(self, section, item, idx=None):
+        item_id = self._next_id
+        self._next_id += 1
+        if idx is None:
+            self.ids[section].append(item_id)
+        else:
+            self.ids[section][idx] = item_id
+        self.terms[item_id] = terms = item_terms(item)
+        self.periods[item_id] = item_period(item)
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                self.postings[term] = posting = {}
+                self._vocabulary = None
+            posting[item_id] = section
+        self._positions.pop(section, None)
+
+    def _remove(self, section, item_id):
+        for term in self.terms.pop(item_id):
+            posting = self.postings[term]
+            del posting[item_id]
+            if not posting:
+                del self.postings[term]
+                self._vocabulary = None
+        del self.periods[item_id]
+        self._positions.pop(section, None)
+
+    def apply(self, doc, op):
+        """Refleja en el índice una operación ya aplicada al documento (ver cv_store.apply_op)"""
+        section = op.get("section", op.get("key"))
+        if section not in self.ids:
+            return
+        items = doc.get(section) or ()
+        kind = op["op"]
+        if kind == "append":
+            self._add(section, items[-1])
+        elif kind == "extend":
+            for item in items[len(items) - len(op["items"]):]:
+                self._add(section, item)
+        elif kind == "update":
+            idx = op["idx"]
+            self._remove(section, self.ids[section][idx])
+            self._add(section, items[idx], idx)
+        elif kind == "delete_item":
+            self._remove(section, self.ids[section].pop(op["idx"]))
+        else:
+            for item_id in self.ids[section]:
+                self._remove(section, item_id)
+            self.ids[section] = []
+            for item in items:
+                self._add(section, item)
+
+    def _position(self, section, item_id):
+        positions = self._positions.get(section)
+        if positions is None:
+            positions = self._positions[section] = {i: pos for pos, i in enumerate(self.ids[section])}
+        return positions[item_id]
+
+    def _prefixed(self, prefix):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        matches = {}
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            matches.update(self.postings[term])
+        return matches
+
+    def search(self, query="", section=None, since=None, until=None):
+        """[(sección, posición)] de los elementos que contienen todos los términos, en el orden del CV.
+
+        since y until son fechas como "2019" o "2019-03"; ValueError si no se entienden.
+        """
+        since = parse_bound(since) if since else None
+        until = parse_bound(until, end=True) if until else None
+        words = normalize(query).split()
+        if words:
+            sets = [self.postings.get(w, {}) for w in words[:-1]] + [self._prefixed(words[-1])]
+            sets.sort(key=len)
+            found = {i: s for i, s in sets[0].items() if all(i in other for other in sets[1:])}
+        else:
+            found = {i: s for s, ids in self.ids.items() for i in ids}
+        order = {s: n for n, s in enumerate(self.sections)}
+        hits = []
+        for item_id, item_section in found.items():
+            if section and item_section != section:
+                continue
+            if (since is not None or until is not None) and not in_period(self.periods[item_id], since, until):
+                continue
+            hits.append((item_section, self._position(item_section, item_id)))
+        hits.sort(key=lambda hit: (order[hit[0]], hit[1]))
+        return hits
@@ -0,0 +1,227 @@
+"""Backend SQLite opcional para cv.json: una tabla por sección con índices.
+
+Uso como herramienta de migración::
+
+    python cv_sqlite.py import  [--data-dir DIR]   # cv.json -> cv.sqlite3
+    python cv_sqlite.py export  [--data-dir DIR]   # cv.sqlite3 -> cv.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import sqlite3
+import sys
+
+from cv_persist import FileLock, JSONFileBackend, atomic_write_json
+from cv_store import FIELDS, apply_op, empty_cv, split_op, thaw
+
+DB_NAME = "cv.sqlite3"
+LIST_FIELDS = ("tags", "tech")
+DATE_FIELDS = ("start", "end", "date")
+
+
+def _columns(section):
+    return FIELDS[section]
+
+
+class SQLiteBackend:
+    """Guarda cada sección de FIELDS en su propia tabla.
+
+    Las filas se ordenan por ``pos`` (el índice que usan las rutas). El
+    resto de claves del documento (contact, summary, secciones desconocidas)
+    se guardan como JSON en la tabla ``meta``. Cada cambio toca solo las
+    filas afectadas. Las búsquedas y filtros se resuelven con el índice en
+    memoria del CVStore (ver cv_search), no con consultas SQL.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Todas las llamadas llegan serializadas por el cerrojo del DocumentStore
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # BEGIN IMMEDIATE ya serializa las escrituras, pero el store necesita
+        # además que nadie escriba entre su comprobación de versión y su commit
+        self._lock = FileLock(path + ".lock")
+        self._create_schema()
+
+    def lock(self):
+        return self._lock
+
+    def _create_schema(self):
+        with self._transaction():
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            for section, fields in FIELDS.items():
+                cols = ", ".join(f'"{f}" TEXT' for f in fields)
+                self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{section}" '
+                                  f'(id INTEGER PRIMARY KEY, pos INTEGER NOT NULL, {cols}, extra TEXT)')
+                self.conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "{section}_pos" ON "{section}"(pos)')
+                # Índices de fechas y tablas de etiquetas de versiones anteriores: ninguna consulta los usaba
+                for f in fields:
+                    if f in DATE_FIELDS:
+                        self.conn.execute(f'DROP INDEX IF EXISTS "{section}_{f}"')
+                self.conn.execute(f'DROP TABLE IF EXISTS "{section}_tags"')
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _bump(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        self.conn.execute(f"PRAGMA user_version={version + 1}")
+
+    # --- Conversión fila <-> elemento ---
+
+    def _row_values(self, section, item):
+        item = thaw(item)
+        values, extra = [], {}
+        for f in _columns(section):
+            v = item.get(f)
+            if v is None:
+                values.append(None)
+            elif f in LIST_FIELDS and isinstance(v, list):
+                values.append(json.dumps(v, ensure_ascii=False))
+            elif f not in LIST_FIELDS and isinstance(v, str):
+                values.append(v)
+            else:
+                # Tipos inesperados se conservan tal cual en extra
+                values.append(None)
+                extra[f] = v
+        extra.update((k, v) for k, v in item.items() if k not in _columns(section))
+        values.append(json.dumps(extra, ensure_ascii=False) if extra else None)
+        return values
+
+    def _row_to_item(self, section, row):
+        item = {}
+        for f, v in zip(_columns(section), row):
+            if v is not None:
+                item[f] = json.loads(v) if f in LIST_FIELDS else v
+        if row[-1]:
+            item.update(json.loads(row[-1]))
+        return item
+
+    def _insert(self, section, pos, item):
+        fields = _columns(section)
+        cols = ", ".join(f'"{f}"' for f in fields)
+        marks = ", ".join("?" for _ in range(len(fields) + 2))
+        self.conn.execute(f'INSERT INTO "{section}" (pos, {cols}, extra) VALUES ({marks})',
+                          [pos] + self._row_values(section, item))
+
+    def _write_section(self, section, items):
+        self.conn.execute(f'DELETE FROM "{section}"')
+        for pos, item in enumerate(items):
+            self._insert(section, pos, item)
+
+    # --- Interfaz de backend (ver cv_persist.JSONFileBackend) ---
+
+    def stamp(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        return version or None
+
+    def load(self, default, apply_op):
+        doc = default()
+        for key, value in self.conn.execute("SELECT key, value FROM meta"):
+            doc[key] = json.loads(value)
+        for section, fields in FIELDS.items():
+            cols = ", ".join(f'"{f}"' for f in fields)
+            rows = self.conn.execute(f'SELECT {cols}, extra FROM "{section}" ORDER BY pos')
+            doc[section] = [self._row_to_item(section, row) for row in rows]
+        return doc
+
+    def commit(self, op, doc):
+        with self._transaction():
+            for part in split_op(op):
+                self._commit_one(part, doc)
+            self._bump()
+
+    def _commit_one(self, op, doc):
+        kind = op["op"]
+        key = op.get("section", op.get("key"))
+        if key not in FIELDS:
+            if kind == "delete":
+                self.conn.execute("DELETE FROM meta WHERE key=?", (key,))
+            else:
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                  (key, json.dumps(doc[key], ensure_ascii=False)))
+        elif kind in ("set", "delete"):
+            self._write_section(key, doc.get(key, []))
+        elif kind == "append":
+            self._insert(key, len(doc[key]) - 1, op["item"])
+        elif kind == "extend":
+            start = len(doc[key]) - len(op["items"])
+            for offset, item in enumerate(op["items"]):
+                self._insert(key, start + offset, item)
+        elif kind == "update":
+            idx = op["idx"]
+            fields = _columns(key)
+            assigns = ", ".join(f'"{f}"=?' for f in fields)
+            self.conn.execute(f'UPDATE "{key}" SET {assigns}, extra=? WHERE pos=?',
+                              self._row_values(key, doc[key][idx]) + [idx])
+        elif kind == "delete_item":
+            idx = op["idx"]
+            self.conn.execute(f'DELETE FROM "{key}" WHERE pos=?', (idx,))
+            # Dos pasos para no violar el índice único de pos
+            self.conn.execute(f'UPDATE "{key}" SET pos=-pos WHERE pos>?', (idx,))
+            self.conn.execute(f'UPDATE "{key}" SET pos=-pos-1 WHERE pos<0')
+
+    def write_all(self, doc):
+        with self._transaction():
+            self.conn.execute("DELETE FROM meta")
+            for key, value in doc.items():
+                if key in FIELDS:
+                    continue
+                self.conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)",
+                                  (key, json.dumps(value, ensure_ascii=False)))
+            for section in FIELDS:
+                self._write_section(section, doc.get(section, []))
+            self._bump()
+
+    def close(self):
+        self.conn.close()
+
+
+def import_json(json_path, backend):
+    """Carga un cv.json existente en el backend SQLite (sustituye su contenido)"""
+    backend.write_all(JSONFileBackend(json_path).load(empty_cv, apply_op))
+
+
+def export_json(backend, json_path):
+    """Vuelca el contenido del backend SQLite a un fichero con el formato de cv.json"""
+    atomic_write_json(json_path, backend.load(empty_cv, None))
+
+
+def open_backend(data_dir):
+    """Abre DATA_DIR/cv.sqlite3; la primera vez importa cv.json si existe"""
+    backend = SQLiteBackend(os.path.join(data_dir, DB_NAME))
+    json_path = os.path.join(data_dir, "cv.json")
+    with backend.lock():
+        if backend.stamp() is None and os.path.exists(json_path):
+            import_json(json_path, backend)
+    return backend
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa/exporta cv.json desde/hacia SQLite")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("--data-dir", default=os.environ.get("CVTOOL_DATA_DIR", "data"))
+    args = parser.parse_args(argv)
+    json_path = os.path.join(args.data_dir, "cv.json")
+    backend = SQLiteBackend(os.path.join(args.data_dir, DB_NAME))
+    if args.action == "import":
+        import_json(json_path, backend)
+        print(f"Importado {json_path} -> {backend.path}")
+    else:
+        export_json(backend, json_path)
+        print(f"Exportado {backend.path} -> {json_path}")
+    backend.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Medición del arranque de la aplicación de escritorio (cv_app.py y el ejecutable portable).
+
+Con ``CVTOOL_STARTUP_TIMING=1`` o ``--startup-timing``, StartupTimer anota
+el tiempo transcurrido desde que empieza cv_app.py hasta cada hito
+(imports, aplicación configurada, servidor escuchando, navegador abierto,
+precarga terminada) y hasta la primera respuesta servida. ImportTimer mide
+lo que tarda en importarse cada módulo, con y sin los módulos que importa
+a su vez. Con la primera respuesta se imprime el informe y se guarda en
+JSON para comparar versiones del ejecutable.
+
+listen y open_browser permiten reservar el puerto y abrir el navegador
+antes de importar Flask, y lazy crea los objetos caros (perfiles, cola de
+trabajos, ficheros estáticos) la primera vez que se usan.
+
+Este módulo se importa antes que Flask, así que solo usa la biblioteca
+estándar más básica.
+"""
+import _thread
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+# Módulos que se muestran en el informe impreso (el JSON los lleva todos)
+TOP_IMPORTS = 15
+
+
+class _TimedLoader:
+    """Envuelve el loader de un módulo para medir su exec_module"""
+
+    def __init__(self, loader, timer, name):
+        self._loader = loader
+        self._timer = timer
+        self._name = name
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # El módulo ve su loader de verdad (importlib.resources, pkgutil, Flask...)
+        module.__loader__ = self._loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+        self._timer.enter(self._name)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer.exit(self._name)
+
+
+class ImportTimer:
+    """Buscador de sys.meta_path que mide cada import sin cambiar qué módulo se carga"""
+
+    def __init__(self):
+        # [(módulo, segundos con sus imports, segundos propios)] en el orden en que terminan
+        self.modules = []
+        # Pila de (módulo, inicio, segundos de sus imports) de cada hilo
+        self._stacks = {}
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self, name)
+        return spec
+
+    def enter(self, name):
+        self._stacks.setdefault(_thread.get_ident(), []).append([name, time.perf_counter(), 0.0])
+
+    def exit(self, name):
+        stack = self._stacks[_thread.get_ident()]
+        _, start, children = stack.pop()
+        total = time.perf_counter() - start
+        if stack:
+            stack[-1][2] += total
+        self.modules.append((name, total, total - children))
+
+    def slowest(self, n=None):
+        return sorted(self.modules, key=lambda m: m[2], reverse=True)[:n]
+
+
+class StartupTimer:
+    """Hitos del arranque en segundos desde su creación; sin ``enabled`` no hace nada"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.marks = []
+        self.imports = None
+        self.report_path = None
+        self._finished = False
+        if enabled:
+            self.imports = ImportTimer()
+            self.imports.install()
+
+    def mark(self, name):
+        if self.enabled:
+            self.marks.append((name, time.perf_counter() - self.start))
+            if self._finished:
+                # Hito posterior a la primera respuesta (p. ej. la precarga): se añade al informe
+                print(f"  {name:<20} {self.marks[-1][1] * 1000:>9.1f}")
+                self._save(self.report())
+
+    def wrap(self, wsgi_app, report_path=None):
+        """Middleware WSGI que anota la primera respuesta y entonces imprime y guarda el informe"""
+        if not self.enabled:
+            return wsgi_app
+        self.report_path = report_path
+
+        def app(environ, start_response):
+            response = wsgi_app(environ, start_response)
+            if not self._finished:
+                self.mark("first_response")
+                self.finish()
+            return response
+        return app
+
+    def report(self):
+        modules = self.imports.slowest() if self.imports else []
+        return {
+            "marks_ms": {name: round(t * 1000, 1) for name, t in self.marks},
+            "imports_ms": round(sum(m[2] for m in modules) * 1000, 1),
+            "modules": [{"module": name, "ms": round(total * 1000, 2), "self_ms": round(own * 1000, 2)}
+                        for name, total, own in modules],
+        }
+
+    def finish(self):
+        """Deja de medir imports, imprime el informe y lo guarda en report_path"""
+        if self._finished:
+            return
+        self._finished = True
+        if self.imports:
+            self.imports.uninstall()
+        report = self.report()
+        print("Arranque (ms desde el inicio de la aplicación):")
+        for name, ms in report["marks_ms"].items():
+            print(f"  {name:<20} {ms:>9.1f}")
+        print(f"Imports: {report['imports_ms']:.1f} ms en {len(report['modules'])} módulos; los más lentos (propios / total):")
+        for m in report["modules"][:TOP_IMPORTS]:
+            print(f"  {m['module']:<36} {m['self_ms']:>8.2f} {m['ms']:>9.2f}")
+        self._save(report)
+
+    def _save(self, report):
+        if not self.report_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.report_path), exist_ok=True)
+            with open(self.report_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        except OSError as e:
+            print(f"No se pudo guardar el informe de arranque: {e}")
+
+
+def listen(host, port):
+    """Socket que ya escucha en (host, port); las conexiones esperan en su cola hasta que se atienden"""
+    return socket.create_server((host, port))
+
+
+def open_browser(url, timer=None):
+    """Abre el navegador en otro hilo (importar webbrowser y lanzar el navegador también tarda)"""
+    def run():
+        import webbrowser
+        webbrowser.open(url)
+        if timer is not None:
+            timer.mark("browser")
+        print(f"Aplicación abierta en el navegador: {url}")
+    threading.Thread(target=run, daemon=True).start()
+
+
+def lazy(factory):
+    """LocalProxy de factory(), que se llama una sola vez (aunque lo pidan varios hilos) al usarlo por primera vez"""
+    from werkzeug.local import LocalProxy
+    lock = threading.Lock()
+    created = []
+
+    def get():
+        if not created:
+            with lock:
+                if not created:
+                    created.append(factory())
+        return created[0]
+    return LocalProxy(get)
@@ -0,0 +1,336 @@
+"""Almacén en memoria de los documentos JSON de la aplicación (cv.json, templates.json)."""
+import contextlib
+import os
+import threading
+from types import MappingProxyType
+from cv_dedup import DedupIndex
+from cv_metrics import null_timer
+from cv_model import FIELDS, Record, record, to_records
+from cv_persist import JSONFileBackend
+from cv_search import SearchIndex
+
+SECTIONS = ["skills", "experience", "projects", "education", "courses", "otros"]
+
+
+def empty_cv():
+    return {"contact":{"links":[]}, "summary":"", "skills":[], "experience":[], "projects":[], "education":[], "courses":[], "otros":[]}
+
+
+def freeze(obj):
+    """Convierte dicts y listas en vistas de solo lectura (mappingproxy y tuplas)"""
+    if isinstance(obj, dict):
+        return MappingProxyType({k: freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return tuple(freeze(v) for v in obj)
+    return obj
+
+
+def thaw(obj):
+    """Operación inversa a freeze: devuelve una copia mutable y serializable"""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    if isinstance(obj, (dict, MappingProxyType)):
+        return {k: thaw(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [thaw(v) for v in obj]
+    return obj
+
+
+def apply_op(doc, op):
+    """Aplica una operación del diario sobre el documento; devuelve False si no aplica"""
+    kind = op["op"]
+    if kind == "set":
+        doc[op["key"]] = op["value"]
+    elif kind == "delete":
+        if op["key"] not in doc:
+            return False
+        del doc[op["key"]]
+    elif kind == "append":
+        doc.setdefault(op["section"], []).append(op["item"])
+    elif kind == "extend":
+        doc.setdefault(op["section"], []).extend(op["items"])
+    elif kind == "extend_sections":
+        for section, items in op["sections"].items():
+            doc.setdefault(section, []).extend(items)
+    elif kind in ("update", "delete_item"):
+        lst = doc.get(op["section"], [])
+        idx = op["idx"]
+        if not 0 <= idx < len(lst):
+            return False
+        if kind == "update":
+            lst[idx].update(op["fields"])
+        else:
+            lst.pop(idx)
+    else:
+        raise ValueError(f"Operación desconocida: {kind}")
+    return True
+
+
+def split_op(op):
+    """Operaciones de una sola clave equivalentes a op, para los índices y las revisiones por clave"""
+    if op["op"] == "extend_sections":
+        return [{"op": "extend", "section": section, "items": items} for section, items in op["sections"].items()]
+    return [op]
+
+
+def apply_cv_op(doc, op):
+    """apply_op para cv.json: los elementos de las secciones se guardan como registros (ver cv_model)"""
+    kind, section = op["op"], op.get("section")
+    if kind == "extend_sections":
+        sections = {s: [record(s, item) for item in items] for s, items in op["sections"].items()}
+        return apply_op(doc, dict(op, sections=sections))
+    if section not in FIELDS:
+        if kind == "set" and op["key"] in FIELDS and isinstance(op["value"], list):
+            op = dict(op, value=to_records({op["key"]: op["value"]}, (op["key"],))[op["key"]])
+        return apply_op(doc, op)
+    if kind == "update":
+        lst = doc.get(section, [])
+        idx = op["idx"]
+        if not 0 <= idx < len(lst):
+            return False
+        # Los registros son inmutables: se sustituye el elemento
+        lst[idx] = record(section, lst[idx]).replace(op["fields"])
+        return True
+    if kind == "append":
+        op = dict(op, item=record(section, op["item"]))
+    elif kind == "extend":
+        op = dict(op, items=[record(section, item) for item in op["items"]])
+    return apply_op(doc, op)
+
+
+class DocumentStore:
+    """Mantiene un documento JSON parseado en memoria.
+
+    El documento solo se vuelve a leer cuando cambia su versión en disco
+    (mtime o tamaño). Las lecturas devuelven una vista congelada compartida
+    entre peticiones; las escrituras pasan por los métodos de mutación, que
+    actualizan la copia en memoria y registran el cambio en el backend bajo
+    un mismo cerrojo, de modo que dos peticiones concurrentes no pierden
+    actualizaciones. Ese cerrojo incluye el de fichero del backend, así que
+    también vale entre procesos (varios workers de un servidor WSGI).
+
+    ``timer`` mide las fases de lectura y escritura (ver cv_metrics).
+    """
+
+    # Cómo se aplica una operación al documento en memoria
+    apply_op = staticmethod(apply_op)
+
+    def __init__(self, path=None, default=dict, backend=None):
+        self.backend = backend or JSONFileBackend(path)
+        self.default = default
+        self.revision = 0
+        # Revisión del último cambio de cada clave; las demás valen _base_revision
+        self._key_revisions = {}
+        self._base_revision = 0
+        self._doc = None
+        self._view = None
+        self._stamp = None
+        self._lock = threading.RLock()
+        self._listeners = []
+        self.timer = null_timer
+
+    def _refresh(self):
+        stamp = self.backend.stamp()
+        if self._doc is not None and stamp == self._stamp:
+            return
+        # Otro proceso ha escrito: se lee con su cerrojo para no ver una compactación a medias
+        with self.backend.lock():
+            stamp = self.backend.stamp()
+            if stamp is None:
+                self._doc = self.default()
+            else:
+                with self.timer("load"):
+                    self._doc = self._adopt(self.backend.load(self.default, self.apply_op))
+                # Al leer se puede recortar un diario cortado por una caída
+                stamp = self.backend.stamp()
+            self._stamp = stamp
+        self._changed()
+
+    def _adopt(self, doc):
+        """Prepara un documento recién leído o sustituido antes de tenerlo en memoria"""
+        return doc
+
+    def _changed(self, key=None, op=None):
+        self._view = None
+        self.revision += 1
+        if key is None:
+            self._key_revisions.clear()
+            self._base_revision = self.revision
+        else:
+            self._key_revisions[key] = self.revision
+        for callback in self._listeners:
+            callback()
+
+    def versioned_view(self, keys=()):
+        """Vista actual, su revisión y la revisión del último cambio de cada clave de keys.
+
+        Las tres cosas se leen bajo el mismo cerrojo, así que corresponden
+        siempre al mismo estado del documento.
+        """
+        with self._lock:
+            view = self.view()
+            return view, self.revision, {k: self._key_revisions.get(k, self._base_revision) for k in keys}
+
+    @contextlib.contextmanager
+    def locked(self):
+        """Bloquea el documento (también frente a otros procesos) para leer y escribir varias claves de una vez"""
+        with self._lock, self.backend.lock():
+            self._refresh()
+            yield self
+
+    def on_change(self, callback):
+        """Registra una función a la que se llama cada vez que cambia el documento"""
+        self._listeners.append(callback)
+
+    def _mutate(self, op):
+        with self._lock, self.backend.lock():
+            self._refresh()
+            if not self.apply_op(self._doc, op):
+                return False
+            try:
+                with self.timer("save"):
+                    self.backend.commit(op, self._doc)
+            except BaseException:
+                # La copia en memoria ya no coincide con el disco: se relee en el próximo acceso
+                self._doc = None
+                raise
+            self._stamp = self.backend.stamp()
+            for part in split_op(op):
+                self._changed(part.get("section", part.get("key")), part)
+            return True
+
+    def view(self):
+        """Vista de solo lectura del documento actual"""
+        with self._lock:
+            self._refresh()
+            if self._view is None:
+                self._view = freeze(self._doc)
+            return self._view
+
+    def snapshot(self):
+        """Copia mutable e independiente del documento actual"""
+        with self._lock:
+            self._refresh()
+            return thaw(self._doc)
+
+    def replace(self, doc):
+        with self._lock, self.backend.lock():
+            self._doc = self._adopt(thaw(doc))
+            with self.timer("save"):
+                self.backend.write_all(self._doc)
+            self._stamp = self.backend.stamp()
+            self._changed()
+
+    def compact(self):
+        """Vuelca el documento completo al disco y vacía el diario de cambios"""
+        with self._lock, self.backend.lock():
+            self._refresh()
+            self.backend.write_all(self._doc)
+            self._stamp = self.backend.stamp()
+
+    def set(self, key, value):
+        self._mutate({"op": "set", "key": key, "value": thaw(value)})
+
+    def delete(self, key):
+        """Elimina una clave; devuelve False si no existía"""
+        return self._mutate({"op": "delete", "key": key})
+
+
+class CVStore(DocumentStore):
+    """DocumentStore de cv.json con operaciones por elemento de sección.
+
+    Los elementos de las secciones se guardan como registros inmutables
+    (ver cv_model), compartidos entre el documento y sus vistas. Mantiene
+    además un índice de elementos duplicados (ver cv_dedup) y uno de
+    búsqueda (ver cv_search) que se actualizan en cada escritura;
+    deduped_view() aplica el primero una sola vez por revisión.
+    """
+
+    apply_op = staticmethod(apply_cv_op)
+
+    def __init__(self, path=None, backend=None, dedup="exact"):
+        self.dedup = DedupIndex(dedup)
+        self.text_index = SearchIndex(SECTIONS)
+        self._deduped = None
+        super().__init__(path, default=empty_cv, backend=backend)
+
+    def _adopt(self, doc):
+        return to_records(doc, FIELDS)
+
+    def _changed(self, key=None, op=None):
+        self._deduped = None
+        if op is None:
+            with self.timer("dedup"):
+                self.dedup.rebuild(self._doc)
+            with self.timer("index"):
+                self.text_index.rebuild(self._doc)
+        else:
+            with self.timer("dedup"):
+                self.dedup.apply(self._doc, op)
+            with self.timer("index"):
+                self.text_index.apply(self._doc, op)
+        super()._changed(key, op)
+
+    def deduped_view(self):
+        """Vista de solo lectura sin los elementos repetidos"""
+        with self._lock:
+            view = self.view()
+            if self._deduped is None:
+                with self.timer("dedup"):
+                    self._deduped = self.dedup.filter(view)
+            return self._deduped
+
+    def versioned_view(self, keys=(), deduped=False):
+        with self._lock:
+            view, revision, revisions = super().versioned_view(keys)
+            return (self.deduped_view() if deduped else view), revision, revisions
+
+    def search(self, query="", section=None, since=None, until=None, deduped=False, offset=0, limit=None):
+        """Busca en el índice; devuelve (total, [(sección, posición, elemento)]) de la página pedida.
+
+        Con deduped las posiciones son las de deduped_view() y los duplicados
+        no aparecen (es lo que usa la página de personalización).
+        """
+        with self._lock:
+            self._refresh()
+            hits = self.text_index.search(query, section, since, until)
+            if deduped:
+                hits = self.dedup.remap(hits)
+                view = self.deduped_view()
+            else:
+                view = self.view()
+            page = hits[offset:None if limit is None else offset + limit]
+            return len(hits), [(s, i, view[s][i]) for s, i in page]
+
+    def duplicates(self):
+        """Posiciones de los elementos repetidos de cada sección (ver DedupIndex.duplicates)"""
+        with self._lock:
+            self._refresh()
+            return self.dedup.duplicates()
+
+    def append_item(self, section, item):
+        self._mutate({"op": "append", "section": section, "item": thaw(item)})
+
+    def extend_items(self, section, items):
+        """Añade varios elementos al final de la sección con una sola escritura"""
+        self._mutate({"op": "extend", "section": section, "items": thaw(items)})
+
+    def extend_sections(self, sections):
+        """Añade elementos al final de varias secciones ({sección: [elementos]}) en una sola operación (ver cv_import)"""
+        self._mutate({"op": "extend_sections", "sections": {s: thaw(items) for s, items in sections.items() if items}})
+
+    def update_item(self, section, idx, fields):
+        """Actualiza los campos indicados del elemento idx; devuelve False si no existe"""
+        return self._mutate({"op": "update", "section": section, "idx": idx, "fields": thaw(fields)})
+
+    def delete_item(self, section, idx):
+        """Elimina el elemento idx de la sección; devuelve False si no existe"""
+        return self._mutate({"op": "delete_item", "section": section, "idx": idx})
+
+
+def open_cv_store(data_dir, storage="json", dedup="exact"):
+    """Crea el CVStore de DATA_DIR con el backend indicado ("json" o "sqlite")"""
+    if storage == "sqlite":
+        from cv_sqlite import open_backend
+        return CVStore(backend=open_backend(data_dir), dedup=dedup)
+    return CVStore(os.path.join(data_dir, "cv.json"), dedup=dedup)
@@ -0,0 +1,49 @@
+"""Modo producción: fábrica de la aplicación WSGI y arranque con un servidor multihilo.
+
+Ejemplos::
+
+    python cv_wsgi.py --host 0.0.0.0 --port 8000 --threads 8   # waitress (también en Windows)
+    gunicorn -w 4 --threads 4 -b 0.0.0.0:8000 "cv_wsgi:create_app()"
+
+La configuración se lee del entorno (CVTOOL_DATA_DIR, CVTOOL_STORAGE, ...).
+Los workers comparten DATA_DIR: cada escritura en cv.json o templates.json
+se hace con el cerrojo de fichero del backend (ver cv_persist.FileLock) y
+cada proceso relee el documento cuando otro lo ha cambiado.
+"""
+import argparse
+import os
+import sys
+
+
+def create_app(**config):
+    """Devuelve la aplicación Flask configurada.
+
+    Los argumentos sobrescriben las variables de entorno CVTOOL_* del mismo
+    nombre, p. ej. ``create_app(data_dir="/srv/cv", storage="sqlite")``. La
+    configuración de app_dist se lee al importarlo, así que solo puede
+    aplicarse una vez por proceso.
+    """
+    if config and "app_dist" in sys.modules:
+        raise RuntimeError("La aplicación ya está creada en este proceso; no se puede reconfigurar")
+    for key, value in config.items():
+        os.environ[f"CVTOOL_{key.upper()}"] = str(value)
+    import app_dist
+    return app_dist.app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sirve CV Generator con waitress (varios hilos)")
+    parser.add_argument("--host", default=os.environ.get("CVTOOL_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("CVTOOL_PORT", "8000")))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("CVTOOL_THREADS", "8")))
+    args = parser.parse_args(argv)
+    try:
+        from waitress import serve
+    except ImportError:
+        raise SystemExit("Falta waitress: pip install waitress (o usa gunicorn \"cv_wsgi:create_app()\")")
+    serve(create_app(), host=args.host, port=args.port, threads=args.threads)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,635 @@
+// Página de personalización (templates/customize.html, que define BASE_URL)
+// Elementos que se piden en cada página al desplegar una sección
+const ITEMS_PER_PAGE = 50;
+
+class CVCustomizer {
+    constructor() {
+        this.selection = {
+            include_summary: true,
+            skills: { selected: [], order: [] },
+            experience: { selected: [], order: [] },
+            projects: { selected: [], order: [] },
+            education: { selected: [], order: [] },
+            courses: { selected: [], order: [] },
+            otros: { selected: [], order: [] }
+        };
+        // Fragmentos de la vista previa ya recibidos (por formato): solo se piden los que cambian
+        this.previewFragments = {};
+        // En CVs muy grandes la vista previa se recibe y se pinta por trozos
+        this.streamPreview = document.querySelector('.content-area').dataset.streamPreview === 'true';
+        // Páginas de elementos ya cargadas en cada sección
+        this.loaded = {};
+        // Resultado de la búsqueda activa ("sección:índice"); null si no hay búsqueda
+        this.searchMatches = null;
+        
+        this.initializeSelection();
+        this.setupEventListeners();
+        this.setupSortable();
+        this.setupSearch();
+        this.loadExpandedSections();
+        console.log('🎯 CVCustomizer inicializado correctamente');
+    }
+    
+    range(count) {
+        return Array.from({ length: count }, (_, index) => index);
+    }
+    
+    initializeSelection() {
+        // Todo seleccionado: basta con el número de elementos, no hace falta tenerlos cargados
+        document.querySelectorAll('.section-card[data-count]').forEach(card => {
+            const count = parseInt(card.dataset.count);
+            this.selection[card.dataset.section] = {
+                selected: this.range(count),
+                order: this.range(count)
+            };
+        });
+    }
+    
+    loadExpandedSections() {
+        document.querySelectorAll('.section-card[data-count] .section-content.show').forEach(content => {
+            this.loadItems(content.closest('.section-card').dataset.section);
+        });
+    }
+    
+    async loadItems(section) {
+        const state = this.loaded[section] || (this.loaded[section] = { page: 0, pages: 1, loading: false });
+        if (state.loading || state.page >= state.pages) return;
+        
+        state.loading = true;
+        const card = document.querySelector(`.section-card[data-section="${section}"]`);
+        try {
+            const params = new URLSearchParams({ scope: 'cv', page: state.page + 1, per_page: ITEMS_PER_PAGE });
+            const response = await fetch(`${BASE_URL}/${section}/elementos?${params}`);
+            if (!response.ok) throw new Error(response.statusText);
+            
+            const data = await response.json();
+            const list = card.querySelector('.item-list');
+            data.items.forEach(({ idx, item }) => list.appendChild(this.renderItem(section, idx, item)));
+            state.page = data.page;
+            state.pages = data.pages;
+        } catch (error) {
+            console.error('Error:', error);
+            this.showNotification('Error al cargar los elementos', 'error');
+        } finally {
+            state.loading = false;
+        }
+        card.querySelector('.load-more').style.display = state.page < state.pages ? '' : 'none';
+    }
+    
+    describeItem(section, item) {
+        const text = key => String(item[key] || '');
+        const truncate = value => value.length > 150 ? `${value.slice(0, 150)}...` : value;
+        switch (section) {
+            case 'skills':
+                return [text('name'), `Nivel: ${item.level || 'No especificado'}`,
+                        item.tags && item.tags.length ? `Tags: ${item.tags.join(', ')}` : ''];
+            case 'experience':
+                return [text('title'), `${text('company')} - ${text('start')} a ${text('end')}`, truncate(text('description'))];
+            case 'projects':
+                return [text('title'), `${item.company || 'Personal'} - ${text('start')} a ${text('end')}`, truncate(text('description'))];
+            case 'education':
+                return [text('degree'), `${text('institution')} - ${text('start')} a ${text('end')}`, truncate(text('notes'))];
+            case 'courses':
+                return [text('name'), `${text('issuer')} - ${text('date')}`, item.hours ? `${item.hours} horas` : ''];
+            default:
+                return [text('title'), `${item.institution || 'No especificado'} - ${item.start || item.periodo || 'Fecha no especificada'}`,
+                        truncate(text('description'))];
+        }
+    }
+    
+    renderItem(section, index, item) {
+        const [title, subtitle, description] = this.describeItem(section, item);
+        const selected = this.selection[section].selected.includes(index);
+        
+        const element = document.createElement('div');
+        element.className = selected ? 'item selected' : 'item';
+        element.dataset.index = index;
+        if (this.searchMatches && !this.searchMatches.has(`${section}:${index}`)) {
+            element.classList.add('search-hidden');
+        }
+        
+        const checkbox = document.createElement('div');
+        checkbox.className = selected ? 'item-checkbox checked' : 'item-checkbox';
+        element.appendChild(checkbox);
+        
+        [['item-title', title], ['item-subtitle', subtitle], ['item-description', description]].forEach(([className, value]) => {
+            if (className === 'item-description' && !value) return;
+            const div = document.createElement('div');
+            div.className = className;
+            div.textContent = value;
+            element.appendChild(div);
+        });
+        return element;
+    }
+    
+    markItems(card, selected) {
+        card.querySelectorAll('.item').forEach(item => {
+            item.classList.toggle('selected', selected);
+            item.querySelector('.item-checkbox').classList.toggle('checked', selected);
+        });
+    }
+    
+    setupEventListeners() {
+        // Toggle de secciones (la primera vez que se despliegan se cargan sus elementos)
+        document.querySelectorAll('.section-header').forEach(header => {
+            header.addEventListener('click', (e) => {
+                if (e.target.classList.contains('section-toggle')) return;
+                
+                const content = header.nextElementSibling;
+                const card = header.closest('.section-card');
+                
+                content.classList.toggle('show');
+                card.classList.toggle('active');
+                if (content.classList.contains('show') && card.dataset.count) {
+                    this.loadItems(card.dataset.section);
+                }
+            });
+        });
+        
+        // Toggle de sección completa
+        document.querySelectorAll('.section-toggle').forEach(toggle => {
+            toggle.addEventListener('click', (e) => {
+                e.stopPropagation();
+                const card = toggle.closest('.section-card');
+                const section = card.dataset.section;
+                
+                if (section === 'summary') {
+                    this.selection.include_summary = !this.selection.include_summary;
+                    toggle.classList.toggle('checked', this.selection.include_summary);
+                } else {
+                    const select = !toggle.classList.contains('checked');
+                    const count = parseInt(card.dataset.count);
+                    this.selection[section].selected = select ? this.range(count) : [];
+                    this.selection[section].order = select ? this.range(count) : [];
+                    this.markItems(card, select);
+                    toggle.classList.toggle('checked', select);
+                }
+            });
+        });
+        
+        // Un único listener para todos los elementos, también los que se cargan después
+        document.querySelector('.content-area').addEventListener('click', (e) => {
+            const loadMore = e.target.closest('.load-more-btn');
+            if (loadMore) {
+                this.loadItems(loadMore.closest('.section-card').dataset.section);
+                return;
+            }
+            
+            const checkbox = e.target.closest('.item-checkbox');
+            if (!checkbox) return;
+            e.stopPropagation();
+            const item = checkbox.closest('.item');
+            const section = item.closest('.section-card').dataset.section;
+            const index = parseInt(item.dataset.index);
+            
+            const isSelected = item.classList.contains('selected');
+            
+            if (isSelected) {
+                item.classList.remove('selected');
+                checkbox.classList.remove('checked');
+                this.removeFromSelection(section, index);
+            } else {
+                item.classList.add('selected');
+                checkbox.classList.add('checked');
+                this.addToSelection(section, index);
+            }
+            
+            this.updateSectionToggle(section);
+        });
+        
+        // Botones principales
+        document.getElementById('select-all-btn').addEventListener('click', () => this.selectAll());
+        document.getElementById('clear-all-btn').addEventListener('click', () => this.clearAll());
+        document.getElementById('preview-btn').addEventListener('click', () => this.showPreview());
+        document.getElementById('generate-btn').addEventListener('click', () => this.showGenerateModal());
+        
+        // Plantillas
+        document.getElementById('load-template-btn').addEventListener('click', () => this.loadTemplate());
+        document.getElementById('save-template-btn').addEventListener('click', () => this.showSaveModal());
+        
+        this.setupModalEvents();
+    }
+    
+    setupSortable() {
+        document.querySelectorAll('.item-list').forEach(list => {
+            new Sortable(list, {
+                animation: 150,
+                ghostClass: 'sortable-placeholder',
+                onEnd: (evt) => {
+                    const section = evt.from.closest('.section-card').dataset.section;
+                    this.updateOrder(section, evt.oldIndex, evt.newIndex);
+                }
+            });
+        });
+    }
+    
+    setupSearch() {
+        let timer = null;
+        this.searchSeq = 0;
+        ['search-query', 'search-since', 'search-until'].forEach(id => {
+            document.getElementById(id).addEventListener('input', () => {
+                clearTimeout(timer);
+                timer = setTimeout(() => this.runSearch(), 250);
+            });
+        });
+    }
+    
+    async runSearch() {
+        const q = document.getElementById('search-query').value.trim();
+        const since = document.getElementById('search-since').value.trim();
+        const until = document.getElementById('search-until').value.trim();
+        const status = document.getElementById('search-status');
+        const items = document.querySelectorAll('.section-card[data-section] .item');
+        const seq = ++this.searchSeq;
+        
+        if (!q && !since && !until) {
+            this.searchMatches = null;
+            items.forEach(item => item.classList.remove('search-hidden'));
+            status.textContent = '';
+            return;
+        }
+        
+        // Las posiciones devueltas con scope=cv son las de data-index
+        const matches = new Set();
+        const params = new URLSearchParams({ q, since, until, scope: 'cv', per_page: 100 });
+        try {
+            for (let page = 1, pages = 1; page <= pages; page++) {
+                params.set('page', page);
+                const response = await fetch(`${BASE_URL}/buscar?${params}`);
+                const data = await response.json();
+                if (!response.ok) throw new Error(data.error || response.statusText);
+                data.results.forEach(r => matches.add(`${r.section}:${r.idx}`));
+                pages = data.pages;
+            }
+        } catch (error) {
+            console.error('Error:', error);
+            if (seq === this.searchSeq) status.textContent = `Error al buscar: ${error.message}`;
+            return;
+        }
+        // Se ha lanzado otra búsqueda mientras llegaba esta
+        if (seq !== this.searchSeq) return;
+        
+        // Se guarda para filtrar también las páginas que se carguen después
+        this.searchMatches = matches;
+        items.forEach(item => {
+            const section = item.closest('.section-card').dataset.section;
+            item.classList.toggle('search-hidden', !matches.has(`${section}:${item.dataset.index}`));
+        });
+        status.textContent = `${matches.size} elemento(s) encontrados`;
+    }
+    
+    addToSelection(section, index) {
+        if (!this.selection[section].selected.includes(index)) {
+            this.selection[section].selected.push(index);
+            this.selection[section].order.push(this.selection[section].order.length);
+        }
+    }
+    
+    removeFromSelection(section, index) {
+        const selectedIndex = this.selection[section].selected.indexOf(index);
+        if (selectedIndex > -1) {
+            this.selection[section].selected.splice(selectedIndex, 1);
+            this.selection[section].order.splice(selectedIndex, 1);
+            this.selection[section].order = this.selection[section].order.map((val, idx) => idx);
+        }
+    }
+    
+    updateOrder(section, oldIndex, newIndex) {
+        const order = this.selection[section].order;
+        const item = order.splice(oldIndex, 1)[0];
+        order.splice(newIndex, 0, item);
+    }
+    
+    updateSectionToggle(section) {
+        const card = document.querySelector(`[data-section="${section}"]`);
+        const toggle = card.querySelector('.section-toggle');
+        const totalItems = parseInt(card.dataset.count);
+        const selectedItems = this.selection[section].selected.length;
+        
+        toggle.classList.toggle('checked', selectedItems === totalItems);
+    }
+    
+    selectAll() {
+        this.selection.include_summary = true;
+        document.querySelector('[data-section="summary"] .section-toggle').classList.add('checked');
+        
+        Object.keys(this.selection).forEach(section => {
+            if (section === 'include_summary') return;
+            
+            const card = document.querySelector(`[data-section="${section}"]`);
+            if (!card) return;
+            
+            const count = parseInt(card.dataset.count);
+            this.selection[section].selected = this.range(count);
+            this.selection[section].order = this.range(count);
+            this.markItems(card, true);
+            
+            card.querySelector('.section-toggle').classList.add('checked');
+        });
+        
+        this.showNotification('Todos los elementos seleccionados', 'success');
+    }
+    
+    clearAll() {
+        this.selection.include_summary = false;
+        document.querySelector('[data-section="summary"] .section-toggle').classList.remove('checked');
+        
+        Object.keys(this.selection).forEach(section => {
+            if (section === 'include_summary') return;
+            
+            const card = document.querySelector(`[data-section="${section}"]`);
+            if (!card) return;
+            
+            this.selection[section].selected = [];
+            this.selection[section].order = [];
+            this.markItems(card, false);
+            
+            card.querySelector('.section-toggle').classList.remove('checked');
+        });
+        
+        this.showNotification('Todos los elementos deseleccionados', 'info');
+    }
+    
+    async loadTemplate() {
+        const select = document.getElementById('template-select');
+        const templateName = select.value;
+        
+        if (!templateName) {
+            this.showNotification('Por favor selecciona una plantilla', 'warning');
+            return;
+        }
+        
+        try {
+            const response = await fetch(`${BASE_URL}/personalizar/plantilla/${templateName}`);
+            const template = await response.json();
+            
+            if (template.error) {
+                this.showNotification('Error al cargar la plantilla', 'error');
+                return;
+            }
+            
+            this.applyTemplate(template.selection);
+            this.showNotification(`Plantilla "${templateName}" cargada correctamente`, 'success');
+        } catch (error) {
+            console.error('Error:', error);
+            this.showNotification('Error al cargar la plantilla', 'error');
+        }
+    }
+    
+    applyTemplate(selection) {
+        this.clearAll();
+        this.selection = { ...selection };
+        
+        this.selection.include_summary = selection.include_summary;
+        document.querySelector('[data-section="summary"] .section-toggle')
+            .classList.toggle('checked', selection.include_summary);
+        
+        document.querySelectorAll('.section-card[data-count]').forEach(card => {
+            const section = card.dataset.section;
+            if (!this.selection[section]) {
+                this.selection[section] = { selected: [], order: [] };
+            }
+            
+            // Solo se marcan los elementos ya cargados; el resto se marca al cargarlos
+            const selected = new Set(this.selection[section].selected);
+            card.querySelectorAll('.item').forEach(item => {
+                const isSelected = selected.has(parseInt(item.dataset.index));
+                item.classList.toggle('selected', isSelected);
+                item.querySelector('.item-checkbox').classList.toggle('checked', isSelected);
+            });
+            
+            this.updateSectionToggle(section);
+        });
+    }
+    
+    showSaveModal() {
+        document.getElementById('save-modal').style.display = 'block';
+        document.getElementById('template-name').focus();
+    }
+    
+    async showPreview() {
+        document.getElementById('preview-modal').style.display = 'block';
+        await this.updatePreview();
+    }
+    
+    async updatePreview() {
+        const format = document.getElementById('preview-format').value;
+        const previewContent = document.getElementById('preview-content');
+        
+        if (previewContent.dataset.format !== format) {
+            previewContent.textContent = 'Cargando vista previa...';
+        }
+        
+        if (this.streamPreview) {
+            await this.streamPreviewContent(format, previewContent);
+            return;
+        }
+        
+        const state = this.previewFragments[format] || (this.previewFragments[format] = { hashes: {}, content: {} });
+        
+        try {
+            const response = await fetch(`${BASE_URL}/preview/fragmentos`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    selection: this.selection,
+                    fmt: format,
+                    known: state.hashes
+                })
+            });
+            
+            if (response.ok) {
+                const data = await response.json();
+                Object.assign(state.content, data.fragments);
+                state.hashes = data.hashes;
+                this.patchPreview(previewContent, format, data.order, state.content, Object.keys(data.fragments));
+            } else {
+                delete previewContent.dataset.format;
+                previewContent.textContent = 'Error al cargar la vista previa';
+            }
+        } catch (error) {
+            console.error('Error:', error);
+            delete previewContent.dataset.format;
+            previewContent.textContent = 'Error de conexión';
+        }
+    }
+    
+    patchPreview(container, format, order, content, changed) {
+        // Un <span> por fragmento: solo se reescriben los que han cambiado
+        if (container.dataset.format !== format || container.children.length !== order.length) {
+            container.textContent = '';
+            container.dataset.format = format;
+            order.forEach(name => {
+                const span = document.createElement('span');
+                span.dataset.fragment = name;
+                span.textContent = content[name] || '';
+                container.appendChild(span);
+            });
+            return;
+        }
+        changed.forEach(name => {
+            const span = container.querySelector(`[data-fragment="${name}"]`);
+            if (span) span.textContent = content[name];
+        });
+    }
+    
+    async streamPreviewContent(format, previewContent) {
+        try {
+            const response = await fetch(`${BASE_URL}/preview/personalizada/stream`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    selection: this.selection,
+                    fmt: format
+                })
+            });
+            
+            if (!response.ok || !response.body) {
+                previewContent.textContent = 'Error al cargar la vista previa';
+                return;
+            }
+            
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            delete previewContent.dataset.format;
+            previewContent.textContent = '';
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                previewContent.append(decoder.decode(value, { stream: true }));
+            }
+            previewContent.append(decoder.decode());
+        } catch (error) {
+            console.error('Error:', error);
+            previewContent.textContent = 'Error de conexión';
+        }
+    }
+    
+    showGenerateModal() {
+        document.getElementById('generate-modal').style.display = 'block';
+        document.getElementById('output-name').focus();
+    }
+    
+    setupModalEvents() {
+        // Modal de guardar plantilla
+        document.getElementById('confirm-save-btn').addEventListener('click', async () => {
+            const name = document.getElementById('template-name').value.trim();
+            const description = document.getElementById('template-description').value.trim();
+            
+            if (!name) {
+                this.showNotification('Por favor ingresa un nombre para la plantilla', 'warning');
+                return;
+            }
+            
+            try {
+                const response = await fetch(`${BASE_URL}/personalizar/guardar`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        name,
+                        description,
+                        selection: this.selection,
+                        created: new Date().toISOString()
+                    })
+                });
+                
+                const result = await response.json();
+                if (result.success) {
+                    this.showNotification('Plantilla guardada correctamente', 'success');
+                    document.getElementById('save-modal').style.display = 'none';
+                    setTimeout(() => location.reload(), 1000);
+                } else {
+                    this.showNotification('Error al guardar la plantilla', 'error');
+                }
+            } catch (error) {
+                console.error('Error:', error);
+                this.showNotification('Error al guardar la plantilla', 'error');
+            }
+        });
+        
+        document.getElementById('cancel-save-btn').addEventListener('click', () => {
+            document.getElementById('save-modal').style.display = 'none';
+        });
+        
+        // Modal de vista previa
+        document.getElementById('refresh-preview-btn').addEventListener('click', () => {
+            this.updatePreview();
+        });
+        
+        document.getElementById('preview-format').addEventListener('change', () => {
+            this.updatePreview();
+        });
+        
+        document.getElementById('close-preview-btn').addEventListener('click', () => {
+            document.getElementById('preview-modal').style.display = 'none';
+        });
+        
+        // Modal de generar CV
+        document.getElementById('confirm-generate-btn').addEventListener('click', async () => {
+            const name = document.getElementById('output-name').value.trim();
+            const format = document.getElementById('output-format').value;
+            
+            if (!name) {
+                this.showNotification('Por favor ingresa un nombre para el archivo', 'warning');
+                return;
+            }
+            
+            try {
+                const response = await fetch(`${BASE_URL}/generar/personalizado`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        selection: this.selection,
+                        fmt: format,
+                        outname: name,
+                        async: true
+                    })
+                });
+                
+                // La generación se hace en segundo plano: se espera a que el trabajo termine
+                let job = await response.json();
+                document.getElementById('generate-modal').style.display = 'none';
+                this.showNotification('Generando el CV...', 'info');
+                while (job.status === 'queued' || job.status === 'running') {
+                    job = await (await fetch(`${job.url}?wait=20`)).json();
+                }
+                if (job.status === 'done') {
+                    window.location.href = job.downloads[0];
+                    this.showNotification('CV generado y descargado correctamente', 'success');
+                } else {
+                    this.showNotification(`Error al generar el CV${job.error ? ': ' + job.error : ''}`, 'error');
+                }
+            } catch (error) {
+                console.error('Error:', error);
+                this.showNotification('Error al generar el CV', 'error');
+            }
+        });
+        
+        document.getElementById('cancel-generate-btn').addEventListener('click', () => {
+            document.getElementById('generate-modal').style.display = 'none';
+        });
+        
+        // Cerrar modales haciendo clic fuera
+        document.querySelectorAll('.modal').forEach(modal => {
+            modal.addEventListener('click', (e) => {
+                if (e.target === modal) {
+                    modal.style.display = 'none';
+                }
+            });
+        });
+    }
+    
+    showNotification(message, type = 'info') {
+        // Función simple de notificación
+        if (typeof showNotification === 'function') {
+            showNotification(message, type);
+        } else {
+            alert(message);
+        }
+    }
+}
+
+// Inicializar cuando la página esté cargada
+document.addEventListener('DOMContentLoaded', () => {
+    new CVCustomizer();
+});
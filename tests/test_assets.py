@@ -0,0 +1,74 @@
+import gzip
+import json
+import os
+
+from flask import Flask
+
+from cv_assets import Assets, build, minify_css, minify_js
+
+
+def test_minify_js_keeps_strings_templates_and_regexes():
+    source = """
+    // comentario
+    const url = "http://x/y";   /* otro */
+    const re = /\\/\\/ no es comentario/g;
+    const t = `a  // b ${ {k: '/*'}.k } c`;
+    const half = total / 2 / count;
+    """
+    out = minify_js(source)
+    assert "comentario\"" not in out and "otro" not in out
+    assert 'const url = "http://x/y";' in out
+    assert "/\\/\\/ no es comentario/g" in out
+    assert "`a  // b ${ {k: '/*'}.k } c`" in out
+    assert "total / 2 / count" in out
+
+
+def test_minify_css_keeps_strings_and_calc():
+    source = """
+    /* cabecera */
+    a :hover { content : "a  ;  b" ; width : calc(100% - 2px) ; }
+    .x > .y , .z { margin : 0 }
+    """
+    out = minify_css(source)
+    assert "cabecera" not in out
+    assert '"a  ;  b";' in out
+    assert "width:calc(100% - 2px)}" in out
+    assert "a :hover{" in out and ".x>.y,.z{margin:0}" in out
+
+
+def _static(tmp_path, css):
+    (tmp_path / "css").mkdir(exist_ok=True)
+    (tmp_path / "css" / "style.css").write_text(css, encoding="utf-8")
+    return str(tmp_path)
+
+
+def test_build_hashes_compresses_and_prunes(tmp_path):
+    static = _static(tmp_path, "body { color : red }\n" * 40)
+    first = build(static)["css/style.css"]
+    dist = tmp_path / "dist"
+    assert first.startswith("css/style.") and (dist / first).exists() and (dist / (first + ".gz")).exists()
+    assert gzip.decompress((dist / (first + ".gz")).read_bytes()) == (dist / first).read_bytes()
+    assert json.loads((dist / "manifest.json").read_text())["assets"] == {"css/style.css": first}
+    _static(tmp_path, "body { color : blue }\n" * 40)
+    second = build(static)["css/style.css"]
+    assert second != first and not (dist / first).exists() and not (dist / (first + ".gz")).exists()
+
+
+def test_send_picks_encoding_and_caches_forever(tmp_path):
+    static = _static(tmp_path, "p { margin : 0 }\n" * 40)
+    app = Flask(__name__, static_folder=static, static_url_path="/static")
+    assets = Assets(static)
+    app.add_url_rule("/assets/<path:filename>", "assets", assets.send)
+    with app.test_request_context():
+        url = assets.url("css/style.css")
+        assert url.startswith("/assets/css/style.")
+        assert assets.url("js/otro.js") == "/static/js/otro.js"
+    client = app.test_client()
+    gz = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert gz.headers["Content-Encoding"] == "gzip" and "immutable" in gz.headers["Cache-Control"]
+    assert "Accept-Encoding" in gz.headers["Vary"]
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers and plain.data == gzip.decompress(gz.data)
+    assert client.get("/assets/manifest.json").status_code == 404
+    assert client.get("/assets/../css/style.css").status_code == 404
+    assert os.path.isdir(os.path.join(static, "dist"))
@@ -0,0 +1,24 @@
+import os
+
+from cv_batch import run_batch
+from cv_export import Exporter
+from cv_render import RenderEngine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _exported(directory):
+    return [f for _, _, files in os.walk(directory) for f in files]
+
+
+def test_exports_go_to_the_given_directory(tmp_path):
+    exporter = Exporter(str(tmp_path / "root"), workers=0)
+    engine = RenderEngine(os.path.join(ROOT, "render_templates"))
+    cv = {"contact": {"name": "Ana"}, "summary": "Resumen", "skills": [{"name": "Go"}]}
+    results = run_batch(cv, {"t": {"selection": {}}}, "all", ["md", "html"], engine, workers=2,
+                        exporter=exporter, export_dir=str(tmp_path / "profile"))
+    assert [r["fmt"] for r in results] == ["md", "html"]
+    assert not any("error" in r for r in results), results
+    assert b"Ana" in results[1]["content"]
+    assert len(_exported(tmp_path / "profile")) == 1
+    assert not os.path.exists(tmp_path / "root")
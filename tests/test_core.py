@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from cv_core import SelectionPlan, compile_selection, filter_cv_by_selection, migrate_plans, template_plan
+from cv_store import DocumentStore, open_cv_store, thaw
+
+
+def _cv(**sections):
+    return {"contact": {"name": "Ana"}, "summary": "Resumen", **sections}
+
+
+SKILLS = [{"name": n} for n in "abcde"]
+
+
+def _names(cv, section="skills"):
+    return [item["name"] for item in cv[section]]
+
+
+def test_duplicate_indices_and_positions_are_dropped():
+    plan = SelectionPlan.compile({"skills": {"selected": [2, 0, 2, 1], "order": [0, 0, 1, 2, 3]}})
+    assert plan.sections == {"skills": (2, 0, 1)}
+
+
+@pytest.mark.parametrize("selected", [[1, 9, 3], [1, -1, 3], [1, "x", 3], [1, None, 3]])
+def test_invalid_indices_are_dropped(selected):
+    plan = SelectionPlan.compile({"skills": {"selected": selected}}, cv=_cv(skills=SKILLS))
+    assert plan.sections == {"skills": (1, 3)}
+    assert _names(plan.apply(_cv(skills=SKILLS))) == ["b", "d"]
+
+
+def test_invalid_positions_in_order_are_dropped():
+    plan = SelectionPlan.compile({"skills": {"selected": [4, 3, 2], "order": [2, "x", -1, 7, 0]}})
+    assert plan.sections == {"skills": (2, 4)}
+
+
+def test_numeric_strings_are_accepted():
+    plan = SelectionPlan.compile({"skills": {"selected": ["3", "1"]}})
+    assert plan.sections == {"skills": (3, 1)}
+
+
+def test_order_is_preserved_and_unmentioned_sections_are_copied():
+    cv = _cv(skills=SKILLS, courses=[{"name": "c"}])
+    plan = SelectionPlan.compile({"include_summary": False, "skills": {"selected": [0, 3, 4], "order": [2, 0, 1]}})
+    out = plan.apply(cv)
+    assert _names(out) == ["e", "a", "d"]
+    assert out["courses"] is cv["courses"]
+    assert (out["contact"], out["summary"]) == ({"name": "Ana"}, "")
+
+
+def test_without_cv_out_of_range_indices_are_skipped_on_apply():
+    plan = SelectionPlan.compile({"skills": {"selected": [4, 9, 1]}})
+    assert plan.sections == {"skills": (4, 9, 1)}
+    assert _names(plan.apply(_cv(skills=SKILLS))) == ["e", "b"]
+
+
+def test_prefix_selection_is_sliced():
+    plan = SelectionPlan.compile({"skills": {"selected": [0, 1, 2]}, "courses": {"selected": [1, 0]}})
+    assert plan._prefix == {"skills"}
+    assert _names(plan.apply(_cv(skills=SKILLS, courses=[{"name": "x"}, {"name": "y"}]))) == ["a", "b", "c"]
+    # Si el CV tiene menos elementos, el slice se queda con los que haya
+    assert _names(plan.apply(_cv(skills=SKILLS[:2]))) == ["a", "b"]
+    # Una selección vacía también es un prefijo
+    assert SelectionPlan.compile({"skills": {"selected": []}}).apply(_cv(skills=SKILLS))["skills"] == []
+
+
+def test_json_round_trip():
+    plan = SelectionPlan.compile({"include_summary": False, "skills": {"selected": [3, 1]},
+                                  "projects": {"selected": [0]}})
+    data = json.loads(json.dumps(plan.to_json()))
+    again = SelectionPlan.from_json(data)
+    assert again.key == plan.key
+    assert (again.include_summary, again.sections) == (False, {"skills": (3, 1), "projects": (0,)})
+    assert again.apply(_cv(skills=SKILLS)) == plan.apply(_cv(skills=SKILLS))
+
+
+@pytest.mark.parametrize("data", [None, {}, {"v": 2, "sections": {}}, {"sections": {"skills": [0]}}])
+def test_from_json_rejects_unknown_versions(data):
+    assert SelectionPlan.from_json(data) is None
+
+
+def test_compile_selection_and_template_plan():
+    plan = SelectionPlan.compile({"skills": {"selected": [1]}})
+    assert compile_selection(plan) is plan
+    assert filter_cv_by_selection(_cv(skills=SKILLS), {"skills": {"selected": [1]}}) == plan.apply(_cv(skills=SKILLS))
+    # El plan guardado manda sobre la selección
+    template = {"selection": {"skills": {"selected": [0]}}, "plan": {"v": 1, "include_summary": True, "sections": {"skills": [4]}}}
+    assert template_plan(template).sections == {"skills": (4,)}
+    assert template_plan({"selection": {"skills": {"selected": [0]}}}).sections == {"skills": (0,)}
+
+
+def test_migrating_a_legacy_selection_uses_the_deduplicated_view(tmp_path):
+    store = open_cv_store(str(tmp_path), dedup="exact")
+    for title in ("Charla", "Charla", "Premio", "Beca"):
+        store.append_item("otros", {"title": title})
+    deduped = store.deduped_view()
+    assert [o["title"] for o in deduped["otros"]] == ["Charla", "Premio", "Beca"]
+    templates = DocumentStore(str(tmp_path / "templates.json"))
+    # Selección antigua, guardada con índices del CV ya deduplicado; el 3 no existe ahí
+    templates.set("vieja", {"name": "vieja", "selection": {"otros": {"selected": [2, 3, 0]}}})
+    assert migrate_plans(templates, deduped) == 1
+    template = thaw(templates.view()["vieja"])
+    assert template["plan"]["sections"] == {"otros": [2, 0]}
+    assert [o["title"] for o in template_plan(template).apply(deduped)["otros"]] == ["Beca", "Charla"]
+    assert migrate_plans(templates, deduped) == 0
@@ -0,0 +1,93 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from cv_core import migrate_plans
+from cv_dedup import DedupIndex, dedup_cv, minhash, shingles, signature
+from cv_store import DocumentStore, open_cv_store, thaw
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _cv(**sections):
+    return {"contact": {}, "summary": "", **sections}
+
+
+def test_exact_mode_only_dedups_otros_like_the_original_app():
+    cv = _cv(skills=[{"name": "Python", "level": "Avanzado"}, {"name": "Python", "level": "Avanzado"}],
+             otros=[{"title": "Charla", "institution": "PyCon", "periodo": "2020"},
+                    {"title": "Charla ", "company": "PyCon", "start": "2020", "description": "otra"},
+                    {"title": "charla", "institution": "PyCon", "periodo": "2020"}])
+    out = dedup_cv(cv, "exact")
+    assert len(out["skills"]) == 2
+    assert [o["title"] for o in out["otros"]] == ["Charla", "charla"]
+
+
+@pytest.mark.parametrize("mode", ["all", "fuzzy"])
+def test_different_entries_with_same_key_fields_are_kept(mode):
+    cv = _cv(skills=[{"name": "Python", "level": "Avanzado"}, {"name": "python", "level": "Básico"}],
+             experience=[{"title": "Dev", "company": "ACME", "start": "2020", "description": "Backend en Go"},
+                         {"title": "Dev", "company": "ACME", "start": "2020", "description": "Soporte a clientes y formación"}],
+             courses=[{}, {"name": ""}])
+    out = dedup_cv(cv, mode)
+    assert len(out["skills"]) == 2
+    assert len(out["experience"]) == 2
+    assert len(out["courses"]) == 2
+
+
+@pytest.mark.parametrize("mode", ["all", "fuzzy"])
+def test_identical_entries_after_normalization_are_removed(mode):
+    cv = _cv(skills=[{"name": "Python", "level": "Avanzado", "tags": ["Lang"]},
+                     {"name": "PYTHON", "level": "avanzado.", "tags": ["lang"]},
+                     {"name": "Go", "level": "Avanzado", "tags": ["lang"]}])
+    assert [s["name"] for s in dedup_cv(cv, mode)["skills"]] == ["Python", "Go"]
+
+
+def test_fuzzy_catches_near_duplicates():
+    a = {"title": "Desarrollador backend", "company": "ACME", "start": "2020-01",
+         "description": "APIs REST en Python y despliegue en Kubernetes para el equipo de pagos"}
+    b = dict(a, description=a["description"] + ".", title="Desarrollador Backend ")
+    b["description"] = b["description"].replace("pagos", "pago")
+    assert len(dedup_cv(_cv(experience=[a, b]), "fuzzy")["experience"]) == 1
+    assert len(dedup_cv(_cv(experience=[a, b]), "all")["experience"]) == 2
+
+
+def test_minhash_is_stable_across_processes():
+    item = {"title": "Dev", "company": "ACME", "description": "Python"}
+    code = ("import json, sys; from cv_dedup import minhash, shingles, signature; "
+            "print(json.dumps(minhash(shingles(signature('experience', json.loads(sys.argv[1]))))))")
+    outputs = set()
+    for seed in ("1", "2"):
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        result = subprocess.run([sys.executable, "-c", code, json.dumps(item)], cwd=ROOT, env=env,
+                                capture_output=True, text=True, check=True)
+        outputs.add(result.stdout)
+    assert outputs == {json.dumps(list(minhash(shingles(signature("experience", item))))) + "\n"}
+
+
+@pytest.mark.parametrize("mode", ["exact", "all", "fuzzy"])
+def test_incremental_index_matches_rebuild(mode, tmp_path):
+    store = open_cv_store(str(tmp_path), dedup=mode)
+    items = [{"title": "A", "institution": "X", "periodo": "1"}, {"title": "B"}, {"title": "A", "institution": "X", "periodo": "1"},
+             {"title": "B"}, {"title": "C"}]
+    store.extend_items("otros", items[:3])
+    store.append_item("otros", items[3])
+    store.append_item("otros", items[4])
+    store.update_item("otros", 0, {"title": "Z"})
+    store.delete_item("otros", 1)
+    fresh = DedupIndex(mode)
+    fresh.rebuild(store.view())
+    assert store.duplicates() == fresh.duplicates()
+
+
+def test_migrate_plans_pins_old_selections(tmp_path):
+    templates = DocumentStore(str(tmp_path / "templates.json"))
+    templates.set("vieja", {"name": "vieja", "selection": {"skills": {"selected": [1, 0, 7]}}})
+    templates.set("nueva", {"name": "nueva", "selection": {}, "plan": {"v": 1, "include_summary": True, "sections": {}}})
+    cv = _cv(skills=[{"name": "a"}, {"name": "b"}])
+    assert migrate_plans(templates, cv) == 1
+    assert thaw(templates.view()["vieja"]["plan"])["sections"] == {"skills": [1, 0]}
+    assert migrate_plans(templates, cv) == 0
@@ -0,0 +1,67 @@
+import importlib
+import sys
+
+import pytest
+
+CV = {
+    "contact": {"name": "Ana", "email": "ana@example.com", "links": ["https://example.com"]},
+    "summary": "Desarrolladora backend.",
+    "skills": [{"name": "Python", "level": "Avanzado", "tags": ["web"]}, {"name": "Go"}],
+    "experience": [{"title": f"Puesto {i}", "company": "ACME", "start": "2019", "end": "2020",
+                    "description": "Servicios", "tech": ["k8s", "sql"]} for i in range(4)],
+    "projects": [{"title": "Web", "tech": ["react"], "start": "2015"}],
+    "education": [],
+    "courses": [{"name": "Docker", "issuer": "Udemy", "date": "2020"}],
+    "otros": [{"title": "Charla", "institution": "PyCon", "periodo": "2021"}],
+}
+
+
+@pytest.fixture(scope="module", params=["app_dist", "cv_app"])
+def app_module(request, tmp_path_factory):
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("CVTOOL_DATA_DIR", str(tmp_path_factory.mktemp(request.param)))
+        sys.modules.pop(request.param, None)
+        module = importlib.import_module(request.param)
+        yield module
+        sys.modules.pop(request.param, None)
+
+
+@pytest.fixture
+def app(app_module):
+    app_module.save_cv(CV)
+    return app_module
+
+
+@pytest.mark.parametrize("fmt", ["md", "txt"])
+@pytest.mark.parametrize("selection", [
+    {},
+    {"include_summary": False, "experience": {"selected": [3, 0, 2], "order": [1, 0, 2]}},
+    {"skills": {"selected": []}, "courses": {"selected": []}, "otros": {"selected": [0]}},
+])
+def test_fragments_concatenate_to_the_full_render(app, fmt, selection):
+    fragments = app.render_fragments(selection, fmt)
+    assert [name for name, _, _ in fragments] == app.FRAGMENTS
+    _, full = app.render_cv(selection, fmt)
+    assert "".join(content for _, _, content in fragments).encode("utf-8") == full.encode("utf-8")
+
+
+def test_only_changed_fragments_are_resent(app):
+    client = app.app.test_client()
+    sel = {"experience": {"selected": [0, 2]}}
+    first = client.post("/preview/fragmentos", json={"selection": sel, "fmt": "md", "known": {}}).get_json()
+    assert first["order"] == app.FRAGMENTS
+    assert set(first["fragments"]) == set(app.FRAGMENTS)
+    full = client.post("/preview/personalizada", json={"selection": sel, "fmt": "md"}).get_json()["content"]
+    assert "".join(first["fragments"][name] for name in first["order"]) == full
+
+    again = client.post("/preview/fragmentos", json={"selection": sel, "fmt": "md", "known": first["hashes"]}).get_json()
+    assert again["fragments"] == {} and again["hashes"] == first["hashes"]
+
+    sel = {"experience": {"selected": [1]}}
+    second = client.post("/preview/fragmentos", json={"selection": sel, "fmt": "md", "known": first["hashes"]}).get_json()
+    assert list(second["fragments"]) == ["experience"]
+    assert "Puesto 1" in second["fragments"]["experience"]
+
+    app.CV_STORE.update_item("skills", 1, {"name": "Rust"})
+    third = client.post("/preview/fragmentos", json={"selection": sel, "fmt": "md", "known": second["hashes"]}).get_json()
+    assert list(third["fragments"]) == ["skills"] and "Rust" in third["fragments"]["skills"]
@@ -0,0 +1,85 @@
+import io
+import json
+import threading
+
+import pytest
+
+from cv_import import import_records, import_stream
+from cv_persist import Journal
+from cv_store import open_cv_store
+
+
+def _jsonl(*records):
+    return io.BytesIO("\n".join(json.dumps(r) for r in records).encode("utf-8"))
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, tmp_path):
+    return open_cv_store(str(tmp_path), storage=request.param)
+
+
+def test_only_full_duplicates_are_discarded(store):
+    store.append_item("courses", {"name": "Docker", "issuer": "Udemy", "date": "2020"})
+    result = import_stream(store, _jsonl(
+        {"section": "courses", "name": "docker", "issuer": "UDEMY", "date": "2020"},
+        {"section": "courses", "name": "Docker", "issuer": "Udemy", "date": "2023"},
+        {"section": "skills", "name": "Go"},
+        {"section": "skills", "name": "Go"},
+        {"section": "skills", "nombre": "x"},
+        {"section": "nada", "name": "x"},
+    ), "jsonl")
+    assert (result["accepted"], result["duplicates"], result["rejected"]) == (2, 2, 2)
+    assert result["sections"] == {"courses": 1, "skills": 1}
+    assert [c["date"] for c in store.view()["courses"]] == ["2020", "2023"]
+
+
+def test_whole_import_is_a_single_store_operation(store):
+    ops = []
+    mutate = store._mutate
+    store._mutate = lambda op: ops.append(op["op"]) or mutate(op)
+    records = [{"section": "skills", "name": f"S{i}"} for i in range(1200)]
+    records += [{"section": "projects", "title": f"P{i}"} for i in range(5)]
+    result = import_stream(store, _jsonl(*records), "jsonl")
+    assert result["accepted"] == 1205
+    assert ops == ["extend_sections"]
+    assert len(store.view()["skills"]) == 1200
+    assert store.search("p3")[0] == 1
+
+
+def test_import_is_one_journal_line_and_replays(tmp_path):
+    store = open_cv_store(str(tmp_path))
+    store.set("summary", "x")
+    import_stream(store, _jsonl({"section": "skills", "name": "Go"}, {"section": "otros", "title": "Premio"}), "jsonl")
+    journal = Journal(str(tmp_path / "cv.json.journal"))
+    assert [op["op"] for op in journal.read()] == ["set", "extend_sections"]
+    reopened = open_cv_store(str(tmp_path))
+    assert [s["name"] for s in reopened.view()["skills"]] == ["Go"]
+    assert [o["title"] for o in reopened.view()["otros"]] == ["Premio"]
+
+
+def test_store_is_not_locked_while_records_are_read(store):
+    waited = []
+
+    def records():
+        yield 1, {"section": "skills", "name": "Go"}
+        # Mientras la subida sigue llegando, otro hilo lee y escribe el CV
+        writer = threading.Thread(target=lambda: store.append_item("skills", {"name": "Rust"}))
+        writer.start()
+        writer.join(timeout=5)
+        waited.append(writer.is_alive())
+        yield 2, {"section": "skills", "name": "Rust"}
+        yield 3, {"section": "skills", "name": "Zig"}
+
+    result = import_records(store, records())
+    assert waited == [False]
+    # Lo escrito durante la lectura cuenta para los duplicados
+    assert (result["accepted"], result["duplicates"]) == (2, 1)
+    assert [s["name"] for s in store.view()["skills"]] == ["Rust", "Go", "Zig"]
+
+
+def test_import_with_only_rejected_records_does_not_touch_the_store(store):
+    ops = []
+    store._mutate = lambda op: ops.append(op)
+    result = import_stream(store, _jsonl({"section": "nada", "name": "x"}), "jsonl")
+    assert (result["accepted"], result["rejected"], result["sections"]) == (0, 1, {})
+    assert ops == []
@@ -0,0 +1,63 @@
+import json
+import socket
+import subprocess
+import sys
+import threading
+
+from cv_jobs import JobQueue
+
+
+def _queue(tmp_path, handlers, **kwargs):
+    return JobQueue(str(tmp_path / "jobs.json"), handlers, **kwargs)
+
+
+def test_jobs_run_in_background_and_report_errors(tmp_path):
+    def ok(payload, progress):
+        progress(1, 2)
+        progress(2, 2)
+        return {"n": payload["n"] * 2}
+
+    def fail(payload, progress):
+        raise ValueError("sin plantilla")
+
+    queue = _queue(tmp_path, {"ok": ok, "fail": fail})
+    try:
+        job, created = queue.submit("ok", {"n": 21})
+        assert created and job["status"] == "queued"
+        done = queue.wait(job["id"], 5)
+        assert (done["status"], done["progress"], done["result"]) == ("done", 1.0, {"n": 42})
+        failed = queue.wait(queue.submit("fail", {})[0]["id"], 5)
+        assert (failed["status"], failed["error"]) == ("error", "sin plantilla")
+        assert [j["kind"] for j in queue.list()] == ["fail", "ok"]
+    finally:
+        queue.shutdown()
+
+
+def test_identical_queued_jobs_are_merged(tmp_path):
+    release = threading.Event()
+    queue = _queue(tmp_path, {"slow": lambda payload, progress: release.wait(5)}, workers=1)
+    try:
+        first, _ = queue.submit("slow", {"a": 1})
+        second, created = queue.submit("slow", {"a": 2})
+        again, created_again = queue.submit("slow", {"a": 2})
+        assert created and not created_again and again["id"] == second["id"]
+        release.set()
+        assert queue.wait(second["id"], 5)["status"] == "done"
+        assert queue.wait(first["id"], 5)["status"] == "done"
+    finally:
+        release.set()
+        queue.shutdown()
+
+
+def test_jobs_of_a_dead_process_are_resumed(tmp_path):
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    job = {"id": "j1", "kind": "ok", "payload": {}, "key": "ok:{}", "status": "running", "progress": 0.5,
+           "result": None, "error": None, "created": 1.0, "started": 1.0, "finished": None,
+           "owner": f"{socket.gethostname()}:{dead.pid}"}
+    (tmp_path / "jobs.json").write_text(json.dumps({"j1": job}), encoding="utf-8")
+    queue = _queue(tmp_path, {"ok": lambda payload, progress: "hecho"})
+    try:
+        assert queue.wait("j1", 5)["result"] == "hecho"
+    finally:
+        queue.shutdown()
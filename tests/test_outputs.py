@@ -0,0 +1,36 @@
+import hashlib
+import os
+
+from cv_outputs import OutputStore
+
+
+def _objects(store):
+    return sorted(os.path.join(root, f) for root, _, files in os.walk(store.objects_dir) for f in files)
+
+
+def test_same_content_is_stored_once(tmp_path):
+    store = OutputStore(str(tmp_path))
+    store.put_text("CV.md", ("# Ana\n", "texto"))
+    store.put_text("Copia.md", ("# Ana\ntexto",))
+    assert len(_objects(store)) == 1
+    assert (tmp_path / "CV.md").read_text(encoding="utf-8") == "# Ana\ntexto"
+    path, etag = store.lookup("Copia.md")
+    assert etag == hashlib.sha1(b"# Ana\ntexto").hexdigest()
+    # Regenerar el mismo contenido no cambia el fichero publicado
+    before = os.stat(tmp_path / "CV.md").st_ino
+    store.put_text("CV.md", ("# Ana\ntexto",), digest=etag)
+    assert os.stat(tmp_path / "CV.md").st_ino == before
+
+
+def test_gc_removes_least_recently_used_objects_and_their_names(tmp_path):
+    store = OutputStore(str(tmp_path), max_bytes=2500)
+    for n, name in enumerate(("a.txt", "b.txt", "c.txt")):
+        store.put_bytes(name, bytes([n]) * 1000)
+        path = store.lookup(name)[0]
+        os.utime(path, (n, n))
+    # El cuarto supera el límite: se borran los más antiguos hasta bajar del 80 %
+    store.put_bytes("d.txt", b"d" * 1000)
+    assert store.lookup("a.txt") is None and not (tmp_path / "a.txt").exists()
+    assert store.lookup("b.txt") is None
+    assert store.lookup("d.txt") is not None and (tmp_path / "d.txt").read_bytes() == b"d" * 1000
+    assert sum(os.path.getsize(p) for p in _objects(store)) <= 2500
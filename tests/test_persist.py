@@ -0,0 +1,127 @@
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from cv_persist import Journal, JSONFileBackend
+from cv_store import DocumentStore, open_cv_store
+
+
+def test_journal_replays_after_reopen(tmp_path):
+    path = str(tmp_path / "doc.json")
+    store = DocumentStore(path)
+    store.set("a", 1)
+    store.set("b", 2)
+    assert DocumentStore(path).view() == {"a": 1, "b": 2}
+
+
+def test_torn_tail_is_trimmed_before_new_appends(tmp_path):
+    path = str(tmp_path / "doc.json")
+    store = DocumentStore(path)
+    store.set("a", 1)
+    store.set("b", 2)
+    # Caída a mitad de escribir la tercera operación
+    with open(path + ".journal", "a", encoding="utf-8") as f:
+        f.write('{"op": "set", "key": "x", "va')
+
+    reopened = DocumentStore(path)
+    assert reopened.view() == {"a": 1, "b": 2}
+    reopened.set("c", 3)
+    reopened.set("d", 4)
+
+    assert DocumentStore(path).view() == {"a": 1, "b": 2, "c": 3, "d": 4}
+    with open(path + ".journal", encoding="utf-8") as f:
+        assert all(json.loads(line) for line in f)
+
+
+def test_line_without_newline_is_dropped(tmp_path):
+    journal = Journal(str(tmp_path / "j"))
+    journal.append({"n": 1})
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"n": 2}')
+    assert journal.read() == [{"n": 1}]
+    journal.append({"n": 3})
+    assert journal.read() == [{"n": 1}, {"n": 3}]
+
+
+def test_compaction_truncates_journal(tmp_path):
+    path = str(tmp_path / "doc.json")
+    store = DocumentStore(path, backend=JSONFileBackend(path, compact_every=3))
+    for i in range(7):
+        store.set(f"k{i}", i)
+    assert os.path.getsize(path + ".journal") > 0
+    assert Journal(path + ".journal").read() == [{"op": "set", "key": "k6", "value": 6}]
+    assert DocumentStore(path).view() == {f"k{i}": i for i in range(7)}
+
+
+def test_cv_item_ops_survive_crash_and_reload(tmp_path):
+    store = open_cv_store(str(tmp_path))
+    store.append_item("skills", {"name": "Python", "level": "Avanzado", "tags": ["lang"]})
+    store.append_item("skills", {"name": "SQL", "level": "Medio", "tags": []})
+    with open(os.path.join(str(tmp_path), "cv.json.journal"), "ab") as f:
+        f.write(b'{"op": "app')
+    store = open_cv_store(str(tmp_path))
+    store.update_item("skills", 1, {"level": "Avanzado"})
+    store.delete_item("skills", 0)
+    skills = open_cv_store(str(tmp_path)).view()["skills"]
+    assert [s.to_dict() for s in skills] == [{"name": "SQL", "level": "Avanzado", "tags": []}]
+
+
+def test_crash_between_compaction_and_journal_truncate(tmp_path, monkeypatch):
+    path = str(tmp_path / "cv.json")
+    store = open_cv_store(str(tmp_path))
+    store.backend.compact_every = 5
+    for i in range(1, 5):
+        store.append_item("otros", {"title": f"o{i}"})
+
+    def crash():
+        raise OSError("caída antes de vaciar el diario")
+
+    # La quinta operación compacta: la base nueva ya la incluye, pero el diario se queda como estaba
+    monkeypatch.setattr(store.backend.journal, "truncate", crash)
+    try:
+        store.append_item("otros", {"title": "o5"})
+    except OSError:
+        pass
+    assert len(Journal(path + ".journal").read()) == 5
+
+    reopened = open_cv_store(str(tmp_path))
+    assert [o["title"] for o in reopened.view()["otros"]] == ["o1", "o2", "o3", "o4", "o5"]
+    # Una operación posicional después de la caída afecta al elemento correcto
+    reopened.delete_item("otros", 0)
+    reopened.append_item("otros", {"title": "o6"})
+    assert [o["title"] for o in open_cv_store(str(tmp_path)).view()["otros"]] == ["o2", "o3", "o4", "o5", "o6"]
+
+
+def test_journal_without_header_is_still_replayed(tmp_path):
+    path = str(tmp_path / "doc.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"a": 1}, f)
+    with open(path + ".journal", "w", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "set", "key": "b", "value": 2}) + "\n")
+    assert DocumentStore(path).view() == {"a": 1, "b": 2}
+
+
+def _append_worker(data_dir, storage, worker, count):
+    store = open_cv_store(data_dir, storage=storage)
+    if storage == "json":
+        # Compactar a menudo: también se reescribe cv.json con otros procesos escribiendo
+        store.backend.compact_every = 7
+    for i in range(count):
+        store.append_item("projects", {"title": f"w{worker}-{i}"})
+
+
+@pytest.mark.parametrize("storage", ["json", "sqlite"])
+def test_file_lock_loses_no_writes_across_processes(tmp_path, storage):
+    processes, count = 4, 60
+    ctx = multiprocessing.get_context("spawn")
+    workers = [ctx.Process(target=_append_worker, args=(str(tmp_path), storage, w, count)) for w in range(processes)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join(timeout=60)
+    assert [p.exitcode for p in workers] == [0] * processes
+    titles = [p["title"] for p in open_cv_store(str(tmp_path), storage=storage).view()["projects"]]
+    assert len(titles) == processes * count
+    assert set(titles) == {f"w{w}-{i}" for w in range(processes) for i in range(count)}
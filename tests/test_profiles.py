@@ -0,0 +1,102 @@
+import os
+
+import pytest
+from flask import Flask, jsonify, request, url_for
+
+from cv_profiles import Profile, ProfileMiddleware, ProfileRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    opened = []
+
+    def factory(profile_id, data_dir):
+        opened.append(profile_id)
+        return Profile(profile_id, data_dir)
+
+    registry = ProfileRegistry(str(tmp_path / "profiles"), factory, Profile(None, str(tmp_path)), maxsize=2)
+    registry.opened = opened
+    return registry
+
+
+@pytest.fixture
+def client(registry):
+    app = Flask(__name__)
+
+    @app.route("/skills")
+    def skills():
+        profile = registry.current()
+        return jsonify({
+            "profile": profile.id,
+            "skills": [s["name"] for s in profile.cv.view().get("skills") or ()],
+            "script_name": request.environ["SCRIPT_NAME"],
+            "path_info": request.environ["PATH_INFO"],
+            "url": url_for("skills"),
+        })
+
+    app.wsgi_app = ProfileMiddleware(app.wsgi_app, registry)
+    return app.test_client()
+
+
+def test_prefix_moves_to_script_name_and_url_for(registry, client):
+    registry.create("ana")
+    body = client.get("/p/ana/skills").get_json()
+    assert body == {"profile": "ana", "skills": [], "script_name": "/p/ana", "path_info": "/skills",
+                    "url": "/p/ana/skills"}
+    body = client.get("/skills").get_json()
+    assert (body["profile"], body["script_name"], body["url"]) == (None, "", "/skills")
+
+
+@pytest.mark.parametrize("path", ["/p/nadie/skills", "/p/../skills", "/p/a.b/skills"])
+def test_unknown_or_invalid_profiles_are_not_found(client, path):
+    assert client.get(path).status_code == 404
+
+
+def test_least_recently_used_profile_is_closed_and_reopened(registry):
+    for profile_id in ("a", "b", "c"):
+        registry.create(profile_id)
+    a = registry.get("a")
+    a.cv.append_item("skills", {"name": "Go"})
+    registry.get("b")
+    assert registry.get("a") is a
+    registry.get("c")
+    # "b" era el menos usado
+    assert registry.open_count() == 2 and registry.opened == ["a", "b", "c"]
+    assert registry.get("a") is a
+    registry.get("b")
+    registry.get("c")
+    # Ahora el cerrado es "a": se vuelve a abrir desde disco con sus datos
+    reopened = registry.get("a")
+    assert reopened is not a
+    assert registry.opened == ["a", "b", "c", "b", "c", "a"]
+    assert [s["name"] for s in reopened.cv.view()["skills"]] == ["Go"]
+
+
+def test_profiles_do_not_share_data(registry, client):
+    registry.create("ana")
+    registry.create("luis")
+    ana, luis = registry.get("ana"), registry.get("luis")
+    ana.cv.append_item("skills", {"name": "Python"})
+    luis.cv.append_item("skills", {"name": "Go"})
+    registry.default.cv.append_item("skills", {"name": "SQL"})
+    assert client.get("/p/ana/skills").get_json()["skills"] == ["Python"]
+    assert client.get("/p/luis/skills").get_json()["skills"] == ["Go"]
+    assert client.get("/skills").get_json()["skills"] == ["SQL"]
+
+    ana.templates.set("t", {"name": "t", "selection": {}})
+    assert "t" not in luis.templates_view()
+    ana.outputs.put_text("cv.md", ["# Ana\n"])
+    assert ana.outputs.lookup("cv.md") is not None
+    assert luis.outputs.lookup("cv.md") is None
+    assert registry.default.outputs.lookup("cv.md") is None
+    assert os.path.commonpath([ana.out_dir, luis.out_dir]) == registry.root
+
+
+def test_use_sets_the_profile_outside_a_request(registry):
+    registry.create("ana")
+    with registry.use("ana") as profile:
+        assert registry.current() is profile and profile.id == "ana"
+    assert registry.current() is registry.default
+    with pytest.raises(LookupError):
+        with registry.use("nadie"):
+            pass
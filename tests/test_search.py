@@ -0,0 +1,50 @@
+import pytest
+
+from cv_search import SearchIndex, item_period, parse_bound, parse_month
+
+
+def test_parse_month_formats():
+    march = 2020 * 12 + 2
+    for text in ("2020-03", "2020/3", "03/2020", "marzo 2020", "Mar. 2020", "2020-03-15"):
+        assert parse_month(text) == march, text
+    assert parse_month("2020") == 2020 * 12
+    assert parse_month("2020", end=True) == 2020 * 12 + 11
+    assert parse_month("2020-13") is None
+    assert parse_month("pronto") is None
+
+
+def test_open_ended_and_ranges():
+    assert item_period({"start": "2019-03", "end": "Actualidad"})[1] is None
+    assert item_period({"start": "2019-03", "end": "actual"})[1] is None
+    assert item_period({"start": "2019-03", "end": ""})[1] is None
+    assert item_period({"periodo": "2018 - 2020"}) == (2018 * 12, 2020 * 12 + 11)
+    assert item_period({"periodo": "2020"}) == (2020 * 12, 2020 * 12 + 11)
+
+
+def _index(items):
+    index = SearchIndex(["experience"])
+    index.rebuild({"experience": items})
+    return index
+
+
+def test_filters_compare_dates_not_text():
+    index = _index([
+        {"title": "A", "start": "2019-03", "end": "Actualidad"},
+        {"title": "B", "start": "2015", "end": "2020"},
+        {"title": "C", "start": "2010-01", "end": "2012-06"},
+        {"title": "D", "start": "03/2021", "end": ""},
+    ])
+    # "2020" como fin cubre todo 2020; como texto sería menor que "2020-06"
+    assert index.search(since="2020-06") == [("experience", 0), ("experience", 1), ("experience", 3)]
+    assert index.search(until="2015") == [("experience", 1), ("experience", 2)]
+    # "Actualidad" no es una fecha anterior a 2025 por orden alfabético
+    assert index.search(since="2025") == [("experience", 0), ("experience", 3)]
+    assert index.search(since="2021", until="2021-02") == [("experience", 0)]
+
+
+def test_unparsable_filter_is_rejected():
+    index = _index([{"title": "A", "start": "2019"}])
+    with pytest.raises(ValueError):
+        index.search(since="ayer")
+    with pytest.raises(ValueError):
+        parse_bound("2020-13")
@@ -0,0 +1,38 @@
+import sqlite3
+
+from cv_sqlite import DB_NAME, SQLiteBackend
+from cv_store import open_cv_store
+
+
+def _skills(store):
+    return [s.to_dict() for s in store.view()["skills"]]
+
+
+def test_item_ops_round_trip(tmp_path):
+    store = open_cv_store(str(tmp_path), storage="sqlite")
+    store.append_item("skills", {"name": "Python", "level": "Avanzado", "tags": ["lang"]})
+    store.extend_items("skills", [{"name": "SQL", "level": "Medio", "tags": []},
+                                  {"name": "Go", "level": "Básico", "tags": ["lang", "backend"]}])
+    store.update_item("skills", 2, {"tags": ["lang"]})
+    store.delete_item("skills", 0)
+    store.set("summary", "Hola")
+    expected = [{"name": "SQL", "level": "Medio", "tags": []}, {"name": "Go", "level": "Básico", "tags": ["lang"]}]
+    assert _skills(store) == expected
+    reopened = open_cv_store(str(tmp_path), storage="sqlite")
+    assert _skills(reopened) == expected
+    assert reopened.view()["summary"] == "Hola"
+
+
+def test_old_tag_tables_and_date_indexes_are_dropped(tmp_path):
+    path = str(tmp_path / DB_NAME)
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE "skills_tags" (item_id INTEGER, field TEXT, tag TEXT)')
+    conn.execute('CREATE TABLE "experience" (id INTEGER PRIMARY KEY, pos INTEGER NOT NULL, title TEXT, company TEXT, '
+                 'location TEXT, start TEXT, "end" TEXT, description TEXT, tech TEXT, extra TEXT)')
+    conn.execute('CREATE INDEX "experience_start" ON "experience"(start)')
+    conn.commit()
+    conn.close()
+    backend = SQLiteBackend(path)
+    names = {r[0] for r in backend.conn.execute("SELECT name FROM sqlite_master")}
+    assert "skills_tags" not in names and "experience_start" not in names
+    backend.close()
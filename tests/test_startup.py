@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from cv_startup import lazy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_lazy_creates_once_on_first_use():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"value": 42}
+
+    proxy = lazy(factory)
+    assert calls == []
+    threads = [threading.Thread(target=lambda: proxy["value"]) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert proxy["value"] == 42 and len(calls) == 1
+
+
+def test_importing_the_desktop_app_defers_work(tmp_path):
+    code = (
+        "import os, sys; sys.path.insert(0, sys.argv[1]); import cv_app; "
+        "print(os.path.exists(cv_app.DATA_DIR), "
+        "sorted(m for m in ('cv_profiles', 'cv_jobs', 'cv_assets', 'cv_export', 'cv_import') if m in sys.modules))"
+    )
+    env = dict(os.environ, CVTOOL_DATA_DIR=str(tmp_path / "data"))
+    out = subprocess.run([sys.executable, "-c", code, ROOT], capture_output=True, text=True, check=True, env=env).stdout
+    assert out == "False []\n", out